@@ -0,0 +1,4 @@
+"""
+Benchmark suite: seeded synthetic catalogs (generator), per-stage timings
+and peak memory (run), regression checks against a stored baseline (compare).
+"""
@@ -0,0 +1,69 @@
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from .run import DEFAULT_OUT
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Écarts absolus sous lesquels une hausse relative est du bruit de mesure
+METRICS = {"seconds": 0.005, "peak_bytes": 256 * 1024}
+
+
+def load_results(path: str) -> Dict[Tuple[str, int], Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    return {(row["stage"], int(row["size"])): row for row in doc["results"]}
+
+
+def compare(baseline: Dict[Tuple[str, int], Dict[str, Any]], current: Dict[Tuple[str, int], Dict[str, Any]],
+            threshold: float = 0.25) -> List[Dict[str, Any]]:
+    """
+    One entry per (stage, size, metric) present in both runs. A metric
+    regresses when it grew by more than threshold (relative) and by more
+    than its METRICS noise floor (absolute).
+    """
+    out: List[Dict[str, Any]] = []
+    for key in sorted(baseline.keys() & current.keys()):
+        for metric, floor in METRICS.items():
+            base, cur = baseline[key].get(metric), current[key].get(metric)
+            if base is None or cur is None:
+                continue
+            ratio = cur / base if base else None
+            regression = cur - base > floor and (ratio is None or ratio > 1 + threshold)
+            out.append({
+                "stage": key[0],
+                "size": key[1],
+                "metric": metric,
+                "baseline": base,
+                "current": cur,
+                "ratio": round(ratio, 3) if ratio is not None else None,
+                "regression": regression,
+            })
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Flag benchmark regressions against a stored baseline.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--current", default=DEFAULT_OUT)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative increase (0.25 = +25%%)")
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else "ok"
+        print(f"{row['stage']:<18} {row['size']:>8} {row['metric']:<11} {row['baseline']:>14} -> {row['current']:<14} x{row['ratio']}  {flag}")
+    missing = sorted(baseline.keys() - current.keys())
+    if missing:
+        print(f"not measured in current run: {', '.join(f'{s}@{n}' for s, n in missing)}")
+    regressions = [r for r in rows if r["regression"]]
+    print(json.dumps({"compared": len(rows), "regressions": len(regressions), "threshold": args.threshold}))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import random
+from typing import Any, Dict, List
+
+from scripts import config
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+_PRODUCTS = (
+    ("Gouda jeune", "Produits laitiers et fromages", "Fromages"),
+    ("Lait demi-écrémé", "Produits laitiers et fromages", "Lait"),
+    ("Yaourt nature", "Produits laitiers et fromages", "Yaourts"),
+    ("Filet de poulet", "Viande", "Volaille"),
+    ("Haché porc et bœuf", "Viande", "Haché"),
+    ("Jambon cuit", "Viande", "Charcuterie"),
+    ("Baguette précuite", "Pain et pâtisseries", "Pain"),
+    ("Croissants au beurre", "Pain et pâtisseries", "Viennoiseries"),
+    ("Spaghetti", "Pâtes et riz", "Pâtes"),
+    ("Riz basmati", "Pâtes et riz", "Riz"),
+    ("Tomates cerises", "Légumes frais", None),
+    ("Chicons", "Légumes frais", None),
+    ("Bananes", "Fruits frais", None),
+    ("Pommes Jonagold", "Fruits frais", None),
+    ("Saumon fumé", "Poissons & fruits de mer", "Poisson fumé"),
+    ("Thon au naturel", "Conserves", "Poisson en conserve"),
+    ("Chips paprika", "Collations et sucreries", "Chips"),
+    ("Chocolat au lait", "Collations et sucreries", "Chocolat"),
+    ("Café moulu", "Café, thé, cacao", "Café"),
+    ("Eau pétillante", "Boissons non alcoolisées", "Eau"),
+    ("Bière blonde", "Boissons alcoolisées", "Bière"),
+    ("Lessive liquide", "Ménage", "Lessive"),
+    ("Shampooing", "Produits cosmétiques et soins", None),
+    ("Croquettes chat", "Aliments pour animaux", None),
+    ("Bouquet de tulipes", "Fleurs fraîches", None),
+    ("Couette 4 saisons", None, None),
+)
+_BRANDS = ("GOLDEN SEAFOOD", "MILSANI", "LE GRAND CHEF", "NATURE ACTIVE BIO", "MOSER ROTH", "CHOCEUR", "", "")
+_QUALIFIERS = ("", "", "bio", "XXL", "familial", "light", "2 x 500 g", "pack de 6")
+_UNITS = ("250 g", "500 g", "1 kg", "1 l", "6 x 1,5 l", "la pièce", "400 g", "100 ml")
+
+
+def _hit(rng: random.Random, object_id: str, offer: bool) -> Dict[str, Any]:
+    name, lvl3, lvl4 = _PRODUCTS[rng.randrange(len(_PRODUCTS))]
+    qualifier = _QUALIFIERS[rng.randrange(len(_QUALIFIERS))]
+    product_name = f"{name} {qualifier}".strip()
+    price = round(rng.uniform(0.39, 49.99), 2)
+    image = f"https://dm.emea.cms.aldi.cx/is/image/prod1amer/product/jpg/scaled/1000/{object_id}"
+    hierarchy: Dict[str, Any] = {"lvl0": "Assortiment"}
+    if lvl3 is not None:
+        hierarchy["lvl1"] = "Assortiment > Alimentation"
+        hierarchy["lvl2"] = "Assortiment > Alimentation > Produits frais"
+        hierarchy["lvl3"] = lvl3
+        if lvl4 is not None:
+            hierarchy["lvl4"] = lvl4
+    h: Dict[str, Any] = {
+        "objectID": object_id,
+        "productName": product_name,
+        "brandName": _BRANDS[rng.randrange(len(_BRANDS))],
+        "salesPrice": price,
+        "priceFormatted": f"{price:.2f}".replace(".", ","),
+        "currencyCode": "EUR",
+        "productPicture": f"{image} 592w, {image}?w=288 288w",
+        "salesUnitFormatted": _UNITS[rng.randrange(len(_UNITS))],
+        "longDescription": f"<p>{product_name} de qualité.</p><ul><li>Origine&nbsp;: UE</li></ul>",
+        "hierarchicalCategories": hierarchy,
+        "categories": [v for k, v in sorted(hierarchy.items())],
+        "productUrl": f"https://www.aldi.be/fr/p.{object_id}.html",
+        "isAvailableOnline": rng.random() < 0.2,
+        "_highlightResult": {"productName": {"value": product_name, "matchLevel": "none", "matchedWords": []}},
+    }
+    if rng.random() < 0.05:
+        # Quelques prix uniquement en texte, comme dans l'index réel
+        h["salesPrice"] = None
+    if offer:
+        h["salesPrice"] = round(price * rng.choice((0.5, 0.7, 0.8)), 2) if h["salesPrice"] is not None else None
+        h["promoText"] = rng.choice(("Cette semaine", "Offre du jeudi", "-30%", "1+1 gratuit"))
+        h["validUntil"] = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    return h
+
+
+def generate_catalog(n: int, seed: int = 42, offer_ratio: float = 0.1, offer_only_ratio: float = 0.02) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Seeded Algolia-shaped catalog: n assortment hits, offers for
+    offer_ratio of them (same objectID, promo fields, lower price) and
+    n * offer_only_ratio products that only exist in the offers index.
+    """
+    rng = random.Random(seed)
+    assortment = [_hit(rng, f"{1000000 + i}-1-0", offer=False) for i in range(n)]
+    offers = [_hit(rng, assortment[i]["objectID"], offer=True) for i in sorted(rng.sample(range(n), int(n * offer_ratio)))]
+    offers += [_hit(rng, f"{9000000 + i}-2-0", offer=True) for i in range(int(n * offer_only_ratio))]
+    return {config.ASSORTMENT_INDEX: assortment, config.OFFERS_INDEX: offers}
+
+
+def parse_size(value: str) -> int:
+    return SIZES.get(value.lower()) or int(value)
@@ -0,0 +1,138 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from scripts.query_server import QueryServer
+
+DEFAULT_PATHS = (
+    "/products",
+    "/products?sort=price&per_page=20",
+    "/products?promo=true",
+    "/products?max_price=2&sort=-price",
+    "/categories",
+)
+
+
+def query_mix(categories: List[str], n: int = 200, seed: int = 42) -> List[str]:
+    """A seeded mix of category/promo/price-range queries plus the fixed DEFAULT_PATHS."""
+    rng = random.Random(seed)
+    paths = list(DEFAULT_PATHS)
+    for _ in range(n):
+        params: Dict[str, Any] = {}
+        if categories and rng.random() < 0.6:
+            params["category"] = rng.choice(categories)
+        if rng.random() < 0.3:
+            params["promo"] = "true"
+        if rng.random() < 0.4:
+            params["max_price"] = rng.choice((1, 2, 5, 10))
+        params["sort"] = rng.choice(("relevance", "price", "-price", "name"))
+        params["page"] = rng.choice((0, 0, 0, 1, 2))
+        paths.append("/products?" + urlencode(params))
+    return paths
+
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, path: str,
+                   headers: Dict[str, str]) -> Tuple[int, Dict[str, str]]:
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host}"] + [f"{k}: {v}" for k, v in headers.items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    status = int(head[0].split(" ", 2)[1])
+    got = {}
+    for line in head[1:]:
+        if ":" in line:
+            k, v = line.split(":", 1)
+            got[k.strip().lower()] = v.strip()
+    await reader.readexactly(int(got.get("content-length") or 0))
+    return status, got
+
+
+async def run_load(url: str, paths: List[str], requests: int = 2000, concurrency: int = 20,
+                   conditional: float = 0.0, gzip: bool = True, seed: int = 42) -> Dict[str, Any]:
+    """
+    Send `requests` GETs over `concurrency` keep-alive connections, each
+    picking paths from `paths`. A `conditional` share of requests replays
+    the last ETag seen for that path (If-None-Match). Returns req/s and
+    latency quantiles.
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    samples: List[float] = []
+    statuses: Dict[str, int] = {}
+    etags: Dict[str, str] = {}
+    remaining = [requests]
+
+    async def worker(i: int) -> None:
+        rng = random.Random(seed + i)
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                path = rng.choice(paths)
+                headers = {"Accept-Encoding": "gzip"} if gzip else {}
+                if path in etags and rng.random() < conditional:
+                    headers["If-None-Match"] = etags[path]
+                t0 = time.perf_counter()
+                status, got = await _request(reader, writer, parts.netloc, path, headers)
+                elapsed = time.perf_counter() - t0
+                samples.append(elapsed)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                if "etag" in got:
+                    etags[path] = got["etag"]
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    wall = time.perf_counter() - t0
+    samples.sort()
+
+    def pct(q: float) -> float:
+        return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 3) if samples else 0.0
+
+    return {
+        "requests": len(samples),
+        "concurrency": concurrency,
+        "seconds": round(wall, 4),
+        "requests_per_second": round(len(samples) / wall, 1) if wall else 0.0,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "max_ms": round(samples[-1] * 1000, 3) if samples else 0.0,
+        "statuses": statuses,
+    }
+
+
+async def _local(data_dir: str, **kwargs: Any) -> Dict[str, Any]:
+    server = await QueryServer(data_dir, port=0, reload_interval=0).start()
+    try:
+        categories = [c["category"] for c in server.index.categories()]
+        return await run_load(server.url, query_mix(categories, seed=kwargs["seed"]), **kwargs)
+    finally:
+        await server.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test the catalog query server (requests/s, p99 latency).")
+    parser.add_argument("--url", help="running server to hit; default starts one in-process over --data-dir")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--conditional", type=float, default=0.0, help="share of requests sent with If-None-Match")
+    parser.add_argument("--no-gzip", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    kwargs = dict(requests=args.requests, concurrency=args.concurrency, conditional=args.conditional,
+                  gzip=not args.no_gzip, seed=args.seed)
+    if args.url:
+        result = asyncio.run(run_load(args.url, query_mix([], seed=args.seed), **kwargs))
+    else:
+        result = asyncio.run(_local(args.data_dir, **kwargs))
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
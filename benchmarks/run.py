@@ -0,0 +1,605 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from scripts import analytics, categorizer, compact, config, extractors, pipeline, search_index, standin, utils, validators
+from scripts.scraper import AldiScraper
+
+from . import generator
+
+RESULTS_VERSION = 1
+DEFAULT_OUT = os.path.join(os.path.dirname(__file__), "results.json")
+STAGES = ("merge", "build_full", "build_min", "categorize", "validate", "save_json", "analytics", "compact", "pipeline")
+FETCH_MODES = ("serial", "concurrent", "batched")
+TRANSFORM_WORKERS = (1, 2, 4, 8)
+# Comparaisons ciblées d'un module contre l'implémentation qu'il a remplacée
+MODULE_BENCHES = ("categorizer", "extractors", "records", "search_index", "analytics", "compact")
+
+
+@contextmanager
+def overrides(**values: Any) -> Iterator[None]:
+    """Temporarily set config attributes, restored on exit."""
+    saved = {k: getattr(config, k) for k in values}
+    for k, v in values.items():
+        setattr(config, k, v)
+    try:
+        yield
+    finally:
+        for k, v in saved.items():
+            setattr(config, k, v)
+
+
+class CatalogScraper(AldiScraper):
+    """AldiScraper whose fetch layer serves an in-memory catalog, for the offline stages."""
+
+    def __init__(self, catalog: Dict[str, List[Dict[str, Any]]]):
+        super().__init__()
+        self.catalog = catalog
+
+    def fetch(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {"assortment": self.catalog[config.ASSORTMENT_INDEX], "offers": self.catalog[config.OFFERS_INDEX]}
+
+    def get_all_products_from_index(self, index_name: str) -> List[Dict[str, Any]]:
+        return self.catalog[index_name]
+
+    def iter_index_hits(self, index_name: str) -> Iterator[Dict[str, Any]]:
+        return iter(self.catalog[index_name])
+
+
+def measure(fn: Callable[[], Any], repeat: int = 3, memory: bool = True) -> Dict[str, Any]:
+    """
+    Best wall time over repeat calls (GC off, like timeit) and, in a
+    separate traced call, the peak of newly allocated memory.
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        finally:
+            gc.enable()
+    row: Dict[str, Any] = {"seconds": round(min(times), 6)}
+    if memory:
+        # Mesure séparée: tracemalloc ralentit fortement les allocations
+        gc.collect()
+        tracemalloc.start()
+        try:
+            base = tracemalloc.get_traced_memory()[0]
+            fn()
+            row["peak_bytes"] = tracemalloc.get_traced_memory()[1] - base
+        finally:
+            tracemalloc.stop()
+    return row
+
+
+def _offline_config() -> Dict[str, Any]:
+    return {
+        "ALGOLIA_API_KEY": config.ALGOLIA_API_KEY or "offline",
+        "MIN_PRODUCTS": 0,
+        "MAX_PRODUCTS": 1 << 62,
+        "STREAMING_PIPELINE": True,
+        "INCREMENTAL_RUNS": False,
+        "PRICE_HISTORY": False,
+        "SHARDED_OUTPUT": False,
+        "SEARCH_INDEX": False,
+        "ANALYTICS_EXPORT": False,
+        "COMPACT_OUTPUT": False,
+        "TRANSFORM_WORKERS": 0,
+        "BATCH_QUERIES": False,
+        "CONCURRENT_FETCH": False,
+        "RECORD_CATALOG": None,
+    }
+
+
+def bench_stages(n: int, seed: int = 42, repeat: int = 3, memory: bool = True,
+                 stages: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """One result row per offline stage on a generated catalog of n assortment hits."""
+    catalog = generator.generate_catalog(n, seed=seed)
+    assortment = catalog[config.ASSORTMENT_INDEX]
+    offers = catalog[config.OFFERS_INDEX]
+    rows: List[Dict[str, Any]] = []
+    with overrides(**_offline_config()), tempfile.TemporaryDirectory() as tmp:
+        sc = CatalogScraper(catalog)
+        merged = sc.merge(assortment, offers)
+        full = sc.build_full(merged)
+        minimal = sc.build_min(merged)
+        names = [(item["name"], merged[item["id"]].raw) for item in minimal["products"]]
+
+        def validate() -> None:
+            validators.ensure_hits_have_required_keys(assortment, ["objectID"])
+            validators.ensure_hits_have_required_keys(offers, ["objectID"])
+            validators.validate_product_count(len(assortment) + len(offers))
+            validators.validate_min_products(minimal["products"])
+
+        def save_json() -> None:
+            sc.save_json(full, os.path.join(tmp, "products.json"))
+            sc.save_json(minimal, os.path.join(tmp, "products-min.json"))
+
+        def export() -> None:
+            with analytics.AnalyticsWriter(os.path.join(tmp, "analytics")) as writer:
+                for item in minimal["products"]:
+                    writer.add(item, merged[item["id"]])
+                writer.commit(minimal["meta"])
+
+        def compact_min() -> None:
+            builder = compact.CompactMinBuilder()
+            for item in minimal["products"]:
+                builder.add(item)
+            builder.write(os.path.join(tmp, "compact"), minimal["meta"])
+
+        runners: Dict[str, Callable[[], Any]] = {
+            "merge": lambda: sc.merge(assortment, offers),
+            "build_full": lambda: sc.build_full(merged),
+            "build_min": lambda: sc.build_min(merged),
+            "categorize": lambda: [sc.categorize(name, raw) for name, raw in names],
+            "validate": validate,
+            "save_json": save_json,
+            "analytics": export,
+            "compact": compact_min,
+            "pipeline": lambda: pipeline.run_pipeline(sc, os.path.join(tmp, "pipeline"), last_updated="1970-01-01T00:00:00+00:00"),
+        }
+        for stage in stages or STAGES:
+            row = {"stage": stage, "size": n, "products": len(merged)}
+            row.update(measure(runners[stage], repeat=repeat, memory=memory))
+            rows.append(row)
+            print(json.dumps(row))
+    return rows
+
+
+def bench_fetch(n: int, seed: int = 42, latency: float = 0.02, hits_per_page: int = 100,
+                repeat: int = 1, memory: bool = False, modes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Time AldiScraper.fetch() in each fetch mode against a local stand-in
+    answering every request after `latency` seconds. Keep n below ~8k so
+    that no category filter exceeds the stand-in's 1000-hit pagination limit.
+    """
+    catalog = generator.generate_catalog(n, seed=seed)
+    rows: List[Dict[str, Any]] = []
+    for mode in modes or FETCH_MODES:
+        with standin.StandInServer(catalog, latency=latency) as server, overrides(
+            ALGOLIA_HOST=server.url,
+            HITS_PER_PAGE=hits_per_page,
+            MAX_REQUESTS_PER_SECOND=0,
+            CONCURRENT_FETCH=mode == "concurrent",
+            BATCH_QUERIES=mode == "batched",
+            RECORD_CATALOG=None,
+        ):
+            fetched: Dict[str, Any] = {}
+
+            def fetch() -> None:
+                sc = AldiScraper()
+                data = sc.fetch()
+                fetched["hits"] = len(data["assortment"]) + len(data["offers"])
+                fetched["wire_bytes"] = sc.transfer.stats()["wire_bytes"]
+
+            row: Dict[str, Any] = {"stage": f"fetch_{mode}", "size": n, "latency": latency}
+            row.update(measure(fetch, repeat=repeat, memory=memory))
+            row["hits"] = fetched["hits"]
+            row["wire_bytes"] = fetched["wire_bytes"]
+            row["requests"] = server.requests_served // (repeat + memory)
+        rows.append(row)
+        print(json.dumps(row))
+    return rows
+
+
+def bench_transform(n: int, seed: int = 42, workers: Optional[List[int]] = None, repeat: int = 1,
+                    chunk_size: int = 2000) -> List[Dict[str, Any]]:
+    """
+    Time the transform stage (min projection, categorisation, promo text)
+    over n generated products for each worker count; 1 is the in-process
+    path. Pool start-up is included. Every run must match the serial output.
+    """
+    catalog = generator.generate_catalog(n, seed=seed)
+    rows: List[Dict[str, Any]] = []
+    with overrides(**_offline_config()):
+        sc = CatalogScraper(catalog)
+        merged = sc.merge(catalog[config.ASSORTMENT_INDEX], catalog[config.OFFERS_INDEX])
+        reference = [item for _, _, item in sc.iter_min_items(merged.items())]
+        for w in workers or TRANSFORM_WORKERS:
+            out: Dict[str, Any] = {}
+
+            def transform() -> None:
+                out["items"] = [item for _, _, item in sc.iter_min_items(merged.items())]
+
+            with overrides(TRANSFORM_WORKERS=w, TRANSFORM_CHUNK_SIZE=chunk_size):
+                row: Dict[str, Any] = {"stage": f"transform_{w}", "size": n, "products": len(merged), "workers": w,
+                                       "cpus": os.cpu_count()}
+                row.update(measure(transform, repeat=repeat, memory=False))
+            if out["items"] != reference:
+                raise AssertionError(f"transform with {w} workers differs from the serial output")
+            rows.append(row)
+            print(json.dumps(row))
+    return rows
+
+
+# Ancien algorithme de catégorisation (dict reconstruit + sous-chaîne)
+_LEGACY_MAPPING: Tuple[Tuple[str, str], ...] = (
+    ("lait", "produits laitiers"), ("yaourt", "produits laitiers"), ("fromage", "fromages"),
+    ("gouda", "fromages"), ("cheddar", "fromages"), ("poulet", "viandes"), ("boeuf", "viandes"),
+    ("porc", "viandes"), ("pain", "boulangerie"), ("baguette", "boulangerie"), ("pâtes", "épicerie"),
+    ("riz", "épicerie"), ("huile", "épicerie"), ("tomate", "légumes"), ("banane", "fruits"),
+    ("pomme", "fruits"), ("saumon", "poisson"), ("thon", "poisson"),
+)
+
+
+def legacy_categorize(name: str) -> str:
+    n = name.lower()
+    mapping = dict(_LEGACY_MAPPING)
+    for k, cat in mapping.items():
+        if k in n:
+            return cat
+    return "autres"
+
+
+def legacy_min_fields(d: Dict[str, Any]) -> Tuple[Any, Any, Any, Any, Any]:
+    """Former get_first-based extraction, the reference of the shape-compiled extractor."""
+    v = utils.get_first(d, extractors.PRICE_KEYS)
+    if v is None:
+        pf = utils.get_first(d, extractors.PRICE_FORMATTED_KEYS, default=None)
+        if isinstance(pf, str):
+            v = extractors.parse_formatted_price(pf)
+    image = utils.get_first(d, extractors.IMAGE_KEYS)
+    if isinstance(image, list) and image:
+        image = image[0]
+    elif isinstance(image, str):
+        image = image.split(",")[0].strip().split()[0]
+    return (
+        utils.get_first(d, extractors.NAME_KEYS, default=""),
+        v,
+        image,
+        utils.get_first(d, extractors.PROMO_TEXT_KEYS),
+        utils.get_first(d, extractors.UNIT_KEYS),
+    )
+
+
+def naive_search(products: List[Dict[str, Any]], query: str) -> List[str]:
+    """What clients do without the search index: substring scan over every name."""
+    q = query.lower()
+    return [p["id"] for p in products if q in (p.get("name") or "").lower()]
+
+
+def _load_products(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["products"]
+
+
+def bench_categorizer(path: str, repeat: int = 20) -> Dict[str, Any]:
+    """
+    Throughput of the legacy and compiled categorisers over a products file
+    (products.json or products-min.json), and agreement of each keyword
+    result with the category mapped from hierarchicalCategories when the
+    file carries it (products.json).
+    """
+    products = _load_products(path)
+    names = [utils.get_first(p, ("productName", "name", "title", "label"), default="") or "" for p in products]
+    engine = categorizer.CategoryEngine.from_file(categorizer.DEFAULT_RULES_PATH)
+    legacy_s = measure(lambda: [legacy_categorize(n) for n in names], repeat=repeat, memory=False)["seconds"]
+    compiled_s = measure(lambda: [engine.from_name(n) for n in names], repeat=repeat, memory=False)["seconds"]
+
+    agree_legacy = agree_compiled = with_hierarchy = 0
+    for p, n in zip(products, names):
+        expected = engine.from_hierarchy(p)
+        if expected is None:
+            continue
+        with_hierarchy += 1
+        agree_legacy += legacy_categorize(n) == expected
+        agree_compiled += engine.from_name(n) == expected
+
+    row = {
+        "bench": "categorizer",
+        "products": len(names),
+        "legacy_per_s": round(len(names) / legacy_s) if legacy_s else None,
+        "compiled_per_s": round(len(names) / compiled_s) if compiled_s else None,
+        "legacy_autres": sum(legacy_categorize(n) == "autres" for n in names),
+        "compiled_autres": sum(engine.from_name(n) == engine.default for n in names),
+        "with_hierarchy": with_hierarchy,
+        "legacy_agreement": round(agree_legacy / with_hierarchy, 3) if with_hierarchy else None,
+        "compiled_agreement": round(agree_compiled / with_hierarchy, 3) if with_hierarchy else None,
+    }
+    print(json.dumps(row, ensure_ascii=False))
+    return row
+
+
+def bench_extractors(n: int = 100_000, repeat: int = 3) -> Dict[str, Any]:
+    """legacy_min_fields against the shape-compiled extractor, per hit and batched."""
+    catalog = generator.generate_catalog(n)
+    hits = catalog[config.ASSORTMENT_INDEX] + catalog[config.OFFERS_INDEX]
+    extractor = extractors.ShapeExtractor()
+    if [legacy_min_fields(h) for h in hits[:1000]] != list(extractor.extract_many(hits[:1000])):
+        raise AssertionError("shape-compiled extraction differs from legacy_min_fields")
+    legacy_s = measure(lambda: [legacy_min_fields(h) for h in hits], repeat=repeat, memory=False)["seconds"]
+    per_hit_s = measure(lambda: [extractor.min_fields(h) for h in hits], repeat=repeat, memory=False)["seconds"]
+    batched_s = measure(lambda: list(extractor.extract_many(hits)), repeat=repeat, memory=False)["seconds"]
+    row = {
+        "bench": "extractors",
+        "hits": n,
+        "shapes": extractor.shapes,
+        "legacy_s": round(legacy_s, 3),
+        "planned_s": round(per_hit_s, 3),
+        "batched_s": round(batched_s, 3),
+        "speedup": round(legacy_s / batched_s, 2) if batched_s else None,
+    }
+    print(json.dumps(row))
+    return row
+
+
+def _retained(build: Callable[[], Any]) -> Tuple[Any, int]:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def bench_records(n: int = 100_000) -> Dict[str, Any]:
+    """
+    Memory retained by merge() output on a generated catalog of n assortment
+    hits plus n/5 offers (half overlapping): former dict copies vs records.
+    """
+    sc = AldiScraper()
+    catalog = generator.generate_catalog(n, offer_ratio=0.1, offer_only_ratio=0.1)
+    assortment, offers = catalog[config.ASSORTMENT_INDEX], catalog[config.OFFERS_INDEX]
+
+    def legacy_merge() -> Dict[str, Dict[str, Any]]:
+        products: Dict[str, Dict[str, Any]] = {}
+        for h in assortment:
+            base = dict(h)
+            base["is_promotion"] = False
+            base["promo_text"] = None
+            base["valid_until"] = None
+            price = sc.extract_price(base)
+            if price is not None:
+                base["price"] = price
+            products[str(h["objectID"])] = base
+        for h in offers:
+            pid = str(h["objectID"])
+            if pid not in products:
+                products[pid] = dict(h)
+            p = products[pid]
+            offer_price = sc.extract_price(h)
+            if offer_price is not None:
+                p["price"] = offer_price
+            p["is_promotion"] = True
+            p["promo_text"] = sc.extract_promo_text(h)
+            p["valid_until"] = sc.extract_valid_until(h)
+            p["source_offer"] = True
+        return products
+
+    legacy, legacy_bytes = _retained(legacy_merge)
+    records, record_bytes = _retained(lambda: sc.merge(assortment, offers))
+    sample = list(records)[:: max(1, len(records) // 1000)]
+    if len(legacy) != len(records) or any(records[pid].to_dict() != legacy[pid] for pid in sample):
+        raise AssertionError("merge() records differ from the former merged dicts")
+    row = {
+        "bench": "records",
+        "products": len(records),
+        "dict_copy_bytes_per_product": round(legacy_bytes / len(legacy)),
+        "record_bytes_per_product": round(record_bytes / len(records)),
+        "ratio": round(legacy_bytes / record_bytes, 1) if record_bytes else None,
+    }
+    print(json.dumps(row))
+    return row
+
+
+def bench_search_index(path: str, scales: Tuple[int, ...] = (1, 10, 50),
+                       queries: Tuple[str, ...] = ("fromage", "pain", "choco", "lait bio", "poulet")) -> List[Dict[str, Any]]:
+    """SearchIndex.search against naive_search over products-min.json replicated `scale` times."""
+    base = _load_products(path)
+    rows = []
+    for scale in scales:
+        products = [dict(p, id=f"{p['id']}#{k}") for k in range(scale) for p in base]
+        builder = search_index.SearchIndexBuilder()
+        t0 = time.perf_counter()
+        for p in products:
+            builder.add(p)
+        build_s = time.perf_counter() - t0
+        with tempfile.TemporaryDirectory() as tmp:
+            builder.write(tmp)
+            index = search_index.SearchIndex(tmp)
+            for q in queries:
+                index.search(q)  # chargement des buckets hors mesure
+            t0 = time.perf_counter()
+            for q in queries:
+                index.search(q, limit=50)
+            indexed_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+        t0 = time.perf_counter()
+        for q in queries:
+            naive_search(products, q)
+        naive_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+        row = {"bench": "search_index", "products": len(products), "build_s": round(build_s, 3),
+               "indexed_ms": round(indexed_ms, 3), "naive_ms": round(naive_ms, 3)}
+        print(json.dumps(row))
+        rows.append(row)
+    return rows
+
+
+def bench_analytics(n: int = 20_000, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Load and query times of products-min.json (json.load + Python filters)
+    versus the SQLite database and the Parquet file, on a generated catalog.
+    Query: promotions of one category under 5 EUR, sorted by price.
+    """
+    sc = AldiScraper()
+    catalog = generator.generate_catalog(n)
+    merged = sc.merge(catalog[config.ASSORTMENT_INDEX], catalog[config.OFFERS_INDEX])
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        with analytics.AnalyticsWriter(tmp) as writer:
+            for pid, p, item in sc.iter_min_items(merged.items()):
+                writer.add(item, p)
+            writer.commit(sc.min_meta(len(merged)))
+        export_s = time.perf_counter() - t0
+        minimal = sc.build_min(merged)
+        sc.save_json(minimal, os.path.join(tmp, "products-min.json"))
+        category = minimal["products"][0]["category"]
+
+        def json_query() -> List[str]:
+            products = _load_products(os.path.join(tmp, "products-min.json"))
+            rows = [p for p in products if p["category"] == category and p["is_promotion"]
+                    and p["price"] is not None and p["price"] < 5]
+            return [p["id"] for p in sorted(rows, key=lambda p: p["price"])]
+
+        def sqlite_query() -> List[str]:
+            db = sqlite3.connect(os.path.join(tmp, analytics.SQLITE_FILE))
+            try:
+                return [r[0] for r in db.execute(
+                    "SELECT p.id FROM products p JOIN categories c ON c.id = p.category_id "
+                    "WHERE c.name = ? AND p.is_promotion = 1 AND p.price < 5 ORDER BY p.price", (category,))]
+            finally:
+                db.close()
+
+        row: Dict[str, Any] = {"bench": "analytics", "products": len(merged), "export_s": round(export_s, 3)}
+        row["json_load_query_s"] = round(measure(json_query, repeat=repeat, memory=False)["seconds"], 4)
+        row["sqlite_query_s"] = round(measure(sqlite_query, repeat=repeat, memory=False)["seconds"], 4)
+        expected = sorted(json_query())
+        if sorted(sqlite_query()) != expected:
+            raise AssertionError("SQLite query differs from the JSON scan")
+        parquet_path = os.path.join(tmp, analytics.COLUMNAR_FILES["parquet"])
+        if os.path.exists(parquet_path):
+            import pyarrow.compute as pc
+            import pyarrow.parquet as pq
+
+            def parquet_query() -> List[str]:
+                t = pq.read_table(parquet_path, columns=["id", "category", "price", "is_promotion"])
+                mask = pc.and_(pc.and_(pc.equal(t["category"].cast("string"), category), t["is_promotion"]), pc.less(t["price"], 5))
+                return t.filter(mask).sort_by("price")["id"].to_pylist()
+
+            row["parquet_load_query_s"] = round(measure(parquet_query, repeat=repeat, memory=False)["seconds"], 4)
+            if sorted(parquet_query()) != expected:
+                raise AssertionError("Parquet query differs from the JSON scan")
+    print(json.dumps(row))
+    return row
+
+
+def bench_compact(path: str, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Bytes and client-side parse time of products-min.json (v1, as published)
+    against the v2 compact form, raw and precompressed.
+    """
+    with open(path, "rb") as f:
+        v1 = f.read()
+    doc = json.loads(v1)
+    builder = compact.CompactMinBuilder()
+    for item in doc["products"]:
+        builder.add(item)
+    v2 = json.dumps(builder.document(doc["meta"]), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if compact.decode(json.loads(v2)) != doc:
+        raise AssertionError("compact v2 does not decode back to products-min.json")
+
+    def ms(fn: Callable[[], Any]) -> float:
+        return round(measure(fn, repeat=repeat, memory=False)["seconds"] * 1000, 3)
+
+    row: Dict[str, Any] = {
+        "bench": "compact",
+        "products": len(doc["products"]),
+        "v1_bytes": len(v1),
+        "v1_gz_bytes": len(compact.gzip_bytes(v1)),
+        "v2_bytes": len(v2),
+        "v2_gz_bytes": len(compact.gzip_bytes(v2)),
+        "v1_parse_ms": ms(lambda: json.loads(v1)),
+        "v2_parse_ms": ms(lambda: json.loads(v2)),
+        "v2_parse_decode_ms": ms(lambda: compact.decode(json.loads(v2))),
+    }
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    if brotli is not None:
+        row["v1_br_bytes"] = len(brotli.compress(v1, quality=11))
+        row["v2_br_bytes"] = len(brotli.compress(v2, quality=11))
+    print(json.dumps(row))
+    return row
+
+
+def bench_modules(names: List[str], path: str, size: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Run the MODULE_BENCHES in names; path is the products file, size the generated catalog size."""
+    rows: List[Dict[str, Any]] = []
+    for name in names:
+        if name == "categorizer":
+            rows.append(bench_categorizer(path))
+        elif name == "extractors":
+            rows.append(bench_extractors(size or 100_000))
+        elif name == "records":
+            rows.append(bench_records(size or 100_000))
+        elif name == "search_index":
+            rows += bench_search_index(path)
+        elif name == "analytics":
+            rows.append(bench_analytics(size or 20_000))
+        elif name == "compact":
+            rows.append(bench_compact(path))
+        else:
+            raise ValueError(f"Unknown module benchmark {name!r} (expected one of {', '.join(MODULE_BENCHES)})")
+    return rows
+
+
+def save_results(rows: List[Dict[str, Any]], path: str, **info: Any) -> Dict[str, Any]:
+    doc = {
+        "version": RESULTS_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        **info,
+        "results": rows,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False, indent=2)
+    return doc
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on seeded synthetic catalogs.")
+    parser.add_argument("--sizes", default="1k,10k", help="comma-separated catalog sizes (1k, 10k, 100k, 1m or integers)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated offline stages to run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory pass")
+    parser.add_argument("--fetch-size", default="2000", help="catalog size served to the fetch benchmark (0 = skip)")
+    parser.add_argument("--fetch-modes", default=",".join(FETCH_MODES))
+    parser.add_argument("--latency", type=float, default=0.02, help="stand-in latency per request, in seconds")
+    parser.add_argument("--transform-size", default="100k", help="catalog size of the transform benchmark (0 = skip)")
+    parser.add_argument("--transform-workers", default=",".join(map(str, TRANSFORM_WORKERS)))
+    parser.add_argument("--modules", default="",
+                        help=f"comma-separated module benchmarks to run instead ({', '.join(MODULE_BENCHES)})")
+    parser.add_argument("--input", default="data/products-min.json", help="products file of the module benchmarks")
+    parser.add_argument("--module-size", default="", help="generated catalog size of the module benchmarks")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    args = parser.parse_args(argv)
+
+    if args.modules:
+        size = generator.parse_size(args.module_size) if args.module_size else None
+        bench_modules([m for m in args.modules.split(",") if m], args.input, size)
+        return
+
+    rows: List[Dict[str, Any]] = []
+    stages = [s for s in args.stages.split(",") if s]
+    for size in (generator.parse_size(s) for s in args.sizes.split(",") if s):
+        rows += bench_stages(size, seed=args.seed, repeat=args.repeat, memory=not args.no_memory, stages=stages)
+    fetch_size = generator.parse_size(args.fetch_size)
+    if fetch_size:
+        rows += bench_fetch(fetch_size, seed=args.seed, latency=args.latency,
+                            modes=[m for m in args.fetch_modes.split(",") if m])
+    transform_size = generator.parse_size(args.transform_size)
+    if transform_size:
+        rows += bench_transform(transform_size, seed=args.seed,
+                                workers=[int(w) for w in args.transform_workers.split(",") if w])
+    save_results(rows, args.out, seed=args.seed, repeat=args.repeat)
+    print(json.dumps({"results": args.out, "rows": len(rows)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import json
+import os
+import re
+import sqlite3
+import tempfile
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import utils
+from .records import ProductRecord
+
+SQLITE_FILE = "products.sqlite"
+COLUMNAR_FILES = {"parquet": "products.parquet", "arrow": "products.arrows"}
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE categories (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE products (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    price REAL,
+    base_price REAL,
+    is_promotion INTEGER NOT NULL,
+    in_assortment INTEGER NOT NULL,
+    unit TEXT,
+    image_url TEXT
+);
+CREATE TABLE promotions (
+    product_id TEXT PRIMARY KEY REFERENCES products(id),
+    offer_price REAL,
+    promo_text TEXT,
+    valid_until TEXT
+);
+"""
+
+_INDEXES = """
+CREATE INDEX products_category ON products(category_id);
+CREATE INDEX products_price ON products(price);
+CREATE INDEX products_is_promotion ON products(is_promotion);
+CREATE INDEX promotions_valid_until ON promotions(valid_until);
+CREATE VIEW catalog AS
+    SELECT p.id, p.name, c.name AS category, p.price, p.base_price, p.is_promotion, p.in_assortment,
+           p.unit, p.image_url, pr.offer_price, pr.promo_text, pr.valid_until
+    FROM products p JOIN categories c ON c.id = p.category_id
+    LEFT JOIN promotions pr ON pr.product_id = p.id;
+"""
+
+
+def to_date(v: Any) -> Optional[date]:
+    """validUntil as a date: ISO strings (date or datetime) and epoch seconds/milliseconds."""
+    if isinstance(v, str) and _DATE_RE.match(v):
+        try:
+            return date.fromisoformat(v[:10])
+        except ValueError:
+            return None
+    if isinstance(v, (int, float)) and not isinstance(v, bool) and v > 0:
+        seconds = v / 1000 if v > 1e11 else v
+        return datetime.fromtimestamp(seconds, timezone.utc).date()
+    return None
+
+
+def to_float(v: Any) -> Optional[float]:
+    if isinstance(v, bool) or v is None:
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _columnar_module(fmt: str) -> Any:
+    """pyarrow (optional dependency) or None, with a warning when it is missing."""
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        utils.log_event("warning", "analytics_columnar_skipped", format=fmt, reason="pyarrow is not installed")
+        return None
+    return pyarrow
+
+
+class AnalyticsWriter:
+    """
+    Writes the merged catalog to an indexed SQLite database and a typed
+    columnar file (Parquet or Arrow IPC stream) in the same streaming pass.
+
+    Rows are inserted in batches into a temporary database; indexes are
+    built once at commit(), then both files are moved into place. Columnar
+    rows are flushed as record batches of batch_size, so memory stays
+    bounded. abort() (or an exception in the with-block) leaves the
+    previous files untouched.
+    """
+
+    def __init__(self, out_dir: str, columnar: str = "parquet", batch_size: int = 5000):
+        if columnar not in COLUMNAR_FILES and columnar != "none":
+            raise ValueError(f"Unsupported columnar format {columnar!r} (expected parquet, arrow or none)")
+        self.out_dir = out_dir
+        self.batch_size = max(1, int(batch_size))
+        self.count = 0
+        os.makedirs(out_dir, exist_ok=True)
+        fd, self._db_tmp = tempfile.mkstemp(dir=out_dir, suffix=".sqlite.part")
+        os.close(fd)
+        self._db = sqlite3.connect(self._db_tmp)
+        self._db.executescript("PRAGMA journal_mode=OFF; PRAGMA synchronous=OFF;" + _SCHEMA)
+        self._categories: Dict[str, int] = {}
+        self._products: List[Tuple[Any, ...]] = []
+        self._promotions: List[Tuple[Any, ...]] = []
+        self._rows: List[Tuple[Any, ...]] = []
+        self._pa = _columnar_module(columnar) if columnar != "none" else None
+        self.columnar = columnar if self._pa is not None else "none"
+        self._arrow_schema = self._schema() if self._pa is not None else None
+        self._col_tmp: Optional[str] = None
+        self._col_writer: Any = None
+        self._col_sink: Any = None
+        self._done = False
+
+    def _schema(self) -> Any:
+        pa = self._pa
+        return pa.schema([
+            ("id", pa.string()),
+            ("name", pa.string()),
+            ("category", pa.dictionary(pa.int32(), pa.string())),
+            ("price", pa.float64()),
+            ("base_price", pa.float64()),
+            ("is_promotion", pa.bool_()),
+            ("in_assortment", pa.bool_()),
+            ("offer_price", pa.float64()),
+            ("promo_text", pa.string()),
+            ("valid_until", pa.date32()),
+            ("unit", pa.string()),
+            ("image_url", pa.string()),
+        ])
+
+    def add(self, item: Dict[str, Any], product: ProductRecord) -> None:
+        category = item.get("category") or "autres"
+        category_id = self._categories.get(category)
+        if category_id is None:
+            category_id = self._categories[category] = len(self._categories) + 1
+            self._db.execute("INSERT INTO categories (id, name) VALUES (?, ?)", (category_id, category))
+        price = to_float(item.get("price"))
+        base_price = to_float(product.base_price)
+        offer_price = to_float(product.offer_price)
+        valid_until = to_date(product.valid_until)
+        self._products.append((item["id"], item.get("name") or "", category_id, price, base_price,
+                               bool(item.get("is_promotion")), product.in_assortment, item.get("unit"), item.get("image_url")))
+        if product.offer:
+            self._promotions.append((item["id"], offer_price, item.get("promo_text"),
+                                     valid_until.isoformat() if valid_until else None))
+        if self._pa is not None:
+            self._rows.append((item["id"], item.get("name") or "", category, price, base_price, bool(item.get("is_promotion")),
+                               product.in_assortment, offer_price, item.get("promo_text"), valid_until,
+                               item.get("unit"), item.get("image_url")))
+        self.count += 1
+        if len(self._products) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._products:
+            self._db.executemany("INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._products)
+            self._products.clear()
+        if self._promotions:
+            self._db.executemany("INSERT INTO promotions VALUES (?, ?, ?, ?)", self._promotions)
+            self._promotions.clear()
+        if self._rows:
+            pa = self._pa
+            columns = list(zip(*self._rows))
+            schema = self._arrow_schema
+            batch = pa.record_batch([pa.array(col, type=f.type) if not pa.types.is_dictionary(f.type)
+                                     else pa.array(col, type=pa.string()).dictionary_encode()
+                                     for col, f in zip(columns, schema)], schema=schema)
+            self._columnar_writer(schema).write_batch(batch)
+            self._rows.clear()
+
+    def _columnar_writer(self, schema: Any) -> Any:
+        if self._col_writer is None:
+            fd, self._col_tmp = tempfile.mkstemp(dir=self.out_dir, suffix=".columnar.part")
+            os.close(fd)
+            if self.columnar == "parquet":
+                self._col_writer = self._pa.parquet.ParquetWriter(self._col_tmp, schema, compression="zstd")
+            else:
+                self._col_sink = self._pa.OSFile(self._col_tmp, "wb")
+                self._col_writer = self._pa.ipc.new_stream(self._col_sink, schema)
+        return self._col_writer
+
+    def commit(self, meta: Dict[str, Any]) -> Dict[str, int]:
+        """Build indexes, write meta and move the files into place; returns their sizes in bytes."""
+        self._flush()
+        self._db.executescript(_INDEXES)
+        self._db.executemany("INSERT INTO meta VALUES (?, ?)", [(k, json.dumps(v, ensure_ascii=False)) for k, v in meta.items()])
+        self._db.commit()
+        self._db.execute("ANALYZE")
+        self._db.close()
+        written: Dict[str, int] = {}
+        db_path = os.path.join(self.out_dir, SQLITE_FILE)
+        os.replace(self._db_tmp, db_path)
+        written[SQLITE_FILE] = os.path.getsize(db_path)
+        if self._pa is not None:
+            self._columnar_writer(self._arrow_schema)
+            self._close_columnar()
+            name = COLUMNAR_FILES[self.columnar]
+            os.replace(self._col_tmp, os.path.join(self.out_dir, name))
+            written[name] = os.path.getsize(os.path.join(self.out_dir, name))
+        self._done = True
+        utils.log_event("info", "analytics_written", total=self.count, files=written)
+        return written
+
+    def _close_columnar(self) -> None:
+        if self._col_writer is not None:
+            self._col_writer.close()
+            self._col_writer = None
+        if self._col_sink is not None:
+            self._col_sink.close()
+            self._col_sink = None
+
+    def abort(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        self._db.close()
+        self._close_columnar()
+        for path in (self._db_tmp, self._col_tmp):
+            if path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def __enter__(self) -> "AnalyticsWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.abort()
@@ -0,0 +1,104 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import requests
+
+from . import config, extractors, utils
+from .ratelimit import DeadlineExceeded, RateLimiter
+
+
+def page_params(filter_str: Optional[str], page: int, mode: Optional[str] = None) -> str:
+    """
+    Params string of one page query. In "lean" mode only LEAN_ATTRIBUTES
+    are retrieved, highlighting is off, the response is trimmed to the
+    fields pagination needs and the query is kept out of analytics.
+    """
+    lean: Dict[str, Any] = {}
+    if (mode or config.FETCH_MODE) == "lean":
+        lean = {
+            "attributesToRetrieve": json.dumps(extractors.LEAN_ATTRIBUTES, separators=(",", ":")),
+            "attributesToHighlight": "[]",
+            "responseFields": json.dumps(extractors.LEAN_RESPONSE_FIELDS, separators=(",", ":")),
+            "analytics": "false",
+        }
+    return utils.build_params(hitsPerPage=config.HITS_PER_PAGE, page=page, filters=filter_str or None, **lean)
+
+
+class PageQuery(NamedTuple):
+    """One (index, filter, page) sub-query of a multi-query body."""
+    index_name: str
+    filter_str: Optional[str]
+    page: int
+
+    def to_request(self) -> Dict[str, Any]:
+        return {"indexName": self.index_name, "params": page_params(self.filter_str, self.page)}
+
+
+def _is_failed_result(res: Any) -> bool:
+    # Algolia renvoie un objet sans "hits" (avec "message"/"status") pour une sous-requête en erreur
+    return not isinstance(res, dict) or "hits" not in res
+
+
+class QueryBatcher:
+    """
+    Packs many PageQuery objects into multi-query POST bodies.
+
+    Each entry of the response's results[] is routed back to the query at the
+    same position in requests[]. Sub-queries whose result is missing or
+    malformed (and every query of a batch whose POST failed) are re-issued in
+    the next round, up to max_rounds rounds; the others are not re-sent.
+    """
+
+    def __init__(self, session: requests.Session, batch_size: int = 50, max_rounds: int = 3,
+                 limiter: Optional[RateLimiter] = None, concurrent: bool = False):
+        self.session = session
+        self.batch_size = max(1, int(batch_size))
+        self.max_rounds = max(1, int(max_rounds))
+        self.limiter = limiter
+        self.concurrent = concurrent
+        self.requests_sent = 0
+
+    def _run_batch(self, batch: List[PageQuery]) -> Dict[PageQuery, Dict[str, Any]]:
+        body = {"requests": [q.to_request() for q in batch]}
+        self.requests_sent += 1
+        try:
+            data = utils.post_algolia_queries(self.session, body, limiter=self.limiter)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            utils.log_event("warning", "batch_query_error", size=len(batch), error=str(e))
+            return {}
+        results = data.get("results", [])
+        out: Dict[PageQuery, Dict[str, Any]] = {}
+        for q, res in zip(batch, results):
+            if _is_failed_result(res):
+                utils.log_event("warning", "batch_subquery_error", index=q.index_name, filter=q.filter_str or "none", page=q.page)
+                continue
+            out[q] = res
+        return out
+
+    def run(self, queries: List[PageQuery]) -> Dict[PageQuery, Dict[str, Any]]:
+        """
+        Execute all queries and return {query: result}. Queries still failing
+        after max_rounds are absent from the returned dict.
+        """
+        resolved: Dict[PageQuery, Dict[str, Any]] = {}
+        remaining = list(dict.fromkeys(queries))
+        for round_no in range(self.max_rounds):
+            if not remaining:
+                break
+            batches = [remaining[i:i + self.batch_size] for i in range(0, len(remaining), self.batch_size)]
+            utils.log_event("info", "batch_round_start", round=round_no + 1, queries=len(remaining), batches=len(batches))
+            if self.concurrent and len(batches) > 1:
+                workers = self.limiter.max_concurrency if self.limiter else 4
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    for out in pool.map(self._run_batch, batches):
+                        resolved.update(out)
+            else:
+                for batch in batches:
+                    resolved.update(self._run_batch(batch))
+            remaining = [q for q in remaining if q not in resolved]
+        if remaining:
+            utils.log_event("warning", "batch_queries_unresolved", count=len(remaining))
+        return resolved
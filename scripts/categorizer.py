@@ -0,0 +1,85 @@
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from . import utils
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "category_rules.json")
+
+
+class CategoryEngine:
+    """
+    Rule-based categoriser compiled once from a rules file.
+
+    1. hierarchicalCategories levels (deepest first) are looked up in the
+       rules' hierarchy map; the first mapped label wins.
+    2. Otherwise the accent-folded name is matched against every keyword in
+       one combined regex with word boundaries (a trailing "s"/"x" plural is
+       accepted). When several keywords match, the rule listed first in the
+       file wins, as with the former per-call dict.
+    3. Otherwise the default category.
+
+    Keyword results are memoised per folded name.
+    """
+
+    def __init__(self, rules: Dict[str, Any]):
+        self.default = rules.get("default", "autres")
+        hierarchy = rules.get("hierarchy", {})
+        self.levels: List[str] = list(hierarchy.get("levels", []))
+        self.hierarchy_map: Dict[str, str] = {utils.fold(k).strip(): v for k, v in hierarchy.get("map", {}).items()}
+        self.categories: List[str] = []
+        alternatives: List[str] = []
+        for rule_no, rule in enumerate(rules.get("keywords", [])):
+            self.categories.append(rule["category"])
+            terms = sorted({utils.fold(t) for t in rule["terms"]}, key=len, reverse=True)
+            alternatives.append(f"(?P<r{rule_no}>" + "|".join(re.escape(t) for t in terms) + ")")
+        self._pattern = re.compile(r"\b(?:" + "|".join(alternatives) + r")(?:s|x)?\b") if alternatives else None
+        self._memo: Dict[str, str] = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> "CategoryEngine":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def from_hierarchy(self, raw: Optional[Dict[str, Any]]) -> Optional[str]:
+        if not raw or not self.levels:
+            return None
+        for level in self.levels:
+            label = utils.hierarchy_category(raw, level)
+            if label:
+                mapped = self.hierarchy_map.get(utils.fold(label).strip())
+                if mapped:
+                    return mapped
+        return None
+
+    def from_name(self, name: str) -> str:
+        key = utils.fold(name or "")
+        cached = self._memo.get(key)
+        if cached is not None:
+            return cached
+        best: Optional[int] = None
+        if self._pattern is not None:
+            for m in self._pattern.finditer(key):
+                rule_no = int(m.lastgroup[1:])
+                if best is None or rule_no < best:
+                    best = rule_no
+                    if best == 0:
+                        break
+        result = self.categories[best] if best is not None else self.default
+        self._memo[key] = result
+        return result
+
+    def categorize(self, name: str, raw: Optional[Dict[str, Any]] = None) -> str:
+        return self.from_hierarchy(raw) or self.from_name(name)
+
+
+_ENGINES: Dict[str, CategoryEngine] = {}
+
+
+def get_engine(path: Optional[str] = None) -> CategoryEngine:
+    """Compiled engine for a rules file, built once per process."""
+    path = path or DEFAULT_RULES_PATH
+    if path not in _ENGINES:
+        _ENGINES[path] = CategoryEngine.from_file(path)
+    return _ENGINES[path]
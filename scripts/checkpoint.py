@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import config, utils
+
+JOURNAL_VERSION = 1
+JOURNAL_FILE = "journal.jsonl"
+
+PageKey = Tuple[str, Optional[str], int]
+UnitKey = Tuple[str, Optional[str]]
+
+
+def fingerprint() -> str:
+    """Settings that change what a page contains; a journal written under others is not resumed."""
+    raw = json.dumps([config.ALGOLIA_APP_ID, config.ASSORTMENT_INDEX, config.OFFERS_INDEX,
+                      config.HITS_PER_PAGE, config.FETCH_MODE], separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class RunJournal:
+    """
+    Append-only journal of the (index, filter, page) units of a run.
+
+    Every fetched page is appended to <dir>/journal.jsonl with its hits and
+    nbPages as soon as it arrives, and every failed page with its error.
+    A resumed run loads the completed pages of the previous journal and
+    serves them instead of querying Algolia; failures are not carried
+    over, so only missing or failed pages are fetched again. The journal
+    is removed once a run completes without incomplete units (see
+    UnitProgress).
+    """
+
+    def __init__(self, directory: str, resume: bool = False, max_age_seconds: Optional[float] = None):
+        self.directory = directory
+        self.path = os.path.join(directory, JOURNAL_FILE)
+        self.pages: Dict[PageKey, Dict[str, Any]] = {}
+        self.resumed = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        if resume:
+            self._load(max_age_seconds)
+        self._file = open(self.path, "a" if self.pages else "w", encoding="utf-8")
+        if not self.pages:
+            self._append({"version": JOURNAL_VERSION, "fingerprint": fingerprint(), "started": time.time()})
+
+    def _load(self, max_age_seconds: Optional[float]) -> None:
+        if not os.path.exists(self.path):
+            utils.log_event("info", "checkpoint_nothing_to_resume", path=self.path)
+            return
+        pages: Dict[PageKey, Dict[str, Any]] = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            header: Dict[str, Any] = {}
+            for n, line in enumerate(f):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Dernière ligne tronquée par un run interrompu
+                    break
+                if n == 0:
+                    header = entry
+                    continue
+                if "hits" in entry:
+                    pages[(entry["index"], entry["filter"], entry["page"])] = {"hits": entry["hits"], "nbPages": entry["nbPages"]}
+        reason = None
+        if header.get("version") != JOURNAL_VERSION or header.get("fingerprint") != fingerprint():
+            reason = "settings_changed"
+        elif max_age_seconds and time.time() - header.get("started", 0) > max_age_seconds:
+            reason = "too_old"
+        if reason is not None:
+            utils.log_event("warning", "checkpoint_discarded", path=self.path, reason=reason)
+            return
+        self.pages = pages
+        utils.log_event("info", "checkpoint_resumed", path=self.path, pages=len(pages))
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def get(self, index_name: str, filter_str: Optional[str], page: int) -> Optional[Dict[str, Any]]:
+        """Journaled result ({"hits", "nbPages"}) of a page, if a previous attempt completed it."""
+        with self._lock:
+            res = self.pages.get((index_name, filter_str, page))
+            if res is not None:
+                self.resumed += 1
+            return res
+
+    def record(self, index_name: str, filter_str: Optional[str], page: int, res: Dict[str, Any]) -> None:
+        entry = {"index": index_name, "filter": filter_str, "page": page,
+                 "nbPages": int(res.get("nbPages", 1)), "hits": res.get("hits", [])}
+        with self._lock:
+            self.pages[(index_name, filter_str, page)] = {"hits": entry["hits"], "nbPages": entry["nbPages"]}
+            self._append(entry)
+
+    def fail(self, index_name: str, filter_str: Optional[str], page: int, error: str) -> None:
+        with self._lock:
+            self._append({"index": index_name, "filter": filter_str, "page": page, "error": error})
+
+    def close(self, completed: bool) -> None:
+        """Close the journal; delete it when the run completed, keep it for --resume otherwise."""
+        with self._lock:
+            self._file.close()
+        if completed:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class UnitProgress:
+    """
+    Planned (index, filter) units of a run and how each one ended, kept by
+    the scraper whether or not a journal is written.
+
+    A unit is complete once its pagination ran to the end, failed at the
+    first page that could not be fetched, and unfinished when it was
+    planned but never completed, e.g. because the deadline stopped the run.
+    """
+
+    def __init__(self) -> None:
+        self.planned: Dict[UnitKey, None] = {}
+        self.completed: Set[UnitKey] = set()
+        self.failed: Dict[UnitKey, Tuple[int, str]] = {}
+        self._lock = threading.Lock()
+
+    def plan(self, index_name: str, filters: Iterable[Optional[str]]) -> None:
+        with self._lock:
+            for filter_str in filters:
+                self.planned.setdefault((index_name, filter_str), None)
+
+    def complete(self, index_name: str, filter_str: Optional[str]) -> None:
+        with self._lock:
+            self.planned.setdefault((index_name, filter_str), None)
+            self.completed.add((index_name, filter_str))
+
+    def fail(self, index_name: str, filter_str: Optional[str], page: int, error: str) -> None:
+        unit = (index_name, filter_str)
+        with self._lock:
+            self.planned.setdefault(unit, None)
+            if unit not in self.failed or page < self.failed[unit][0]:
+                self.failed[unit] = (page, error)
+
+    def incomplete(self) -> List[Dict[str, Any]]:
+        """Failed units with their first failed page and error, then unfinished ones (page None), in plan order."""
+        with self._lock:
+            failed = [
+                {"index": unit[0], "filter": unit[1], "page": self.failed[unit][0], "error": self.failed[unit][1]}
+                for unit in self.planned if unit in self.failed
+            ]
+            unfinished = [
+                {"index": unit[0], "filter": unit[1], "page": None, "error": "not completed"}
+                for unit in self.planned if unit not in self.failed and unit not in self.completed
+            ]
+        return failed + unfinished
@@ -0,0 +1,231 @@
+import gzip
+import io
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import utils
+
+FORMAT_VERSION = 2
+COMPACT_FILE = "products-min.v2.json"
+# Ordre des champs d'un produit de products-min.json (v1)
+FIELDS = ("id", "name", "price", "category", "image_url", "is_promotion", "promo_text", "valid_until", "unit")
+DICT_FIELDS = ("category", "unit", "valid_until")
+BOOL_FIELDS = ("is_promotion",)
+URL_FIELDS = ("image_url",)
+_AEM_MARKER = "/_jcr_content/"
+
+
+def split_url(url: Any, pid: str) -> Tuple[Optional[str], Any, Optional[str]]:
+    """
+    (prefix, stem, suffix) with prefix + stem + suffix == url. The suffix is
+    the last /_jcr_content/ rendition path; the prefix is everything before
+    the product's own path (its objectID with '-' as '/') or, failing that,
+    the directory of the asset. Non-string values go to the stem as is.
+    """
+    if not isinstance(url, str):
+        return None, url, None
+    last = url.rfind(_AEM_MARKER)
+    suffix = url[last:] if last > url.find(_AEM_MARKER) else ""
+    body = url[:len(url) - len(suffix)]
+    cut = body.find(_AEM_MARKER)
+    head = body[:cut] if cut >= 0 else body
+    id_path = "/" + pid.replace("-", "/")
+    if cut >= 0 and head.endswith(id_path):
+        prefix = head[:len(head) - len(id_path) + 1]
+    else:
+        prefix = head[:head.rfind("/") + 1]
+    return prefix, body[len(prefix):], suffix
+
+
+class _Dictionary:
+    """Distinct values in first-seen order, so that the encoding is deterministic."""
+
+    def __init__(self) -> None:
+        self.values: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+
+    def code(self, value: Any) -> Optional[int]:
+        if value is None:
+            return None
+        # Clé typée: "1" et 1, True et 1 ne doivent pas partager une entrée
+        key = (type(value).__name__, json.dumps(value, sort_keys=True))
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class CompactMinBuilder:
+    """
+    Builds the v2 compact form of products-min.json: products as parallel
+    columns instead of an array of objects, with repeated strings
+    (categories, units, validity dates, image URL prefixes and suffixes)
+    dictionary-encoded. decode() rebuilds the v1 document exactly.
+
+    write() publishes products-min.v2.json and its precompressed .gz and
+    .br (when brotli is installed) next to it. All three are byte-for-byte
+    reproducible from the same products and meta; when the products match
+    the published file, its meta is kept and nothing is rewritten.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.columns: Dict[str, Any] = {}
+        self.dicts: Dict[str, _Dictionary] = {}
+        for field in FIELDS:
+            if field in URL_FIELDS:
+                self.columns[field] = {"prefix": [], "stem": [], "suffix": []}
+                self.dicts[field + ".prefix"] = _Dictionary()
+                self.dicts[field + ".suffix"] = _Dictionary()
+            else:
+                self.columns[field] = []
+                if field in DICT_FIELDS:
+                    self.dicts[field] = _Dictionary()
+
+    def add(self, item: Dict[str, Any]) -> None:
+        pid = str(item["id"])
+        for field in FIELDS:
+            value = item.get(field)
+            column = self.columns[field]
+            if field in URL_FIELDS:
+                prefix, stem, suffix = split_url(value, pid)
+                column["prefix"].append(self.dicts[field + ".prefix"].code(prefix))
+                column["stem"].append(stem)
+                column["suffix"].append(self.dicts[field + ".suffix"].code(suffix))
+            elif field in DICT_FIELDS:
+                column.append(self.dicts[field].code(value))
+            elif field in BOOL_FIELDS:
+                column.append(None if value is None else int(bool(value)))
+            else:
+                column.append(value)
+        self.count += 1
+
+    def document(self, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return {
+            "format": "products-min",
+            "version": FORMAT_VERSION,
+            "meta": meta or {},
+            "count": self.count,
+            "fields": list(FIELDS),
+            "encodings": {
+                **{f: "dict" for f in DICT_FIELDS},
+                **{f: "bool" for f in BOOL_FIELDS},
+                **{f: "url" for f in URL_FIELDS},
+            },
+            "dicts": {name: d.values for name, d in self.dicts.items()},
+            "columns": self.columns,
+        }
+
+    def write(self, out_dir: str, meta: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """Write the compact JSON and its precompressed artifacts; returns their sizes in bytes."""
+        path = os.path.join(out_dir, COMPACT_FILE)
+        doc = self.document(meta)
+        data = _dumps(doc)
+        previous = _read(path)
+        if previous is not None and previous != data:
+            try:
+                # Mêmes produits: garder le meta publié (last_updated compris)
+                kept = _dumps({**doc, "meta": json.loads(previous).get("meta", {})})
+            except (ValueError, AttributeError):
+                kept = None
+            if kept == previous:
+                data = kept
+        sizes = write_artifacts(path, data)
+        utils.log_event("info", "compact_min_written", total=self.count, **{k.replace(".", "_"): v for k, v in sizes.items()})
+        return sizes
+
+
+def _dumps(doc: Dict[str, Any]) -> bytes:
+    return json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _brotli_module() -> Any:
+    """brotli (optional dependency) or None, with a warning when it is missing."""
+    try:
+        import brotli
+    except ImportError:
+        utils.log_event("warning", "compact_brotli_skipped", reason="brotli is not installed")
+        return None
+    return brotli
+
+
+def gzip_bytes(data: bytes, level: int = 9) -> bytes:
+    """gzip without file name and with a zero mtime, so the output only depends on data."""
+    buf = io.BytesIO()
+    with gzip.GzipFile(filename="", mode="wb", compresslevel=level, fileobj=buf, mtime=0) as f:
+        f.write(data)
+    return buf.getvalue()
+
+
+def _replace(path: str, data: bytes) -> int:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def write_artifacts(path: str, data: bytes) -> Dict[str, int]:
+    """
+    path, path.gz and path.br (if brotli is available), each replaced
+    atomically. Left untouched when path already holds data and the
+    compressed files exist, since they only depend on data.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    brotli = _brotli_module()
+    names = {"json": path, "gz": path + ".gz", **({"br": path + ".br"} if brotli is not None else {})}
+    if _read(path) == data and all(os.path.exists(p) for p in names.values()):
+        return {k: os.path.getsize(p) for k, p in names.items()}
+    sizes = {"json": _replace(path, data), "gz": _replace(path + ".gz", gzip_bytes(data))}
+    if brotli is not None:
+        sizes["br"] = _replace(path + ".br", brotli.compress(data, quality=11))
+    elif os.path.exists(path + ".br"):
+        # Un .br d'une version précédente ne correspondrait plus au .json
+        os.remove(path + ".br")
+    return sizes
+
+
+def decode(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the v1 {"meta", "products"} document from a v2 compact one."""
+    if doc.get("format") != "products-min" or doc.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compact format {doc.get('format')} v{doc.get('version')}")
+    dicts, encodings = doc["dicts"], doc["encodings"]
+    columns = []
+    for field in doc["fields"]:
+        column, encoding = doc["columns"][field], encodings.get(field)
+        if encoding == "dict":
+            values = dicts[field]
+            column = [None if c is None else values[c] for c in column]
+        elif encoding == "bool":
+            column = [None if v is None else bool(v) for v in column]
+        elif encoding == "url":
+            prefixes, suffixes = dicts[field + ".prefix"], dicts[field + ".suffix"]
+            column = [
+                stem if p is None else prefixes[p] + stem + suffixes[s]
+                for p, stem, s in zip(column["prefix"], column["stem"], column["suffix"])
+            ]
+        columns.append(column)
+    fields = doc["fields"]
+    return {"meta": doc["meta"], "products": [dict(zip(fields, row)) for row in zip(*columns)]}
+
+
+def load(path: str) -> Dict[str, Any]:
+    """Read a compact file (.json, .json.gz or .json.br) and decode it to the v1 shape."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".gz"):
+        data = gzip.decompress(data)
+    elif path.endswith(".br"):
+        import brotli
+        data = brotli.decompress(data)
+    return decode(json.loads(data))
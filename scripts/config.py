@@ -29,31 +29,153 @@ def _load_env_file() -> None:
 _load_env_file()
 
 ALGOLIA_APP_ID = os.getenv("ALGOLIA_APP_ID", "W297XVTVRZ")
+# Required for the live service only (checked when a session is created)
 ALGOLIA_API_KEY = os.getenv("ALGOLIA_API_KEY")
-if ALGOLIA_API_KEY is None:
-    raise RuntimeError("Missing ALGOLIA_API_KEY environment variable.")
 
-ALGOLIA_HOST = f"https://{ALGOLIA_APP_ID}-dsn.algolia.net"
+DEFAULT_ALGOLIA_HOST = f"https://{ALGOLIA_APP_ID}-dsn.algolia.net"
+# Point at a local stand-in (python -m scripts.standin) to replay a catalog offline
+ALGOLIA_HOST = os.getenv("ALGOLIA_HOST") or DEFAULT_ALGOLIA_HOST
+
+# Recording - capture every hit received into this catalog file, replayable by scripts.standin
+RECORD_CATALOG = os.getenv("RECORD_CATALOG") or None
 
 ASSORTMENT_INDEX = os.getenv("ASSORTMENT_INDEX", "prod_be_fr_assortment")
 OFFERS_INDEX = os.getenv("OFFERS_INDEX", "prod_be_fr_offers")
 
+# Multi-target mode - JSON list of markets/locales (indices, filter plan, out_dir)
+# scraped concurrently over one session and rate budget; unset = single target above
+TARGETS_FILE = os.getenv("TARGETS_FILE") or None
+# Products present in several targets, linked by objectID
+LOCALE_LINKS_FILE = os.getenv("LOCALE_LINKS_FILE", "data/locales.json")
+
 HITS_PER_PAGE = int(os.getenv("HITS_PER_PAGE", "1000"))
+
+# Fetch mode - "full" retrieves every stored attribute (full-fidelity products.json);
+# "lean" only retrieves the attributes the min pipeline reads, without highlights
+FETCH_MODE = os.getenv("FETCH_MODE", "full").lower()
+if FETCH_MODE not in ("full", "lean"):
+    raise RuntimeError(f"Invalid FETCH_MODE {FETCH_MODE!r} (expected 'full' or 'lean').")
 GLOBAL_TIMEOUT_SECONDS = int(os.getenv("GLOBAL_TIMEOUT_SECONDS", "300"))
 
+# Logging - events below LOG_LEVEL are dropped; LOG_BUFFER_LINES > 0 writes
+# events in blocks of that many lines (errors and the end of the run flush)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info").lower()
+if LOG_LEVEL not in ("debug", "info", "warning", "error"):
+    raise RuntimeError(f"Invalid LOG_LEVEL {LOG_LEVEL!r} (expected debug, info, warning or error).")
+LOG_BUFFER_LINES = int(os.getenv("LOG_BUFFER_LINES", "0"))
+
+# Checkpoints - journal every fetched page to CHECKPOINT_DIR so that an
+# interrupted or incomplete run can be finished with --resume
+RUN_CHECKPOINTS = os.getenv("RUN_CHECKPOINTS", "false").lower() == "true"
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", ".checkpoint")
+CHECKPOINT_MAX_AGE_HOURS = float(os.getenv("CHECKPOINT_MAX_AGE_HOURS", "24"))
+
+# Run telemetry - JSON run report and Prometheus textfile written at the end of every run
+RUN_REPORT = os.getenv("RUN_REPORT") or None
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE") or None
+
 MIN_PRODUCTS = int(os.getenv("MIN_PRODUCTS", "400"))
 MAX_PRODUCTS = int(os.getenv("MAX_PRODUCTS", "10000"))
 
 SCHEMA_VERSION = os.getenv("SCHEMA_VERSION", "1.0.0")
 
-# Pagination settings - simulate human behavior and avoid rate limits
-PAGE_DELAY_MIN_MS = int(os.getenv("PAGE_DELAY_MIN_MS", "300"))
-PAGE_DELAY_MAX_MS = int(os.getenv("PAGE_DELAY_MAX_MS", "900"))
+# Categorisation rules (hierarchy map + keywords); empty = scripts/category_rules.json
+CATEGORY_RULES_PATH = os.getenv("CATEGORY_RULES_PATH") or None
+
+# promo_text as received (HTML, the published format) or as plain text (tags dropped, entities decoded)
+PROMO_TEXT_FORMAT = os.getenv("PROMO_TEXT_FORMAT", "html").lower()
+if PROMO_TEXT_FORMAT not in ("html", "text"):
+    raise RuntimeError(f"Invalid PROMO_TEXT_FORMAT {PROMO_TEXT_FORMAT!r} (expected 'html' or 'text').")
+
+# Streaming pipeline - hits flow from fetch to disk without holding the catalog in memory
+STREAMING_PIPELINE = os.getenv("STREAMING_PIPELINE", "true").lower() == "true"
+
+# Transform stage (min projection, categorisation, promo text) on a process
+# pool of TRANSFORM_WORKERS (0/1 = in-process), in chunks of TRANSFORM_CHUNK_SIZE
+TRANSFORM_WORKERS = int(os.getenv("TRANSFORM_WORKERS", "0"))
+TRANSFORM_CHUNK_SIZE = int(os.getenv("TRANSFORM_CHUNK_SIZE", "2000"))
+
+# Incremental runs - compare product hashes with the previous run, write
+# data/changes/<timestamp>.json deltas and leave unchanged files untouched
+INCREMENTAL_RUNS = os.getenv("INCREMENTAL_RUNS", "false").lower() == "true"
+DELTA_STATE_FILE = os.getenv("DELTA_STATE_FILE", "product-hashes.json")
+DELTA_RETENTION = int(os.getenv("DELTA_RETENTION", "20"))
+
+# Price history - append one (price, is_promotion, valid_until) sample per product per run
+PRICE_HISTORY = os.getenv("PRICE_HISTORY", "false").lower() == "true"
+HISTORY_DIR = os.getenv("HISTORY_DIR", "history")
+HISTORY_COMPACT_EVERY = int(os.getenv("HISTORY_COMPACT_EVERY", "10"))
+
+# Sharded output - per-category and per-page content-addressed files + manifest.json
+SHARDED_OUTPUT = os.getenv("SHARDED_OUTPUT", "false").lower() == "true"
+SHARDS_DIR = os.getenv("SHARDS_DIR", "shards")
+# Les shards obsolètes sont supprimés de ce dossier: jamais data/ lui-même ni hors de data/
+if (not SHARDS_DIR or os.path.isabs(SHARDS_DIR)
+        or os.path.normpath(SHARDS_DIR) == "." or ".." in os.path.normpath(SHARDS_DIR).split(os.sep)):
+    raise RuntimeError(f"Invalid SHARDS_DIR {SHARDS_DIR!r} (expected a subdirectory of the output directory).")
+SHARD_PAGE_SIZE = int(os.getenv("SHARD_PAGE_SIZE", "200"))
+SHARD_HIERARCHY_LEVEL = os.getenv("SHARD_HIERARCHY_LEVEL", "lvl3")
+
+# Analytics export - indexed SQLite database + typed columnar file (parquet,
+# arrow or none; needs pyarrow) written in the pipeline's streaming pass
+ANALYTICS_EXPORT = os.getenv("ANALYTICS_EXPORT", "false").lower() == "true"
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", "analytics")
+ANALYTICS_COLUMNAR = os.getenv("ANALYTICS_COLUMNAR", "parquet").lower()
+
+# Compact v2 min catalog (columns + dictionary-encoded strings) published
+# with deterministic .gz/.br artifacts (.br needs brotli)
+COMPACT_OUTPUT = os.getenv("COMPACT_OUTPUT", "false").lower() == "true"
+
+# Static search index over product names and promo texts
+SEARCH_INDEX = os.getenv("SEARCH_INDEX", "false").lower() == "true"
+SEARCH_INDEX_DIR = os.getenv("SEARCH_INDEX_DIR", "search")
+
+# Ces sorties ne sont produites que par le pipeline en streaming
+_STREAMING_ONLY = [name for name, enabled in (
+    ("INCREMENTAL_RUNS", INCREMENTAL_RUNS),
+    ("PRICE_HISTORY", PRICE_HISTORY),
+    ("SHARDED_OUTPUT", SHARDED_OUTPUT),
+    ("SEARCH_INDEX", SEARCH_INDEX),
+) if enabled]
+if _STREAMING_ONLY and not STREAMING_PIPELINE:
+    raise RuntimeError(f"STREAMING_PIPELINE=true is required by {', '.join(_STREAMING_ONLY)}.")
+
+# Pagination settings
 MAX_PAGES_SAFETY_LIMIT = int(os.getenv("MAX_PAGES_SAFETY_LIMIT", "100"))
 
+# Adaptive rate limiting shared by every request path: the rate starts at
+# RATE_INITIAL_RPS, grows while responses are healthy and is cut on 429/5xx,
+# within [RATE_MIN_RPS, MAX_REQUESTS_PER_SECOND] (0 = no pacing)
+MAX_REQUESTS_PER_SECOND = float(os.getenv("MAX_REQUESTS_PER_SECOND", "20"))
+RATE_INITIAL_RPS = float(os.getenv("RATE_INITIAL_RPS", "2"))
+RATE_MIN_RPS = float(os.getenv("RATE_MIN_RPS", "0.5"))
+RATE_INCREASE_STEP = float(os.getenv("RATE_INCREASE_STEP", "0.25"))
+RATE_DECREASE_FACTOR = float(os.getenv("RATE_DECREASE_FACTOR", "0.5"))
+
+# Concurrent fetch mode - filters, pages and both indices fetched in parallel
+CONCURRENT_FETCH = os.getenv("CONCURRENT_FETCH", "false").lower() == "true"
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "4"))
+
+# Multi-query batching - pack many (index, filter, page) queries in one POST
+BATCH_QUERIES = os.getenv("BATCH_QUERIES", "false").lower() == "true"
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "50"))
+BATCH_MAX_ROUNDS = int(os.getenv("BATCH_MAX_ROUNDS", "3"))
+
 # Filtered queries configuration - bypass 1000-result limit
 USE_FILTERED_QUERIES = os.getenv("USE_FILTERED_QUERIES", "true").lower() == "true"
 
+# Facet-driven partitioning - build filters from facet counts instead of CATEGORY_FILTERS
+AUTO_PARTITION = os.getenv("AUTO_PARTITION", "false").lower() == "true"
+RESULT_CAP = int(os.getenv("RESULT_CAP", "1000"))
+PARTITION_FACETS = [
+    f.strip()
+    for f in os.getenv(
+        "PARTITION_FACETS",
+        "hierarchicalCategories.lvl3,hierarchicalCategories.lvl4",
+    ).split(",")
+    if f.strip()
+]
+
 # Category filters for lvl3 hierarchical categories
 # Each category will be queried separately, then deduplicated
 CATEGORY_FILTERS = [
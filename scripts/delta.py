@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from . import config, utils
+
+STATE_VERSION = 1
+
+
+def content_hash(value: Any) -> str:
+    """Stable short hash of a JSON-serialisable value (key order independent)."""
+    raw = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def load_state(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        utils.log_event("warning", "delta_state_unreadable", path=path, error=str(e))
+        return None
+    if state.get("version") != STATE_VERSION:
+        utils.log_event("warning", "delta_state_version_mismatch", path=path, version=state.get("version"))
+        return None
+    return state
+
+
+class ChangeTracker:
+    """
+    Hashes products as they stream through the pipeline and compares them
+    with the hashes stored by the previous run.
+
+    Each product gets a hash of its min item (what clients consume); the
+    added and changed min items are kept for the delta file. A digest per
+    output file covers the ordered product content of that file, so a file
+    whose products did not change can be left untouched.
+    """
+
+    FILES = ("products.json", "products-min.json")
+
+    def __init__(self, previous: Optional[Dict[str, Any]] = None):
+        self.previous = previous
+        self.prev_hashes: Dict[str, str] = previous.get("products", {}) if previous else {}
+        self.hashes: Dict[str, str] = {}
+        self.added: List[Dict[str, Any]] = []
+        self.changed: List[Dict[str, Any]] = []
+        self._digests = {name: hashlib.sha256() for name in self.FILES}
+
+    def add(self, product: Dict[str, Any], item: Dict[str, Any]) -> None:
+        pid = str(item["id"])
+        h = content_hash(item)
+        self.hashes[pid] = h
+        self._digests["products.json"].update(content_hash(product).encode("ascii"))
+        self._digests["products-min.json"].update(h.encode("ascii"))
+        if self.previous is None:
+            return
+        old = self.prev_hashes.get(pid)
+        if old is None:
+            self.added.append(item)
+        elif old != h:
+            self.changed.append(item)
+
+    @property
+    def removed(self) -> List[str]:
+        return [pid for pid in self.prev_hashes if pid not in self.hashes]
+
+    def file_digest(self, name: str) -> str:
+        return self._digests[name].hexdigest()[:16]
+
+    def file_unchanged(self, name: str) -> bool:
+        if self.previous is None:
+            return False
+        return self.previous.get("files", {}).get(name) == self.file_digest(name)
+
+    @property
+    def has_changes(self) -> bool:
+        return self.previous is None or any(not self.file_unchanged(name) for name in self.FILES)
+
+    def state(self, last_updated: str) -> Dict[str, Any]:
+        return {
+            "version": STATE_VERSION,
+            "last_updated": last_updated,
+            "files": {name: self.file_digest(name) for name in self.FILES},
+            "products": self.hashes,
+        }
+
+    def delta(self, last_updated: str) -> Dict[str, Any]:
+        removed = self.removed
+        return {
+            "meta": {
+                "schema_version": config.SCHEMA_VERSION,
+                "from": self.previous.get("last_updated") if self.previous else None,
+                "to": last_updated,
+                "added": len(self.added),
+                "changed": len(self.changed),
+                "removed": len(removed),
+            },
+            "added": self.added,
+            "changed": self.changed,
+            "removed": removed,
+        }
+
+
+def delta_filename(last_updated: str) -> str:
+    ts = datetime.fromisoformat(last_updated)
+    return ts.strftime("%Y%m%dT%H%M%SZ") + ".json"
+
+
+def write_delta(tracker: ChangeTracker, changes_dir: str, last_updated: str, retention: int) -> Optional[str]:
+    """
+    Write changes/<timestamp>.json and refresh changes/index.json, keeping
+    the `retention` most recent deltas. Returns the delta path, or None when
+    there is no previous run to diff against.
+    """
+    if tracker.previous is None:
+        return None
+    os.makedirs(changes_dir, exist_ok=True)
+    doc = tracker.delta(last_updated)
+    name = delta_filename(last_updated)
+    path = os.path.join(changes_dir, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False, separators=(",", ":"))
+
+    index_path = os.path.join(changes_dir, "index.json")
+    entries: List[Dict[str, Any]] = []
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                entries = json.load(f).get("deltas", [])
+        except (OSError, ValueError):
+            entries = []
+    entries = [e for e in entries if e.get("file") != name]
+    entries.append({"file": name, "bytes": os.path.getsize(path), **doc["meta"]})
+    entries.sort(key=lambda e: e["file"])
+    if retention > 0 and len(entries) > retention:
+        for old in entries[:-retention]:
+            try:
+                os.remove(os.path.join(changes_dir, old["file"]))
+            except OSError:
+                pass
+        entries = entries[-retention:]
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump({"deltas": entries}, f, ensure_ascii=False, indent=2)
+    return path
@@ -0,0 +1,199 @@
+import html
+import re
+from itertools import chain
+from operator import itemgetter
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+# Clés candidates, par ordre de priorité
+PRICE_KEYS = ("price", "currentPrice", "current_price", "priceValue", "sales_price", "offer_price", "salesPrice")
+PRICE_FORMATTED_KEYS = ("priceFormatted",)
+NAME_KEYS = ("productName", "name", "title", "label")
+IMAGE_KEYS = ("productPicture", "badgeRendition", "productPictureRenditions", "image_url", "image", "thumbnail", "mainImage", "images")
+UNIT_KEYS = ("unit", "unitSize", "size", "quantity", "net_weight", "salesUnitFormatted", "salesUnit2")
+VALID_UNTIL_KEYS = ("validUntil", "valid_to", "endDate", "promotion_end_date", "promo_end")
+PROMO_TEXT_KEYS = ("promoText", "promotionText", "description", "subtitle", "shortDescription", "longDescription")
+
+# Attributs lus par le pipeline min (extraction, catégorisation, shards): projection du mode lean
+LEAN_ATTRIBUTES = tuple(dict.fromkeys(
+    ("objectID", "hierarchicalCategories")
+    + PRICE_KEYS + PRICE_FORMATTED_KEYS + NAME_KEYS + IMAGE_KEYS + UNIT_KEYS + VALID_UNTIL_KEYS + PROMO_TEXT_KEYS
+))
+LEAN_RESPONSE_FIELDS = ("hits", "nbHits", "nbPages", "page")
+# Attributs lus par la projection min et le catégoriseur (prix et dates viennent du ProductRecord)
+TRANSFORM_ATTRIBUTES = tuple(dict.fromkeys(("hierarchicalCategories",) + NAME_KEYS + IMAGE_KEYS + UNIT_KEYS + PROMO_TEXT_KEYS))
+
+_LIST_ITEM_RE = re.compile(r"<\s*li\b[^>]*>", re.I)
+_BREAK_RE = re.compile(r"<\s*(?:br|/?p|/?div|/?ul|/?ol|/li|/?h[1-6]|/tr)\b[^>]*>", re.I)
+_TAG_RE = re.compile(r"<[^>]*>")
+
+
+def _first(d: Dict[str, Any], keys: Tuple[str, ...], default: Any = None) -> Any:
+    # Même règle que utils.get_first, mais les clés absentes de la forme sont déjà écartées
+    for k in keys:
+        v = d[k]
+        if v is not None and v != "":
+            return v
+    return default
+
+
+def first_image(v: Any) -> Any:
+    if isinstance(v, list) and v:
+        return v[0]
+    # Si c'est une string de renditions séparées par des virgules/espaces, prendre le premier URL
+    if isinstance(v, str):
+        # Certaines entrées contiennent "url 288w" -> ne garder que l'URL
+        return v.partition(",")[0].split(None, 1)[0]
+    return v
+
+
+def parse_formatted_price(pf: Any) -> Optional[float]:
+    if isinstance(pf, str):
+        try:
+            return float(pf.replace(",", "."))
+        except Exception:
+            return None
+    return None
+
+
+def html_to_text(v: Any) -> Any:
+    """
+    Plain text of an HTML promo text: entities decoded, paragraphs and
+    line breaks as newlines, list items as "- " lines, other tags dropped,
+    whitespace (including &nbsp;) collapsed. Non-strings are returned as is.
+    """
+    if not isinstance(v, str) or ("<" not in v and "&" not in v):
+        return v
+    text = _TAG_RE.sub("", _BREAK_RE.sub("\n", _LIST_ITEM_RE.sub("\n- ", v)))
+    lines = (" ".join(line.split()) for line in html.unescape(text).split("\n"))
+    return "\n".join(line for line in lines if line and line != "-")
+
+
+class ShapePlan:
+    """
+    Accessor plan for one hit shape (its ordered key tuple): for each field,
+    only the candidate keys the shape actually has, in priority order.
+    """
+
+    __slots__ = ("price_keys", "price_formatted_keys", "name_keys", "image_keys", "unit_keys",
+                 "valid_until_keys", "promo_text_keys")
+
+    def __init__(self, shape: Tuple[str, ...]):
+        present = set(shape)
+        self.price_keys = tuple(k for k in PRICE_KEYS if k in present)
+        self.price_formatted_keys = tuple(k for k in PRICE_FORMATTED_KEYS if k in present)
+        self.name_keys = tuple(k for k in NAME_KEYS if k in present)
+        self.image_keys = tuple(k for k in IMAGE_KEYS if k in present)
+        self.unit_keys = tuple(k for k in UNIT_KEYS if k in present)
+        self.valid_until_keys = tuple(k for k in VALID_UNTIL_KEYS if k in present)
+        self.promo_text_keys = tuple(k for k in PROMO_TEXT_KEYS if k in present)
+
+    def price(self, d: Dict[str, Any]) -> Any:
+        v = _first(d, self.price_keys)
+        if v is None and self.price_formatted_keys:
+            pf = _first(d, self.price_formatted_keys)
+            if isinstance(pf, str):
+                return parse_formatted_price(pf)
+        return v
+
+    def name(self, d: Dict[str, Any]) -> Any:
+        return _first(d, self.name_keys, "")
+
+    def image(self, d: Dict[str, Any]) -> Any:
+        return first_image(_first(d, self.image_keys))
+
+    def unit(self, d: Dict[str, Any]) -> Any:
+        return _first(d, self.unit_keys)
+
+    def valid_until(self, d: Dict[str, Any]) -> Any:
+        return _first(d, self.valid_until_keys)
+
+    def promo_text(self, d: Dict[str, Any]) -> Any:
+        return _first(d, self.promo_text_keys)
+
+
+def _column(run: List[Dict[str, Any]], keys: Tuple[str, ...], default: Any = None) -> List[Any]:
+    """First non-empty value of `keys` for every hit of a same-shape run."""
+    if not keys:
+        return [default] * len(run)
+    col = list(map(itemgetter(keys[0]), run))
+    # Le test d'appartenance tourne en C: la boucle Python ne sert que s'il y a des trous
+    if None in col or "" in col:
+        rest = keys[1:]
+        for i, v in enumerate(col):
+            if v is None or v == "":
+                col[i] = _first(run[i], rest, default)
+    return col
+
+
+class ShapeExtractor:
+    """
+    Caches one ShapePlan per hit key set. Hits from the same index nearly
+    always share a shape, so the candidate-key probing is done once per
+    shape instead of once per hit and field.
+
+    extract_many() splits a stream of hits into runs of same-shape hits
+    (a C-level keys-view comparison per hit) and extracts each field of a
+    run column-wise with operator.itemgetter.
+    """
+
+    def __init__(self, max_shapes: int = 4096):
+        self.max_shapes = max_shapes
+        self._plans: Dict[FrozenSet[str], ShapePlan] = {}
+
+    @property
+    def shapes(self) -> int:
+        return len(self._plans)
+
+    def plan(self, d: Dict[str, Any]) -> ShapePlan:
+        shape = frozenset(d)
+        p = self._plans.get(shape)
+        if p is None:
+            if len(self._plans) >= self.max_shapes:
+                self._plans.clear()
+            p = self._plans[shape] = ShapePlan(tuple(d))
+        return p
+
+    def min_fields(self, d: Dict[str, Any]) -> Tuple[Any, Any, Any, Any, Any]:
+        """(name, price, image, promo_text, unit) of one hit."""
+        p = self.plan(d)
+        return p.name(d), p.price(d), p.image(d), p.promo_text(d), p.unit(d)
+
+    def _extract_run(self, p: ShapePlan, run: List[Dict[str, Any]]) -> Iterator[Tuple[Any, Any, Any, Any, Any]]:
+        prices = _column(run, p.price_keys)
+        if p.price_formatted_keys and None in prices:
+            for i, v in enumerate(prices):
+                if v is None:
+                    prices[i] = parse_formatted_price(_first(run[i], p.price_formatted_keys))
+        images = _column(run, p.image_keys)
+        if all(type(v) is str for v in images):
+            images = [v.partition(",")[0].split(None, 1)[0] for v in images]
+        else:
+            images = list(map(first_image, images))
+        return zip(
+            _column(run, p.name_keys, ""),
+            prices,
+            images,
+            _column(run, p.promo_text_keys),
+            _column(run, p.unit_keys),
+        )
+
+    def _runs(self, hits: Iterable[Dict[str, Any]], chunk_size: int) -> Iterator[Iterator[Tuple[Any, Any, Any, Any, Any]]]:
+        run: List[Dict[str, Any]] = []
+        append = run.append
+        ref: Any = None
+        p: Optional[ShapePlan] = None
+        for d in hits:
+            if run and (len(run) >= chunk_size or d.keys() != ref):
+                yield self._extract_run(p, run)
+                run = []
+                append = run.append
+            if not run:
+                p = self.plan(d)
+                ref = d.keys()
+            append(d)
+        if run:
+            yield self._extract_run(p, run)
+
+    def extract_many(self, hits: Iterable[Dict[str, Any]], chunk_size: int = 4096) -> Iterator[Tuple[Any, Any, Any, Any, Any]]:
+        """Batched min_fields over a stream of hits, in input order."""
+        return chain.from_iterable(self._runs(hits, chunk_size))
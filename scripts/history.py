@@ -0,0 +1,291 @@
+import json
+import math
+import os
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import utils
+
+# run index, product index, price (NaN = inconnu), valid_until index (0 = None), is_promotion
+RECORD = struct.Struct("<IIdIB")
+_CHUNK_RECORDS = 4096
+
+Sample = Tuple[str, Optional[float], bool, Optional[str]]
+Point = Tuple[str, Optional[float], bool, Optional[str]]
+
+
+class _StringTable:
+    """Append-only newline-separated string table; index 0 is reserved for None."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.values: List[Optional[str]] = [None]
+        self.index: Dict[str, int] = {}
+        self._pending: List[str] = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._add_loaded(json.loads(line))
+
+    def _add_loaded(self, value: str) -> None:
+        self.index[value] = len(self.values)
+        self.values.append(value)
+
+    def get(self, value: Optional[str]) -> Optional[int]:
+        if value is None:
+            return 0
+        return self.index.get(value)
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        idx = self.index.get(value)
+        if idx is None:
+            self._add_loaded(value)
+            self._pending.append(value)
+            idx = len(self.values) - 1
+        return idx
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            for value in self._pending:
+                f.write(json.dumps(value, ensure_ascii=False) + "\n")
+        self._pending = []
+
+
+class RunWriter:
+    """
+    Appends the samples of one run. Samples only become visible once
+    commit() records the run in runs.json; abort() truncates them away.
+    """
+
+    def __init__(self, history: "PriceHistory", timestamp: str):
+        self.history = history
+        self.timestamp = timestamp
+        self.run_index = len(history.runs)
+        self.count = 0
+        self._products = _StringTable(history.products_path)
+        self._strings = _StringTable(history.strings_path)
+        self._file = open(history.samples_path, "ab")
+        self._start = self._file.tell()
+        self._buf = bytearray()
+        self._done = False
+
+    def add(self, pid: str, price: Optional[float], is_promotion: bool, valid_until: Optional[str]) -> None:
+        price_value = float(price) if isinstance(price, (int, float)) else math.nan
+        vu = self._strings.intern(None if valid_until is None else str(valid_until))
+        self._buf += RECORD.pack(self.run_index, self._products.intern(str(pid)), price_value, vu, 1 if is_promotion else 0)
+        self.count += 1
+        if len(self._buf) >= RECORD.size * _CHUNK_RECORDS:
+            self._file.write(self._buf)
+            self._buf = bytearray()
+
+    def commit(self) -> int:
+        self._file.write(self._buf)
+        self._file.close()
+        self._products.flush()
+        self._strings.flush()
+        self.history.runs.append({"timestamp": self.timestamp, "offset": self._start, "count": self.count})
+        self.history._save_runs()
+        self._done = True
+        return self.run_index
+
+    def abort(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        self._file.close()
+        with open(self.history.samples_path, "r+b") as f:
+            f.truncate(self._start)
+
+    def __enter__(self) -> "RunWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.abort()
+
+
+class PriceHistory:
+    """
+    Append-only price history keyed by objectID.
+
+    Layout of the history directory:
+    - samples.bin: fixed-width records (run, product, price, valid_until,
+      is_promotion), appended run after run;
+    - products.txt / strings.txt: append-only tables mapping record indices
+      to objectIDs and valid_until values;
+    - runs.json: run timestamps with the byte offset and count of their samples.
+
+    Queries stream samples.bin in chunks, so memory grows with the number of
+    products, never with the number of runs. compact() drops samples equal to
+    the previous sample of the same product.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.samples_path = os.path.join(root, "samples.bin")
+        self.products_path = os.path.join(root, "products.txt")
+        self.strings_path = os.path.join(root, "strings.txt")
+        self.runs_path = os.path.join(root, "runs.json")
+        self.runs: List[Dict[str, Any]] = []
+        self._finish_compaction()
+        if os.path.exists(self.runs_path):
+            self.runs = self._load_runs(self.runs_path)
+        self._repair()
+
+    @staticmethod
+    def _load_runs(path: str) -> List[Dict[str, Any]]:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("runs", [])
+
+    @staticmethod
+    def _size_of(runs: List[Dict[str, Any]]) -> int:
+        if not runs:
+            return 0
+        last = runs[-1]
+        return last["offset"] + last["count"] * RECORD.size
+
+    def _committed_size(self) -> int:
+        return self._size_of(self.runs)
+
+    def _finish_compaction(self) -> None:
+        # compact() écrit runs.json.compact, remplace samples.bin puis runs.json:
+        # après un arrêt entre les deux, le runs.json.compact correspond à samples.bin
+        pending = self.runs_path + ".compact"
+        samples_tmp = self.samples_path + ".tmp"
+        if os.path.exists(pending):
+            try:
+                runs = self._load_runs(pending)
+            except (OSError, ValueError):
+                runs = None
+            swapped = not os.path.exists(samples_tmp) and os.path.exists(self.samples_path)
+            if runs is not None and swapped and self._size_of(runs) == os.path.getsize(self.samples_path):
+                utils.log_event("warning", "history_compaction_resumed", runs=len(runs))
+                os.replace(pending, self.runs_path)
+            else:
+                os.remove(pending)
+        if os.path.exists(samples_tmp):
+            os.remove(samples_tmp)
+
+    def _repair(self) -> None:
+        # Un run interrompu avant commit laisse des octets non référencés en fin de fichier
+        size = self._committed_size()
+        if os.path.exists(self.samples_path) and os.path.getsize(self.samples_path) > size:
+            utils.log_event("warning", "history_truncate_uncommitted", bytes=os.path.getsize(self.samples_path) - size)
+            with open(self.samples_path, "r+b") as f:
+                f.truncate(size)
+
+    def _write_runs(self, path: str, runs: List[Dict[str, Any]]) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"record_size": RECORD.size, "runs": runs}, f, ensure_ascii=False, indent=2)
+
+    def _save_runs(self) -> None:
+        tmp = self.runs_path + ".tmp"
+        self._write_runs(tmp, self.runs)
+        os.replace(tmp, self.runs_path)
+
+    def start_run(self, timestamp: str) -> RunWriter:
+        return RunWriter(self, timestamp)
+
+    def append_run(self, timestamp: str, samples: Iterable[Sample]) -> int:
+        with self.start_run(timestamp) as w:
+            for pid, price, is_promotion, valid_until in samples:
+                w.add(pid, price, is_promotion, valid_until)
+            return w.commit()
+
+    def _iter_records(self, start_offset: int = 0) -> Iterator[Tuple[int, int, float, int, int]]:
+        end = self._committed_size()
+        if not os.path.exists(self.samples_path) or start_offset >= end:
+            return
+        with open(self.samples_path, "rb") as f:
+            f.seek(start_offset)
+            remaining = end - start_offset
+            while remaining > 0:
+                chunk = f.read(min(remaining, RECORD.size * _CHUNK_RECORDS))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield from RECORD.iter_unpack(chunk)
+
+    def _point(self, strings: _StringTable, run: int, price: float, vu: int, promo: int) -> Point:
+        return (
+            self.runs[run]["timestamp"],
+            None if math.isnan(price) else price,
+            bool(promo),
+            strings.values[vu],
+        )
+
+    def series(self, pid: str) -> List[Point]:
+        """Price series of one product: (timestamp, price, is_promotion, valid_until)."""
+        product = _StringTable(self.products_path).get(str(pid))
+        if product is None:
+            return []
+        strings = _StringTable(self.strings_path)
+        return [
+            self._point(strings, run, price, vu, promo)
+            for run, p, price, vu, promo in self._iter_records()
+            if p == product
+        ]
+
+    def changed_in_last_runs(self, n: int) -> List[str]:
+        """
+        objectIDs whose price, promotion flag or valid_until changed during
+        the last n runs (compared with their previous sample).
+        """
+        if n <= 0 or not self.runs:
+            return []
+        first_run = max(0, len(self.runs) - n)
+        last: Dict[int, Tuple[bytes, int]] = {}
+        changed = set()
+        for run, p, price, vu, promo in self._iter_records():
+            key = struct.pack("<dIB", price, vu, promo)
+            prev = last.get(p)
+            if run >= first_run and prev is not None and prev[0] != key:
+                changed.add(p)
+            last[p] = (key, run)
+        products = _StringTable(self.products_path)
+        return sorted(products.values[p] for p in changed)
+
+    def compact(self) -> Tuple[int, int]:
+        """
+        Rewrite samples.bin without samples identical to the previous sample
+        of the same product. The first sample of every product is kept.
+        Returns (records before, records after).
+
+        The new runs.json is written before samples.bin is replaced, so an
+        interruption between the two replacements is finished on next load.
+        """
+        before = sum(r["count"] for r in self.runs)
+        tmp = self.samples_path + ".tmp"
+        last: Dict[int, bytes] = {}
+        counts = [0] * len(self.runs)
+        with open(tmp, "wb") as out:
+            buf = bytearray()
+            for record in self._iter_records():
+                run, p, price, vu, promo = record
+                key = struct.pack("<dIB", price, vu, promo)
+                if last.get(p) == key:
+                    continue
+                last[p] = key
+                counts[run] += 1
+                buf += RECORD.pack(*record)
+                if len(buf) >= RECORD.size * _CHUNK_RECORDS:
+                    out.write(buf)
+                    buf = bytearray()
+            out.write(buf)
+        runs = []
+        offset = 0
+        for run, count in zip(self.runs, counts):
+            runs.append({**run, "offset": offset, "count": count})
+            offset += count * RECORD.size
+        pending = self.runs_path + ".compact"
+        self._write_runs(pending, runs)
+        os.replace(tmp, self.samples_path)
+        os.replace(pending, self.runs_path)
+        self.runs = runs
+        after = sum(counts)
+        utils.log_event("info", "history_compacted", records_before=before, records_after=after)
+        return before, after
@@ -0,0 +1,255 @@
+import json
+import os
+import tempfile
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from . import analytics, compact, config, delta, history, search_index, shards, telemetry, utils, validators
+from .records import ProductRecord
+
+
+def _indent_json(value: Any, prefix: str) -> str:
+    return json.dumps(value, ensure_ascii=False, indent=2).replace("\n", "\n" + prefix)
+
+
+class JsonDocumentWriter:
+    """
+    Incremental writer for {"meta": {...}, "products": [...]} documents.
+
+    The output is byte-identical to json.dump(doc, ensure_ascii=False, indent=2).
+    Products are spooled to a temporary file next to the target so that meta,
+    only known once every product is written, still comes first. commit()
+    assembles the final file and moves it into place atomically; abort()
+    (or leaving the with-block on an exception) leaves the target untouched.
+    """
+
+    def __init__(self, path: str, list_key: str = "products"):
+        self.path = path
+        self.list_key = list_key
+        self.count = 0
+        self._dir = os.path.dirname(path) or "."
+        os.makedirs(self._dir, exist_ok=True)
+        self._body = tempfile.NamedTemporaryFile("w+", encoding="utf-8", dir=self._dir, suffix=".part", delete=False)
+        self._done = False
+
+    def write(self, item: Dict[str, Any]) -> None:
+        if self.count:
+            self._body.write(",\n")
+        self._body.write("    " + _indent_json(item, "    "))
+        self.count += 1
+
+    def commit(self, meta: Dict[str, Any]) -> int:
+        """Write the final document and return its size in bytes."""
+        tmp_path = self.path + ".tmp"
+        self._body.flush()
+        self._body.seek(0)
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            out.write('{\n  "meta": ' + _indent_json(meta, "  ") + f',\n  "{self.list_key}": [')
+            if self.count:
+                out.write("\n")
+                while True:
+                    chunk = self._body.read(1 << 16)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                out.write("\n  ]")
+            else:
+                out.write("]")
+            out.write("\n}")
+        os.replace(tmp_path, self.path)
+        self._cleanup()
+        return os.path.getsize(self.path)
+
+    def abort(self) -> None:
+        self._cleanup()
+
+    def _cleanup(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        self._body.close()
+        try:
+            os.remove(self._body.name)
+        except OSError:
+            pass
+
+    def __enter__(self) -> "JsonDocumentWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.abort()
+
+
+def iter_merged(sc: Any, assortment: Iterable[Dict[str, Any]], offers: Dict[str, Dict[str, Any]],
+                stats: Dict[str, int]) -> Iterator[Tuple[str, ProductRecord]]:
+    """
+    Streaming counterpart of AldiScraper.merge().
+
+    Assortment hits are merged with their offer (if any) and yielded one by
+    one; only the set of seen objectIDs is kept. Offer-only products follow,
+    in offers order. stats receives the unique assortment count.
+    """
+    seen = set()
+    for i, h in enumerate(assortment):
+        validators.ensure_hit_has_required_keys(i, h, ["objectID"])
+        pid = str(h.get("objectID"))
+        if pid in seen:
+            continue
+        seen.add(pid)
+        p = sc.new_product(h)
+        offer = offers.get(pid)
+        if offer is not None:
+            sc.apply_offer(p, offer)
+        yield pid, p
+    stats["assortment"] = len(seen)
+    for pid, h in offers.items():
+        if pid in seen:
+            continue
+        yield pid, sc.new_offer_product(h)
+
+
+def fetch_sources(sc: Any) -> Tuple[Iterable[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """
+    Return (assortment hit stream, offers by objectID).
+
+    Offers are fetched up front since every assortment product needs them;
+    in serial mode the larger assortment index is then streamed page by page.
+    """
+    if config.BATCH_QUERIES or config.CONCURRENT_FETCH:
+        data = sc.fetch()
+        assortment: Iterable[Dict[str, Any]] = data["assortment"]
+        offer_hits = data["offers"]
+    else:
+        sc.plan_units([sc.assortment_index, sc.offers_index])
+        offer_hits = sc.get_all_products_from_index(sc.offers_index)
+        assortment = sc.iter_index_hits(sc.assortment_index)
+    offers = {str(h.get("objectID")): h for h in offer_hits}
+    return assortment, offers
+
+
+def run_pipeline(sc: Any, out_dir: str = "data", last_updated: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Fetch, merge, project, validate and write products.json and
+    products-min.json in a single streaming pass. Files are only replaced
+    once the whole run validated.
+
+    With INCREMENTAL_RUNS, product hashes are compared with the previous run:
+    output files whose product content is unchanged are left as they are,
+    and added/changed/removed products go to changes/<timestamp>.json.
+    With PRICE_HISTORY, every product's price sample is appended to the
+    history store in the same pass (skipped when INCREMENTAL_RUNS finds
+    the catalog unchanged). With SHARDED_OUTPUT, the min catalog is
+    also written as content-addressed shards plus a manifest. With
+    SEARCH_INDEX, a prebuilt search index is written next to the data. With
+    ANALYTICS_EXPORT, the catalog also goes to SQLite and a columnar file.
+    With COMPACT_OUTPUT, the min catalog is also written in the compact v2
+    format with its .gz/.br artifacts.
+    Every item is also passed to each of sc.sinks (add(item, raw)).
+    Returns the metadata of the run.
+    """
+    last_updated = last_updated or datetime.now(timezone.utc).isoformat()
+    t = telemetry.get()
+    with t.span("fetch_sources"):
+        assortment, offers = fetch_sources(sc)
+    stats: Dict[str, int] = {}
+    sinks = getattr(sc, "sinks", ())
+    state_path = os.path.join(out_dir, config.DELTA_STATE_FILE)
+    tracker = delta.ChangeTracker(delta.load_state(state_path)) if config.INCREMENTAL_RUNS else None
+
+    with ExitStack() as stack:
+        full_writer = stack.enter_context(JsonDocumentWriter(os.path.join(out_dir, "products.json")))
+        min_writer = stack.enter_context(JsonDocumentWriter(os.path.join(out_dir, "products-min.json")))
+        price_history = history.PriceHistory(os.path.join(out_dir, config.HISTORY_DIR)) if config.PRICE_HISTORY else None
+        history_writer = stack.enter_context(price_history.start_run(last_updated)) if price_history else None
+        shard_writer = stack.enter_context(shards.ShardWriter(
+            os.path.join(out_dir, config.SHARDS_DIR),
+            page_size=config.SHARD_PAGE_SIZE,
+            hierarchy_level=config.SHARD_HIERARCHY_LEVEL,
+        )) if config.SHARDED_OUTPUT else None
+        search_builder = search_index.SearchIndexBuilder() if config.SEARCH_INDEX else None
+        compact_builder = compact.CompactMinBuilder() if config.COMPACT_OUTPUT else None
+        analytics_writer = stack.enter_context(analytics.AnalyticsWriter(
+            os.path.join(out_dir, config.ANALYTICS_DIR),
+            columnar=config.ANALYTICS_COLUMNAR,
+        )) if config.ANALYTICS_EXPORT else None
+        # En mode série, "stream" inclut aussi la récupération paginée de l'assortiment
+        with t.span("stream"):
+            for i, (pid, product, item) in enumerate(sc.iter_min_items(iter_merged(sc, assortment, offers, stats))):
+                validators.validate_min_product(i, item)
+                full = product.to_dict()
+                full_writer.write(full)
+                min_writer.write(item)
+                if tracker is not None:
+                    tracker.add(full, item)
+                if history_writer is not None:
+                    history_writer.add(pid, item["price"], item["is_promotion"], item["valid_until"])
+                if shard_writer is not None:
+                    shard_writer.add(item, product.raw)
+                if search_builder is not None:
+                    search_builder.add(item)
+                if compact_builder is not None:
+                    compact_builder.add(item)
+                if analytics_writer is not None:
+                    analytics_writer.add(item, product)
+                for sink in sinks:
+                    sink.add(item, product.raw)
+
+        validators.validate_product_count(stats.get("assortment", 0) + len(offers))
+        stack.enter_context(t.span("commit"))
+        total = full_writer.count
+        meta = {
+            "schema_version": config.SCHEMA_VERSION,
+            "last_updated": last_updated,
+            "total_products": total,
+        }
+        outputs_present = os.path.exists(full_writer.path) and os.path.exists(min_writer.path)
+        # Catalogue inchangé: products*.json, metadata.json, le delta et l'historique restent
+        # tels quels; les autres sorties ne réécrivent que ce qui manque ou a changé
+        unchanged = tracker is not None and not tracker.has_changes and outputs_present
+        if history_writer is not None:
+            # Un run sans changement n'apporterait que des échantillons supprimés par compact()
+            if unchanged:
+                history_writer.abort()
+            else:
+                run_index = history_writer.commit()
+                if config.HISTORY_COMPACT_EVERY > 0 and (run_index + 1) % config.HISTORY_COMPACT_EVERY == 0:
+                    price_history.compact()
+
+        written = {}
+        for name, writer, file_meta in (
+            ("products.json", full_writer, sc.full_meta(total, last_updated)),
+            ("products-min.json", min_writer, sc.min_meta(total, last_updated)),
+        ):
+            if unchanged or (tracker is not None and tracker.file_unchanged(name) and os.path.exists(writer.path)):
+                writer.abort()
+                continue
+            written[name] = writer.commit(file_meta)
+        if shard_writer is not None:
+            shard_writer.commit(sc.min_meta(total, last_updated))
+        if search_builder is not None:
+            search_builder.write(os.path.join(out_dir, config.SEARCH_INDEX_DIR), sc.min_meta(total, last_updated))
+        if analytics_writer is not None:
+            analytics_writer.commit(sc.min_meta(total, last_updated))
+        if compact_builder is not None:
+            compact_builder.write(out_dir, sc.min_meta(total, last_updated))
+
+    if unchanged:
+        utils.log_event("info", "pipeline_unchanged", total=total)
+        return meta
+    with open(os.path.join(out_dir, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    if tracker is not None:
+        delta_path = delta.write_delta(tracker, os.path.join(out_dir, "changes"), last_updated, config.DELTA_RETENTION)
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump(tracker.state(last_updated), f, ensure_ascii=False, separators=(",", ":"))
+        utils.log_event(
+            "info",
+            "pipeline_delta",
+            delta=delta_path,
+            added=len(tracker.added),
+            changed=len(tracker.changed),
+            removed=len(tracker.removed),
+        )
+    utils.log_event("info", "pipeline_written", total=total, files=written)
+    return meta
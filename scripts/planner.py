@@ -0,0 +1,124 @@
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import config, utils
+
+# (label, filter) pairs, same shape as AldiScraper._build_filters()
+Plan = List[Tuple[str, Optional[str]]]
+
+
+def facet_filter(facet: str, value: str) -> str:
+    escaped = value.replace('"', '\\"')
+    return f'{facet}:"{escaped}"'
+
+
+def _and(*parts: Optional[str]) -> Optional[str]:
+    kept = [p for p in parts if p]
+    if not kept:
+        return None
+    if len(kept) == 1:
+        return kept[0]
+    return " AND ".join(kept)
+
+
+class FacetPlanner:
+    """
+    Builds a set of non-overlapping filters that each stay under the
+    Algolia result cap, from facet counts instead of a hard-coded list.
+
+    One hitsPerPage=0 query returns per-value nbHits for the first facet of
+    PARTITION_FACETS. Values are packed into OR-groups up to the cap; a value
+    that alone exceeds the cap is split recursively on the next facet.
+    Products without the facet get their own "NOT facet:*" bucket. When facet
+    values overlap (a product in two categories), each group excludes the
+    values of the groups before it, so no product is fetched twice, and
+    the nbHits of each such filter is queried so that the coverage check
+    counts every product once.
+    """
+
+    def __init__(self, post: Callable[[Dict[str, Any]], Dict[str, Any]], facets: Optional[List[str]] = None, cap: Optional[int] = None):
+        self.post = post
+        self.facets = list(facets if facets is not None else config.PARTITION_FACETS)
+        self.cap = int(cap if cap is not None else config.RESULT_CAP)
+        self.queries_sent = 0
+
+    def _facet_counts(self, index_name: str, facet: Optional[str], filter_str: Optional[str]) -> Tuple[int, Dict[str, int]]:
+        params = utils.build_params(
+            hitsPerPage=0,
+            analytics="false",
+            facets=json.dumps([facet]) if facet else None,
+            maxValuesPerFacet=1000 if facet else None,
+            filters=filter_str,
+        )
+        self.queries_sent += 1
+        data = self.post({"requests": [{"indexName": index_name, "params": params}]})
+        res = data.get("results", [{}])[0]
+        counts = res.get("facets", {}).get(facet, {}) if facet else {}
+        return int(res.get("nbHits", 0)), {str(k): int(v) for k, v in counts.items()}
+
+    def _pack(self, counts: Dict[str, int]) -> List[List[str]]:
+        # First-fit decreasing: le moins de groupes possible sous le plafond
+        groups: List[Tuple[int, List[str]]] = []
+        for value, n in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])):
+            for i, (size, members) in enumerate(groups):
+                if size + n <= self.cap:
+                    members.append(value)
+                    groups[i] = (size + n, members)
+                    break
+            else:
+                groups.append((n, [value]))
+        return [members for _, members in groups]
+
+    def _split(self, index_name: str, base: Optional[str], label: str, total: int, depth: int,
+               truncated: List[str]) -> List[Tuple[str, Optional[str], int]]:
+        if total <= self.cap:
+            return [(label, base, total)]
+        if depth >= len(self.facets):
+            utils.log_event("warning", "plan_bucket_over_cap", index=index_name, bucket=label, nb_hits=total, cap=self.cap)
+            truncated.append(label)
+            return [(label, base, total)]
+
+        facet = self.facets[depth]
+        _, counts = self._facet_counts(index_name, facet, base)
+        missing_filter = _and(base, f"NOT {facet}:*")
+        missing, _ = self._facet_counts(index_name, None, missing_filter)
+        overlapping = sum(counts.values()) + missing > total
+
+        buckets: List[Tuple[str, Optional[str], int]] = []
+        previous: List[str] = []
+        for members in self._pack({v: n for v, n in counts.items() if n <= self.cap}):
+            group = " OR ".join(facet_filter(facet, v) for v in members)
+            if len(members) > 1:
+                group = f"({group})"
+            excludes = [f"NOT {facet_filter(facet, v)}" for v in previous] if overlapping else []
+            group_filter = _and(base, group, *excludes)
+            # Valeurs qui se recoupent: la somme des facettes compterait deux fois les mêmes produits
+            n = self._facet_counts(index_name, None, group_filter)[0] if overlapping else sum(counts[v] for v in members)
+            buckets.append((" | ".join(members), group_filter, n))
+            previous.extend(members)
+        for value in sorted(v for v, n in counts.items() if n > self.cap):
+            excludes = [f"NOT {facet_filter(facet, v)}" for v in previous] if overlapping else []
+            sub_base = _and(base, facet_filter(facet, value), *excludes)
+            n = self._facet_counts(index_name, None, sub_base)[0] if excludes else counts[value]
+            buckets.extend(self._split(index_name, sub_base, value, n, depth + 1, truncated))
+            previous.append(value)
+        if missing:
+            buckets.extend(self._split(index_name, missing_filter, f"{label}/UNCATEGORIZED", missing, depth + 1, truncated))
+        return buckets
+
+    def plan(self, index_name: str) -> Plan:
+        total, _ = self._facet_counts(index_name, None, None)
+        truncated: List[str] = []
+        buckets = self._split(index_name, None, "ALL", total, 0, truncated)
+        planned = sum(n for _, _, n in buckets)
+        utils.log_event(
+            "info",
+            "plan_coverage",
+            index=index_name,
+            index_total=total,
+            planned_total=planned,
+            buckets=len(buckets),
+            truncated_buckets=truncated,
+            facet_queries=self.queries_sent,
+        )
+        return [(label, filter_str) for label, filter_str, _ in buckets]
@@ -21,7 +21,7 @@ echo "🚀 Exécution du scraper..."
 python3 -m scripts.scraper
 
 echo "🧾 Préparation du commit..."
-git add data/metadata.json data/products.json data/products-min.json || true
+git add -A data/ || true
 
 if git diff --cached --quiet; then
   echo "ℹ️ Aucun changement à publier."
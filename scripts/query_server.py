@@ -0,0 +1,334 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from . import utils
+
+MAX_PER_PAGE = 200
+SORTS = ("relevance", "price", "-price", "name")
+ROUTES = ("/products", "/categories", "/meta")
+_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class CatalogIndex:
+    """
+    In-memory indexes over products-min.json: doc ids per (folded)
+    category, promotion doc ids, and doc ids sorted by price with the
+    matching price array for range lookups. Doc ids are catalog positions.
+    Every sort has a precomputed full order and per-doc rank.
+    """
+
+    def __init__(self, products: List[Dict[str, Any]], meta: Dict[str, Any]):
+        self.products = products
+        self.meta = meta
+        self.version = hashlib.sha256(json.dumps(meta, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        self.by_category: Dict[str, List[int]] = {}
+        self.labels: Dict[str, str] = {}
+        self.promotions: List[int] = []
+        self.is_promotion = [bool(p.get("is_promotion")) for p in products]
+        self.category_of: List[str] = []
+        priced: List[Tuple[float, int]] = []
+        unpriced: List[int] = []
+        for doc, p in enumerate(products):
+            label = p.get("category") or "autres"
+            key = utils.fold(label)
+            self.labels.setdefault(key, label)
+            self.by_category.setdefault(key, []).append(doc)
+            self.category_of.append(key)
+            if self.is_promotion[doc]:
+                self.promotions.append(doc)
+            price = p.get("price")
+            if isinstance(price, (int, float)) and not isinstance(price, bool):
+                priced.append((float(price), doc))
+            else:
+                unpriced.append(doc)
+        priced.sort()
+        self.prices = [price for price, _ in priced]
+        self.by_price = [doc for _, doc in priced]
+        by_name = sorted(range(len(products)), key=lambda d: utils.fold(products[d].get("name") or ""))
+        # Ordre complet du catalogue pour chaque tri (sans prix en fin de liste)
+        # et rang de chaque doc dans cet ordre, pour trier un sous-ensemble
+        self.orders = {
+            "relevance": list(range(len(products))),
+            "price": self.by_price + unpriced,
+            "-price": self.by_price[::-1] + unpriced,
+            "name": by_name,
+        }
+        self.ranks: Dict[str, List[int]] = {}
+        for sort, order in self.orders.items():
+            rank = [0] * len(products)
+            for i, doc in enumerate(order):
+                rank[doc] = i
+            self.ranks[sort] = rank
+        self.price_rank = self.ranks["price"]
+
+    @classmethod
+    def load(cls, data_dir: str) -> "CatalogIndex":
+        with open(os.path.join(data_dir, "products-min.json"), "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        return cls(doc["products"], doc.get("meta", {}))
+
+    def categories(self) -> List[Dict[str, Any]]:
+        return [{"category": self.labels[k], "count": len(docs)} for k, docs in sorted(self.by_category.items())]
+
+    def query(self, category: Optional[str] = None, promo: Optional[bool] = None, min_price: Optional[float] = None,
+              max_price: Optional[float] = None, sort: str = "relevance", page: int = 0, per_page: int = 50) -> Dict[str, Any]:
+        """
+        Filter, sort and paginate. The most selective index (price range
+        slice, category list or promotion list) drives the scan when it is
+        small; the other filters are checked against the per-doc arrays.
+        """
+        if sort not in SORTS:
+            raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+        price_range = min_price is not None or max_price is not None
+        lo = bisect_left(self.prices, min_price) if min_price is not None else 0
+        hi = bisect_right(self.prices, max_price) if max_price is not None else len(self.prices)
+        key = utils.fold(category) if category else None
+        candidates: List[List[int]] = []
+        if price_range:
+            candidates.append(self.by_price[lo:hi])
+        if key is not None:
+            candidates.append(self.by_category.get(key, []))
+        if promo is True:
+            candidates.append(self.promotions)
+        driver = min(candidates, key=len) if candidates else None
+        # Petit ensemble: filtrer puis trier par rang; sinon parcourir l'ordre
+        # précalculé du tri demandé, déjà trié
+        presorted = driver is None or len(driver) * 8 > len(self.products)
+        docs = [
+            d for d in (self.orders[sort] if presorted else driver)
+            if (key is None or self.category_of[d] == key)
+            and (promo is None or self.is_promotion[d] == promo)
+            and (not price_range or lo <= self.price_rank[d] < hi)
+        ]
+        if not presorted:
+            docs.sort(key=self.ranks[sort].__getitem__)
+        start = page * per_page
+        return {
+            "total": len(docs),
+            "page": page,
+            "per_page": per_page,
+            "products": [self.products[d] for d in docs[start:start + per_page]],
+        }
+
+
+def _parse_query(params: Dict[str, str]) -> Dict[str, Any]:
+    def number(name: str) -> Optional[float]:
+        return float(params[name]) if params.get(name) not in (None, "") else None
+
+    promo = params.get("promo")
+    per_page = int(params.get("per_page", 50))
+    page = int(params.get("page", 0))
+    if not 1 <= per_page <= MAX_PER_PAGE or page < 0:
+        raise ValueError(f"per_page must be within 1..{MAX_PER_PAGE} and page >= 0")
+    return {
+        "category": params.get("category") or None,
+        "promo": None if promo in (None, "") else promo.lower() in ("1", "true", "yes"),
+        "min_price": number("min_price"),
+        "max_price": number("max_price"),
+        "sort": params.get("sort", "relevance"),
+        "page": page,
+        "per_page": per_page,
+    }
+
+
+class QueryServer:
+    """
+    Minimal asyncio HTTP/1.1 server (keep-alive, GET/HEAD) over a CatalogIndex.
+
+    GET /products?category=&promo=&min_price=&max_price=&sort=&page=&per_page=
+    GET /categories, GET /meta. Responses carry an ETag derived from the
+    catalog version and the normalised query; If-None-Match answers 304.
+    Bodies over gzip_min_bytes are gzipped when accepted, and the last
+    cache_size encoded bodies are kept per ETag. The catalog is reloaded
+    in a worker thread when metadata.json changes.
+    """
+
+    def __init__(self, data_dir: str = "data", host: str = "127.0.0.1", port: int = 8090,
+                 reload_interval: float = 2.0, gzip_min_bytes: int = 1024, cache_size: int = 512):
+        self.data_dir = data_dir
+        self.host = host
+        self.port = port
+        self.reload_interval = reload_interval
+        self.gzip_min_bytes = gzip_min_bytes
+        self.cache_size = cache_size
+        # Corps encodés des réponses 200, par (ETag, gzip), en LRU
+        self._cache: "OrderedDict[Tuple[str, bool], Tuple[bytes, bool]]" = OrderedDict()
+        self.index = CatalogIndex.load(data_dir)
+        self._meta_stamp = self._metadata_stamp()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reloader: Optional[asyncio.Task] = None
+        self.reloads = 0
+
+    def _metadata_stamp(self) -> Optional[Tuple[float, int]]:
+        try:
+            st = os.stat(os.path.join(self.data_dir, "metadata.json"))
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    async def check_reload(self) -> bool:
+        """Reload the catalog if metadata.json changed since the last load."""
+        stamp = self._metadata_stamp()
+        if stamp == self._meta_stamp:
+            return False
+        try:
+            index = await asyncio.to_thread(CatalogIndex.load, self.data_dir)
+        except (OSError, ValueError, KeyError) as e:
+            # Fichiers en cours d'écriture: on réessaiera au prochain tour
+            utils.log_event("warning", "query_server_reload_failed", error=str(e))
+            return False
+        self.index, self._meta_stamp = index, stamp
+        self._cache.clear()
+        self.reloads += 1
+        utils.log_event("info", "query_server_reloaded", total=len(index.products), version=index.version)
+        return True
+
+    async def _reload_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await self.check_reload()
+
+    def route(self, path: str, params: Dict[str, str]) -> Tuple[int, Any]:
+        index = self.index
+        if path == "/products":
+            try:
+                return 200, index.query(**_parse_query(params))
+            except ValueError as e:
+                return 400, {"error": str(e)}
+        if path == "/categories":
+            return 200, {"categories": index.categories()}
+        if path == "/meta":
+            return 200, dict(index.meta, version=index.version)
+        return 404, {"error": f"Unknown path {path}"}
+
+    def respond(self, method: str, target: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Status, headers and body for one request (transport independent)."""
+        out: Dict[str, str] = {"Content-Type": "application/json; charset=utf-8", "Vary": "Accept-Encoding"}
+        if method not in ("GET", "HEAD"):
+            out["Allow"] = "GET, HEAD"
+            return 405, out, json.dumps({"error": "Only GET and HEAD are supported"}).encode("utf-8")
+        url = urlsplit(target)
+        if url.path not in ROUTES:
+            return 404, out, json.dumps({"error": f"Unknown path {url.path}"}).encode("utf-8")
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        # L'ETag ne dépend que de la version du catalogue et de la requête
+        # normalisée: un 304 ou un corps en cache évitent la requête
+        canonical = url.path + "?" + "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+        etag = '"' + self.index.version + "-" + hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:12] + '"'
+        if etag in [t.strip() for t in headers.get("if-none-match", "").split(",")]:
+            return 304, dict(out, ETag=etag, **{"Cache-Control": "no-cache"}), b""
+        gzipped = "gzip" in headers.get("accept-encoding", "")
+        cached = self._cache.get((etag, gzipped))
+        if cached is not None:
+            self._cache.move_to_end((etag, gzipped))
+        else:
+            status, doc = self.route(url.path, params)
+            body = json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            encoded = gzipped and len(body) >= self.gzip_min_bytes
+            if encoded:
+                body = gzip.compress(body, compresslevel=5)
+            if status != 200:
+                return status, dict(out, **({"Content-Encoding": "gzip"} if encoded else {})), body
+            cached = self._cache[(etag, gzipped)] = (body, encoded)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        body, encoded = cached
+        out.update({"ETag": etag, "Cache-Control": "no-cache"})
+        if encoded:
+            out["Content-Encoding"] = "gzip"
+        return 200, out, body
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                length_header = headers.get("content-length") or "0"
+                if length_header.isdigit():
+                    if int(length_header):
+                        try:
+                            await reader.readexactly(int(length_header))
+                        except (asyncio.IncompleteReadError, ConnectionError):
+                            return
+                    status, out, body = self.respond(method, target, headers)
+                    keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                else:
+                    # Corps impossible à délimiter: réponse 400 puis fermeture
+                    status, out = 400, {"Content-Type": "application/json; charset=utf-8"}
+                    body = json.dumps({"error": f"Invalid Content-Length {length_header!r}"}).encode("utf-8")
+                    keep_alive = False
+                out["Content-Length"] = str(len(body))
+                out["Connection"] = "keep-alive" if keep_alive else "close"
+                head_out = f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in out.items())
+                writer.write(head_out.encode("latin-1") + b"\r\n" + (b"" if method == "HEAD" else body))
+                await writer.drain()
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def start(self) -> "QueryServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.reload_interval > 0:
+            self._reloader = asyncio.create_task(self._reload_loop())
+        utils.log_event("info", "query_server_listening", url=self.url, total=len(self.index.products))
+        return self
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def stop(self) -> None:
+        if self._reloader is not None:
+            self._reloader.cancel()
+            self._reloader = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve filter/sort/paginate queries over the generated catalog.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--reload-interval", type=float, default=2.0, help="seconds between metadata.json checks (0 = off)")
+    args = parser.parse_args(argv)
+    server = QueryServer(args.data_dir, host=args.host, port=args.port, reload_interval=args.reload_interval)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
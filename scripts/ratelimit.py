@@ -0,0 +1,132 @@
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, Optional
+
+from . import telemetry
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the per-run deadline budget is spent."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delay in seconds or HTTP-date) into seconds.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Adaptive token bucket shared by every request path.
+
+    - At most max_concurrency requests are in flight at once.
+    - Request starts are paced at `rate` requests/second. The rate grows by
+      increase_step after each healthy response (additive increase) and is
+      multiplied by decrease_factor on 429/5xx (multiplicative decrease),
+      between min_rate and max_rate. max_rate <= 0 disables pacing.
+    - A Retry-After delay pauses every worker until it has elapsed.
+    - An optional deadline (seconds from creation) bounds the whole run:
+      once spent, acquiring a slot raises DeadlineExceeded.
+    """
+
+    def __init__(self, max_concurrency: int = 4, initial_rate: float = 2.0, min_rate: float = 0.5,
+                 max_rate: float = 20.0, increase_step: float = 0.25, decrease_factor: float = 0.5,
+                 deadline_seconds: Optional[float] = None):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_rate = float(max_rate)
+        self.min_rate = min(float(min_rate), self.max_rate) if self.max_rate > 0 else float(min_rate)
+        self.rate = min(max(float(initial_rate), self.min_rate), self.max_rate) if self.max_rate > 0 else 0.0
+        self.increase_step = float(increase_step)
+        self.decrease_factor = float(decrease_factor)
+        self.deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+
+        self._sem = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+        self._paused_until = 0.0
+
+        self.requests = 0
+        self.successes = 0
+        self.throttles = 0
+        self.retry_after_waits = 0
+        self.wait_seconds = 0.0
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.rate
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def check_deadline(self) -> None:
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("Run deadline budget exhausted")
+
+    def _wait_turn(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._paused_until)
+            if self.rate > 0:
+                start = max(start, self._next_start)
+                self._next_start = start + 1.0 / self.rate
+            self.requests += 1
+            delay = start - now
+            remaining = self.remaining()
+            if delay > 0 and (remaining is None or delay < remaining):
+                self.wait_seconds += delay
+        if delay > 0:
+            if remaining is not None and delay >= remaining:
+                raise DeadlineExceeded("Run deadline budget exhausted while waiting for a request slot")
+            telemetry.get().inc("sleep_seconds_total", delay, reason="rate_limit")
+            time.sleep(delay)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        self.check_deadline()
+        self._sem.acquire()
+        try:
+            self._wait_turn()
+            yield
+        finally:
+            self._sem.release()
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            if self.max_rate > 0:
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.throttles += 1
+            if self.max_rate > 0:
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            if retry_after:
+                self.retry_after_waits += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": round(self.rate, 3),
+            "requests": self.requests,
+            "successes": self.successes,
+            "throttles": self.throttles,
+            "retry_after_waits": self.retry_after_waits,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
@@ -0,0 +1,86 @@
+from typing import Any, Dict
+
+_MISSING = object()
+
+
+class ProductRecord:
+    """
+    Merged product without a copy of the Algolia hit.
+
+    Holds the fields the pipeline adds (price, promotion data, source flags)
+    and a reference to the raw hit, which is only expanded into a full dict
+    by to_dict() when products.json is written. Item access (record["price"])
+    reads the merged view, so code written against merge()'s former dicts
+    keeps working.
+    """
+
+    __slots__ = ("id", "raw", "in_assortment", "base_price", "offer", "offer_price", "promo_text", "valid_until")
+
+    def __init__(self, pid: str, raw: Dict[str, Any], in_assortment: bool, base_price: Any = None):
+        self.id = pid
+        self.raw = raw
+        self.in_assortment = in_assortment
+        self.base_price = base_price
+        self.offer = False
+        self.offer_price = None
+        self.promo_text = None
+        self.valid_until = None
+
+    @property
+    def is_promotion(self) -> bool:
+        return self.offer
+
+    @property
+    def price(self) -> Any:
+        # Même valeur que extract_price() sur l'ancien dict fusionné
+        if self.offer_price is not None:
+            return self.offer_price
+        return self.base_price
+
+    def overrides(self) -> Dict[str, Any]:
+        """Keys merge() used to add to the hit copy, in the same insertion order."""
+        o: Dict[str, Any] = {}
+        if self.in_assortment:
+            o["is_promotion"] = False
+            o["promo_text"] = None
+            o["valid_until"] = None
+            if self.base_price is not None:
+                o["price"] = self.base_price
+        if self.offer:
+            if self.offer_price is not None:
+                o["price"] = self.offer_price
+            o["is_promotion"] = True
+            o["promo_text"] = self.promo_text
+            o["valid_until"] = self.valid_until
+            o["source_offer"] = True
+        return o
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = dict(self.raw)
+        d.update(self.overrides())
+        return d
+
+    def get(self, key: str, default: Any = None) -> Any:
+        v = self.overrides().get(key, _MISSING)
+        if v is _MISSING:
+            return self.raw.get(key, default)
+        return v
+
+    def __getitem__(self, key: str) -> Any:
+        v = self.get(key, _MISSING)
+        if v is _MISSING:
+            raise KeyError(key)
+        return v
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.raw or key in self.overrides()
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ProductRecord):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ProductRecord(id={self.id!r}, price={self.price!r}, is_promotion={self.is_promotion!r})"
@@ -1,56 +1,82 @@
 import os
 import sys
 import json
-import signal
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Tuple
 
-from scripts import config, utils, validators
+from scripts import analytics, batching, categorizer, checkpoint, compact, config, extractors, pipeline, planner, standin, telemetry, transform, utils, validators
+from scripts import targets
+from scripts.ratelimit import DeadlineExceeded, RateLimiter
+from scripts.records import ProductRecord
 
 
-def _timeout_handler(signum, frame):
-    raise TimeoutError("Global timeout reached")
+class AldiScraper:
+    def __init__(self, target: Optional[targets.Target] = None, share_with: Optional["AldiScraper"] = None):
+        """
+        Scraper for one target (config's indices by default). share_with
+        reuses another scraper's session, connection pool, rate limiter and
+        transfer stats, so concurrent targets draw on one request budget.
+        """
+        self.target = target or targets.Target()
+        self.sinks: List[Any] = []
+        self._plans: Dict[str, List[Tuple[str, Optional[str]]]] = {}
+        self.extractor = extractors.ShapeExtractor()
+        self.journal: Optional[checkpoint.RunJournal] = None
+        self.progress = checkpoint.UnitProgress()
+        if share_with is not None:
+            self.transfer = share_with.transfer
+            self.session = share_with.session
+            self.recorder = share_with.recorder
+            self.limiter = share_with.limiter
+            return
+        self.transfer = utils.TransferStats(config.FETCH_MODE)
+        self.session = utils.get_session(pool_size=max(10, config.MAX_CONCURRENCY), transfer=self.transfer)
+        self.recorder = standin.CatalogRecorder() if config.RECORD_CATALOG else None
+        if self.recorder is not None:
+            if config.FETCH_MODE == "lean":
+                utils.log_event("warning", "recording_lean_hits", path=config.RECORD_CATALOG)
+            self.session.hooks["response"].append(self.recorder.record)
+        self.limiter = RateLimiter(
+            max_concurrency=config.MAX_CONCURRENCY,
+            initial_rate=config.RATE_INITIAL_RPS,
+            min_rate=config.RATE_MIN_RPS,
+            max_rate=config.MAX_REQUESTS_PER_SECOND,
+            increase_step=config.RATE_INCREASE_STEP,
+            decrease_factor=config.RATE_DECREASE_FACTOR,
+            deadline_seconds=config.GLOBAL_TIMEOUT_SECONDS,
+        )
 
+    @property
+    def assortment_index(self) -> str:
+        return self.target.assortment_index or config.ASSORTMENT_INDEX
 
-class AldiScraper:
-    def __init__(self):
-        self.session = utils.get_session()
+    @property
+    def offers_index(self) -> str:
+        return self.target.offers_index or config.OFFERS_INDEX
 
-    def _query_single_filter(self, index_name: str, filter_str: Optional[str] = None) -> List[Dict[str, Any]]:
+    @property
+    def out_dir(self) -> str:
+        return self.target.out_dir
+
+    def _iter_filter_pages(self, index_name: str, filter_str: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
         """
-        Query a single filter and return all results with pagination.
+        Query a single filter and yield each page of hits as it arrives.
+        On error the pagination stops after logging, keeping earlier pages.
         """
-        all_hits: List[Dict[str, Any]] = []
         page = 0
+        fetched = 0
         
         while page < config.MAX_PAGES_SAFETY_LIMIT:
             try:
-                # Prepare paginated request with optional filter
-                params = f"hitsPerPage={config.HITS_PER_PAGE}&page={page}"
-                if filter_str:
-                    params += f"&filters={filter_str}"
-                
-                body = {"requests": [{"indexName": index_name, "params": params}]}
-                
-                # Add delay before request (except for first page)
-                if page > 0:
-                    utils.sleep_with_jitter()
-                
-                # Execute request
-                data = utils.post_algolia_queries(self.session, body)
-                res = data.get("results", [{}])[0]
+                # Paginated request with optional filter (served from the journal when resuming)
+                res = self._fetch_page(index_name, filter_str, page)
                 page_hits = list(res.get("hits", []))
                 nb_pages = int(res.get("nbPages", 1))
                 
-                # Update cumulative results
-                all_hits.extend(page_hits)
-                
-                # Check if we've retrieved all pages
-                if page >= nb_pages - 1 or len(page_hits) == 0:
-                    break
-                
-                page += 1
-                
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 utils.log_event(
                     "warning",
@@ -59,12 +85,84 @@ class AldiScraper:
                     filter=filter_str or "none",
                     page=page,
                     error=str(e),
-                    partial_hits=len(all_hits)
+                    partial_hits=fetched
                 )
+                self._record_failure(index_name, filter_str, page, e)
+                return
+            
+            fetched += len(page_hits)
+            yield page_hits
+            
+            # Check if we've retrieved all pages
+            if page >= nb_pages - 1 or len(page_hits) == 0:
                 break
-        
+            
+            page += 1
+        self.progress.complete(index_name, filter_str)
+
+    def _query_single_filter(self, index_name: str, filter_str: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Query a single filter and return all results with pagination.
+        """
+        all_hits: List[Dict[str, Any]] = []
+        for page_hits in self._iter_filter_pages(index_name, filter_str):
+            all_hits.extend(page_hits)
         return all_hits
 
+    def iter_index_hits(self, index_name: str) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every hit of an index, filter after filter and page after page.
+        Hits are not deduplicated: a product matched by two filters is yielded twice.
+        """
+        for _, filter_str in self.plan_units([index_name])[0]:
+            count = 0
+            for page_hits in self._iter_filter_pages(index_name, filter_str):
+                count += len(page_hits)
+                yield from page_hits
+            telemetry.get().observe("filter_hits", count, telemetry.HITS_BUCKETS, index=index_name)
+
+    def _build_filters(self, index_name: str) -> List[Tuple[str, Optional[str]]]:
+        """
+        Return the (label, filter) pairs to query for one index, in query order.
+        With AUTO_PARTITION the list comes from the facet planner, otherwise
+        from the target's category filters (config.CATEGORY_FILTERS by default).
+        """
+        if not config.USE_FILTERED_QUERIES:
+            return [("ALL", None)]
+        auto_partition = self.target.auto_partition
+        if auto_partition if auto_partition is not None else config.AUTO_PARTITION:
+            if index_name not in self._plans:
+                fac_planner = planner.FacetPlanner(lambda body: utils.post_algolia_queries(self.session, body, limiter=self.limiter))
+                self._plans[index_name] = fac_planner.plan(index_name)
+            return self._plans[index_name]
+        categories = self.target.category_filters if self.target.category_filters is not None else config.CATEGORY_FILTERS
+        filters: List[Tuple[str, Optional[str]]] = [
+            (category, f'hierarchicalCategories.lvl3:"{category}"') for category in categories
+        ]
+        # Produits sans catégorie lvl3
+        filters.append(("UNCATEGORIZED", "NOT hierarchicalCategories.lvl3:*"))
+        return filters
+
+    def _dedupe_filter_results(self, index_name: str, filters: List[Tuple[str, Optional[str]]], results: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Deduplicate per-filter hit lists by objectID, preserving query order.
+        """
+        all_hits_dict: Dict[str, Dict[str, Any]] = {}
+        t = telemetry.get()
+        for (label, _), hits in zip(filters, results):
+            for hit in hits:
+                all_hits_dict[hit['objectID']] = hit
+            t.observe("filter_hits", len(hits), telemetry.HITS_BUCKETS, index=index_name)
+            utils.log_event(
+                "info",
+                "filter_query_complete",
+                index=index_name,
+                category=label,
+                hits_this_filter=len(hits),
+                unique_total=len(all_hits_dict)
+            )
+        return list(all_hits_dict.values())
+
     def get_all_products_from_index(self, index_name: str) -> List[Dict[str, Any]]:
         """
         Retrieve all products from an Algolia index.
@@ -75,96 +173,255 @@ class AldiScraper:
         Features:
         - Multiple category-filtered queries (if enabled)
         - Deduplication by objectID
-        - Human-like delays between requests (300-900ms)
+        - Adaptive pacing through the shared RateLimiter
         - Progressive logging with cumulative counts
         - Robust error handling with partial result recovery
         """
+        filters = self.plan_units([index_name])[0]
         if not config.USE_FILTERED_QUERIES:
             # Use original pagination logic (single query, max 1000 results)
             return self._query_single_filter(index_name, None)
         
-        # Filtered query strategy
-        all_hits_dict: Dict[str, Dict[str, Any]] = {}  # Deduplicate by objectID
+        utils.log_event("info", "filtered_queries_start", index=index_name, filter_count=len(filters))
         
-        utils.log_event("info", "filtered_queries_start", index=index_name, filter_count=len(config.CATEGORY_FILTERS) + 1)
-        
-        # Query each category filter
-        for idx, category in enumerate(config.CATEGORY_FILTERS):
-            filter_str = f'hierarchicalCategories.lvl3:"{category}"'
-            
+        results: List[List[Dict[str, Any]]] = []
+        for idx, (label, filter_str) in enumerate(filters):
             utils.log_event(
                 "info",
                 "filter_query_start",
                 index=index_name,
                 filter_index=idx + 1,
-                total_filters=len(config.CATEGORY_FILTERS) + 1,
-                category=category
-            )
-            
-            hits = self._query_single_filter(index_name, filter_str)
-            
-            # Add to deduplication dict
-            for hit in hits:
-                all_hits_dict[hit['objectID']] = hit
-            
-            utils.log_event(
-                "info",
-                "filter_query_complete",
-                index=index_name,
-                category=category,
-                hits_this_filter=len(hits),
-                unique_total=len(all_hits_dict)
+                total_filters=len(filters),
+                category=label
             )
+            results.append(self._query_single_filter(index_name, filter_str))
         
-        # Query uncategorized products (no lvl3)
-        utils.log_event(
-            "info",
-            "filter_query_start",
-            index=index_name,
-            filter_index=len(config.CATEGORY_FILTERS) + 1,
-            total_filters=len(config.CATEGORY_FILTERS) + 1,
-            category="UNCATEGORIZED"
-        )
-        
-        uncategorized_filter = "NOT hierarchicalCategories.lvl3:*"
-        uncategorized_hits = self._query_single_filter(index_name, uncategorized_filter)
-        
-        for hit in uncategorized_hits:
-            all_hits_dict[hit['objectID']] = hit
-        
-        utils.log_event(
-            "info",
-            "filter_query_complete",
-            index=index_name,
-            category="UNCATEGORIZED",
-            hits_this_filter=len(uncategorized_hits),
-            unique_total=len(all_hits_dict)
-        )
-        
-        # Convert to list
-        all_hits = list(all_hits_dict.values())
+        return self._finish_index(index_name, filters, results)
+
+    def _finish_index(self, index_name: str, filters: List[Tuple[str, Optional[str]]], results: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        all_hits = self._dedupe_filter_results(index_name, filters, results)
         
         utils.log_event(
             "info",
             "filtered_queries_complete",
             index=index_name,
             total_unique_hits=len(all_hits),
-            filters_executed=len(config.CATEGORY_FILTERS) + 1
+            filters_executed=len(filters)
         )
         
         validators.ensure_hits_have_required_keys(all_hits, ["objectID"])
         return all_hits
 
+    def _fetch_page(self, index_name: str, filter_str: Optional[str], page: int) -> Dict[str, Any]:
+        if self.journal is not None:
+            res = self.journal.get(index_name, filter_str, page)
+            if res is not None:
+                return res
+        params = batching.page_params(filter_str, page)
+        body = {"requests": [{"indexName": index_name, "params": params}]}
+        data = utils.post_algolia_queries(self.session, body, limiter=self.limiter)
+        res = data.get("results", [{}])[0]
+        if self.journal is not None:
+            self.journal.record(index_name, filter_str, page, res)
+        return res
+
+    def _record_failure(self, index_name: str, filter_str: Optional[str], page: int, error: Any) -> None:
+        self.progress.fail(index_name, filter_str, page, str(error))
+        if self.journal is not None:
+            self.journal.fail(index_name, filter_str, page, str(error))
+
+    def plan_units(self, index_names: List[str]) -> List[List[Tuple[str, Optional[str]]]]:
+        """_build_filters() of each index, with every (index, filter) unit registered in self.progress."""
+        plans = [self._build_filters(index_name) for index_name in index_names]
+        for index_name, filters in zip(index_names, plans):
+            self.progress.plan(index_name, (filter_str for _, filter_str in filters))
+        return plans
+
+    def _run_batch(self, batcher: batching.QueryBatcher, queries: List[batching.PageQuery]) -> Dict[batching.PageQuery, Dict[str, Any]]:
+        """QueryBatcher.run() with journaled pages served locally, new results journaled and failures recorded."""
+        resolved: Dict[batching.PageQuery, Dict[str, Any]] = {}
+        missing: List[batching.PageQuery] = []
+        for q in queries:
+            res = self.journal.get(q.index_name, q.filter_str, q.page) if self.journal is not None else None
+            if res is not None:
+                resolved[q] = res
+            else:
+                missing.append(q)
+        fetched = batcher.run(missing) if missing else {}
+        for q in missing:
+            res = fetched.get(q)
+            if res is None:
+                self._record_failure(q.index_name, q.filter_str, q.page, "batch sub-query failed")
+                continue
+            if self.journal is not None:
+                self.journal.record(q.index_name, q.filter_str, q.page, res)
+            resolved[q] = res
+        return resolved
+
+    def _fetch_filters_concurrently(self, units: List[Tuple[str, Optional[str]]]) -> List[List[Dict[str, Any]]]:
+        """
+        Fetch every (index, filter) unit in parallel and return one hit list per unit.
+
+        Page 0 of every unit is submitted first; once it reports nbPages, the
+        remaining pages of that unit are submitted too. All requests go through
+        the scraper's RateLimiter (concurrency cap, adaptive rate and run
+        deadline). Pages are reassembled in page order, and a
+        failed page truncates its unit at that page, exactly like the serial path.
+        """
+        pages: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+        failed_at: Dict[int, int] = {}
+        nb_pages: Dict[int, int] = {}
+
+        with ThreadPoolExecutor(max_workers=self.limiter.max_concurrency) as pool:
+            pending = {
+                pool.submit(self._fetch_page, index_name, filter_str, 0): (u, 0)
+                for u, (index_name, filter_str) in enumerate(units)
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    u, page = pending.pop(fut)
+                    index_name, filter_str = units[u]
+                    try:
+                        res = fut.result()
+                    except DeadlineExceeded:
+                        raise
+                    except Exception as e:
+                        utils.log_event(
+                            "warning",
+                            "filter_query_error",
+                            index=index_name,
+                            filter=filter_str or "none",
+                            page=page,
+                            error=str(e)
+                        )
+                        self._record_failure(index_name, filter_str, page, e)
+                        failed_at[u] = min(failed_at.get(u, page), page)
+                        continue
+                    page_hits = list(res.get("hits", []))
+                    pages[(u, page)] = page_hits
+                    if page == 0:
+                        nb_pages[u] = min(int(res.get("nbPages", 1)), config.MAX_PAGES_SAFETY_LIMIT)
+                        if page_hits:
+                            for p in range(1, nb_pages[u]):
+                                pending[pool.submit(self._fetch_page, index_name, filter_str, p)] = (u, p)
+
+        return self._assemble_units(units, pages, nb_pages, failed_at)
+
+    def _assemble_units(self, units: List[Tuple[str, Optional[str]]], pages: Dict[Tuple[int, int], List[Dict[str, Any]]],
+                        nb_pages: Dict[int, int], failed_at: Dict[int, int]) -> List[List[Dict[str, Any]]]:
+        """
+        Rebuild one hit list per unit from out-of-order pages, stopping at the
+        first failed or empty page like the serial path does. Units without
+        a failed page are marked complete.
+        """
+        results: List[List[Dict[str, Any]]] = []
+        for u, (index_name, filter_str) in enumerate(units):
+            if u not in failed_at:
+                self.progress.complete(index_name, filter_str)
+            hits: List[Dict[str, Any]] = []
+            stop = min(nb_pages.get(u, 0), failed_at.get(u, config.MAX_PAGES_SAFETY_LIMIT))
+            for p in range(stop):
+                page_hits = pages.get((u, p), [])
+                hits.extend(page_hits)
+                # Une page vide termine la pagination, comme en série
+                if not page_hits:
+                    break
+            results.append(hits)
+        return results
+
+    def _fetch_filters_batched(self, units: List[Tuple[str, Optional[str]]]) -> List[List[Dict[str, Any]]]:
+        """
+        Fetch every (index, filter) unit through multi-query batches.
+
+        Round one packs page 0 of every unit; a second pass packs all
+        follow-up pages announced by nbPages. Failed sub-queries are re-issued
+        by the batcher; those still failing truncate their unit at that page.
+        """
+        batcher = batching.QueryBatcher(
+            self.session,
+            batch_size=config.BATCH_SIZE,
+            max_rounds=config.BATCH_MAX_ROUNDS,
+            limiter=self.limiter,
+            concurrent=config.CONCURRENT_FETCH,
+        )
+        pages: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+        failed_at: Dict[int, int] = {}
+        nb_pages: Dict[int, int] = {}
+
+        first = {batching.PageQuery(index_name, filter_str, 0): u for u, (index_name, filter_str) in enumerate(units)}
+        resolved = self._run_batch(batcher, list(first))
+        follow_up: Dict[batching.PageQuery, Tuple[int, int]] = {}
+        for q, u in first.items():
+            res = resolved.get(q)
+            if res is None:
+                failed_at[u] = 0
+                continue
+            page_hits = list(res.get("hits", []))
+            pages[(u, 0)] = page_hits
+            nb_pages[u] = min(int(res.get("nbPages", 1)), config.MAX_PAGES_SAFETY_LIMIT)
+            if page_hits:
+                for p in range(1, nb_pages[u]):
+                    follow_up[batching.PageQuery(q.index_name, q.filter_str, p)] = (u, p)
+
+        if follow_up:
+            resolved = self._run_batch(batcher, list(follow_up))
+            for q, (u, p) in follow_up.items():
+                res = resolved.get(q)
+                if res is None:
+                    failed_at[u] = min(failed_at.get(u, p), p)
+                    continue
+                pages[(u, p)] = list(res.get("hits", []))
+
+        utils.log_event("info", "batched_fetch_complete", units=len(units), http_requests=batcher.requests_sent)
+        return self._assemble_units(units, pages, nb_pages, failed_at)
+
+    def _fetch_units(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Fetch both indices as one set of (index, filter) units, either through
+        multi-query batches or concurrent single queries. Output matches the
+        serial fetch() after deduplication.
+        """
+        indices = [self.assortment_index, self.offers_index]
+        plans = self.plan_units(indices)
+        units = [(index_name, filter_str) for index_name, filters in zip(indices, plans) for _, filter_str in filters]
+        utils.log_event(
+            "info",
+            "concurrent_fetch_start",
+            units=len(units),
+            batched=config.BATCH_QUERIES,
+            max_concurrency=self.limiter.max_concurrency,
+            max_rps=self.limiter.requests_per_second
+        )
+        if config.BATCH_QUERIES:
+            results = self._fetch_filters_batched(units)
+        else:
+            results = self._fetch_filters_concurrently(units)
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        offset = 0
+        for key, index_name, filters in zip(("assortment", "offers"), indices, plans):
+            index_results = results[offset:offset + len(filters)]
+            offset += len(filters)
+            if config.USE_FILTERED_QUERIES:
+                out[key] = self._finish_index(index_name, filters, index_results)
+            else:
+                out[key] = index_results[0]
+        return out
+
     def fetch(self) -> Dict[str, List[Dict[str, Any]]]:
-        assortment = self.get_all_products_from_index(config.ASSORTMENT_INDEX)
-        offers = self.get_all_products_from_index(config.OFFERS_INDEX)
+        if config.BATCH_QUERIES or config.CONCURRENT_FETCH:
+            return self._fetch_units()
+        # Les deux index sont planifiés d'avance: une échéance dépassée les signale tous deux
+        self.plan_units([self.assortment_index, self.offers_index])
+        assortment = self.get_all_products_from_index(self.assortment_index)
+        offers = self.get_all_products_from_index(self.offers_index)
         return {"assortment": assortment, "offers": offers}
 
     def extract_price(self, d: Dict[str, Any]) -> Any:
         # Algolia Aldi: prix souvent sous "salesPrice" (numérique) ou "priceFormatted" (string)
-        v = utils.get_first(d, ("price", "currentPrice", "current_price", "priceValue", "sales_price", "offer_price", "salesPrice"))
+        v = utils.get_first(d, extractors.PRICE_KEYS)
         if v is None:
-            pf = utils.get_first(d, ("priceFormatted",), default=None)
+            pf = utils.get_first(d, extractors.PRICE_FORMATTED_KEYS, default=None)
             if isinstance(pf, str):
                 try:
                     return float(pf.replace(",", "."))
@@ -173,11 +430,11 @@ class AldiScraper:
         return v
 
     def extract_name(self, d: Dict[str, Any]) -> str:
-        return utils.get_first(d, ("productName", "name", "title", "label"), default="")
+        return utils.get_first(d, extractors.NAME_KEYS, default="")
 
     def extract_image(self, d: Dict[str, Any]) -> Any:
         # Essayer d'abord les champs spécifiques Algolia
-        v = utils.get_first(d, ("productPicture", "badgeRendition", "productPictureRenditions", "image_url", "image", "thumbnail", "mainImage", "images"))
+        v = utils.get_first(d, extractors.IMAGE_KEYS)
         if isinstance(v, list) and v:
             return v[0]
         # Si c'est une string de renditions séparées par des virgules/espaces, prendre le premier URL
@@ -190,148 +447,256 @@ class AldiScraper:
         return v
 
     def extract_unit(self, d: Dict[str, Any]) -> Any:
-        return utils.get_first(d, ("unit", "unitSize", "size", "quantity", "net_weight", "salesUnitFormatted", "salesUnit2"))
+        return utils.get_first(d, extractors.UNIT_KEYS)
 
     def extract_valid_until(self, d: Dict[str, Any]) -> Any:
-        return utils.get_first(d, ("validUntil", "valid_to", "endDate", "promotion_end_date", "promo_end"))
+        return utils.get_first(d, extractors.VALID_UNTIL_KEYS)
 
     def extract_promo_text(self, d: Dict[str, Any]) -> Any:
-        v = utils.get_first(d, ("promoText", "promotionText", "description", "subtitle", "shortDescription", "longDescription"))
-        # Certaines descriptions sont en HTML -> renvoyer tel quel (min.json reste simple)
-        return v
+        # Certaines descriptions sont en HTML -> gardées telles quelles sauf PROMO_TEXT_FORMAT=text
+        return transform.format_promo_text(utils.get_first(d, extractors.PROMO_TEXT_KEYS))
 
-    def categorize(self, name: str) -> str:
-        n = name.lower()
-        mapping = {
-            "lait": "produits laitiers",
-            "yaourt": "produits laitiers",
-            "fromage": "fromages",
-            "gouda": "fromages",
-            "cheddar": "fromages",
-            "poulet": "viandes",
-            "boeuf": "viandes",
-            "porc": "viandes",
-            "pain": "boulangerie",
-            "baguette": "boulangerie",
-            "pâtes": "épicerie",
-            "riz": "épicerie",
-            "huile": "épicerie",
-            "tomate": "légumes",
-            "banane": "fruits",
-            "pomme": "fruits",
-            "saumon": "poisson",
-            "thon": "poisson",
-        }
-        for k, cat in mapping.items():
-            if k in n:
-                return cat
-        return "autres"
+    def categorize(self, name: str, raw: Optional[Dict[str, Any]] = None) -> str:
+        # Moteur compilé une seule fois: hierarchicalCategories d'abord, puis mots-clés
+        return categorizer.get_engine(config.CATEGORY_RULES_PATH).categorize(name, raw)
+
+    def new_product(self, h: Dict[str, Any]) -> ProductRecord:
+        return ProductRecord(str(h.get("objectID")), h, True, self.extract_price(h))
+
+    def new_offer_product(self, h: Dict[str, Any]) -> ProductRecord:
+        # Produit présent uniquement dans les offres: pas de prix d'assortiment
+        p = ProductRecord(str(h.get("objectID")), h, False)
+        self.apply_offer(p, h)
+        return p
 
-    def merge(self, assortment: List[Dict[str, Any]], offers: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
-        products: Dict[str, Dict[str, Any]] = {}
+    def apply_offer(self, p: ProductRecord, h: Dict[str, Any]) -> None:
+        p.offer = True
+        p.offer_price = self.extract_price(h)
+        p.promo_text = self.extract_promo_text(h)
+        p.valid_until = self.extract_valid_until(h)
+
+    def merge(self, assortment: List[Dict[str, Any]], offers: List[Dict[str, Any]]) -> Dict[str, ProductRecord]:
+        """
+        Merge both indices by objectID. Records keep a reference to their hit
+        instead of a copy; products.json expands them with to_dict().
+        """
+        products: Dict[str, ProductRecord] = {}
         for h in assortment:
             pid = str(h.get("objectID"))
-            base = dict(h)
-            base["is_promotion"] = False
-            base["promo_text"] = None
-            base["valid_until"] = None
-            price = self.extract_price(base)
-            if price is not None:
-                base["price"] = price
-            products[pid] = base
+            products[pid] = self.new_product(h)
         for h in offers:
             pid = str(h.get("objectID"))
-            if pid not in products:
-                products[pid] = dict(h)
-            p = products[pid]
-            offer_price = self.extract_price(h)
-            if offer_price is not None:
-                p["price"] = offer_price
-            p["is_promotion"] = True
-            p["promo_text"] = self.extract_promo_text(h)
-            p["valid_until"] = self.extract_valid_until(h)
-            p["source_offer"] = True
+            if pid in products:
+                self.apply_offer(products[pid], h)
+            else:
+                products[pid] = self.new_offer_product(h)
         return products
 
-    def build_full(self, products: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
-        meta = {
+    def full_meta(self, total: int, last_updated: Optional[str] = None) -> Dict[str, Any]:
+        return {
             "schema_version": config.SCHEMA_VERSION,
-            "last_updated": datetime.now(timezone.utc).isoformat(),
-            "total_products": len(products),
+            "last_updated": last_updated or datetime.now(timezone.utc).isoformat(),
+            "total_products": total,
             "source": "algolia",
-            "indices": [config.ASSORTMENT_INDEX, config.OFFERS_INDEX],
+            "indices": [self.assortment_index, self.offers_index],
         }
-        return {"meta": meta, "products": list(products.values())}
 
-    def to_iso(self, v: Any) -> Any:
-        if v is None:
-            return None
-        try:
-            return str(v)
-        except Exception:
-            return None
-
-    def build_min(self, products: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
-        items: List[Dict[str, Any]] = []
-        for pid, raw in products.items():
-            name = self.extract_name(raw) or ""
-            item = {
-                "id": pid,
-                "name": name,
-                "price": self.extract_price(raw),
-                "category": self.categorize(name),
-                "image_url": self.extract_image(raw),
-                "is_promotion": bool(raw.get("is_promotion", False)),
-                "promo_text": self.extract_promo_text(raw),
-                "valid_until": self.to_iso(raw.get("valid_until")),
-                "unit": self.extract_unit(raw),
-            }
-            items.append(item)
-        meta = {
+    def min_meta(self, total: int, last_updated: Optional[str] = None) -> Dict[str, Any]:
+        return {
             "schema_version": config.SCHEMA_VERSION,
-            "last_updated": datetime.now(timezone.utc).isoformat(),
-            "total_products": len(items),
+            "last_updated": last_updated or datetime.now(timezone.utc).isoformat(),
+            "total_products": total,
         }
-        return {"meta": meta, "products": items}
+
+    def build_full(self, products: Dict[str, ProductRecord]) -> Dict[str, Any]:
+        return {"meta": self.full_meta(len(products)), "products": [p.to_dict() for p in products.values()]}
+
+    def to_iso(self, v: Any) -> Any:
+        return transform.to_iso(v)
+
+    def build_min_item(self, pid: str, product: ProductRecord) -> Dict[str, Any]:
+        raw = product.raw
+        name = self.extract_name(raw) or ""
+        return {
+            "id": pid,
+            "name": name,
+            "price": product.price,
+            "category": self.categorize(name, raw),
+            "image_url": self.extract_image(raw),
+            "is_promotion": product.is_promotion,
+            "promo_text": self.extract_promo_text(raw),
+            "valid_until": self.to_iso(product.valid_until),
+            "unit": self.extract_unit(raw),
+        }
+
+    def iter_min_items(self, products: Iterable[Tuple[str, ProductRecord]], chunk_size: int = 1024) -> Iterator[Tuple[str, ProductRecord, Dict[str, Any]]]:
+        """
+        Batched counterpart of build_min_item: yields (pid, product, item)
+        with the fields of each chunk extracted through shape-compiled plans.
+        With TRANSFORM_WORKERS > 1, chunks are transformed on a process pool.
+        """
+        if config.TRANSFORM_WORKERS > 1:
+            yield from transform.parallel_min_items(products, config.TRANSFORM_WORKERS, config.TRANSFORM_CHUNK_SIZE)
+            return
+        it = iter(products)
+        while True:
+            chunk = list(islice(it, chunk_size))
+            if not chunk:
+                return
+            rows = [(pid, p.raw, p.price, p.is_promotion, p.valid_until) for pid, p in chunk]
+            for (pid, p), item in zip(chunk, transform.min_items(rows, self.extractor, self.categorize)):
+                yield pid, p, item
+
+    def build_min(self, products: Dict[str, ProductRecord]) -> Dict[str, Any]:
+        items = [item for _, _, item in self.iter_min_items(products.items())]
+        return {"meta": self.min_meta(len(items)), "products": items}
 
     def save_json(self, data: Dict[str, Any], path: str) -> None:
         with open(path, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
 
 
-def run():
+def run(resume: bool = False):
+    if config.TARGETS_FILE:
+        run_targets(targets.load_targets(config.TARGETS_FILE), resume=resume)
+        return
+    t = telemetry.reset()
+    utils.log_event("info", "scraper_start", resume=resume)
+    sc = AldiScraper()
+    _open_journal([sc], resume)
+    status = "failed"
     try:
-        if hasattr(signal, "SIGALRM"):
-            signal.signal(signal.SIGALRM, _timeout_handler)
-            signal.alarm(config.GLOBAL_TIMEOUT_SECONDS)
-    except Exception:
-        pass
+        _run(sc)
+        status = "ok"
+    finally:
+        _finish_run(t, [sc], status)
 
-    utils.log_event("info", "scraper_start")
-    sc = AldiScraper()
-    data = sc.fetch()
-    validators.validate_product_count(len(data["assortment"]) + len(data["offers"]))
-    merged = sc.merge(data["assortment"], data["offers"])
-    full = sc.build_full(merged)
-    minimal = sc.build_min(merged)
-    validators.validate_min_products(minimal["products"])
-    os.makedirs("data", exist_ok=True)
-    sc.save_json(full, "data/products.json")
-    sc.save_json(minimal, "data/products-min.json")
-    meta = {
-        "schema_version": full["meta"]["schema_version"],
-        "last_updated": full["meta"]["last_updated"],
-        "total_products": full["meta"]["total_products"],
-    }
-    with open("data/metadata.json", "w", encoding="utf-8") as f:
-        json.dump(meta, f, ensure_ascii=False, indent=2)
-    utils.log_event("info", "scraper_done", total=full["meta"]["total_products"])
 
+def run_targets(target_list: List[targets.Target], resume: bool = False) -> Dict[str, str]:
+    """
+    Scrape several targets concurrently in one process. All targets share
+    one session (connection pool), rate limiter and deadline; each writes
+    its own out_dir. Products found in several targets are linked by
+    objectID in config.LOCALE_LINKS_FILE. Returns the status of each target.
+    """
+    t = telemetry.reset()
+    utils.log_event("info", "scraper_start", resume=resume, targets=[x.name for x in target_list])
+    first = AldiScraper(target_list[0])
+    scrapers = [first] + [AldiScraper(x, share_with=first) for x in target_list[1:]]
+    links = targets.LocaleLinks([x.name for x in target_list])
+    for sc in scrapers:
+        sc.sinks.append(links.sink(sc.target.name))
+    _open_journal(scrapers, resume)
+    statuses = {x.name: "failed" for x in target_list}
     try:
-        if hasattr(signal, "SIGALRM"):
-            signal.alarm(0)
-    except Exception:
-        pass
+        with ThreadPoolExecutor(max_workers=len(scrapers)) as pool:
+            futures = {pool.submit(_run, sc): sc for sc in scrapers}
+            for fut, sc in futures.items():
+                try:
+                    fut.result()
+                    statuses[sc.target.name] = "ok"
+                except Exception as e:
+                    utils.log_event("error", "target_failed", target=sc.target.name, error=str(e))
+        linked = links.linked()
+        if config.LOCALE_LINKS_FILE and len(scrapers) > 1:
+            with pipeline.JsonDocumentWriter(config.LOCALE_LINKS_FILE) as writer:
+                for item in linked:
+                    writer.write(item)
+                writer.commit(dict(first.min_meta(len(linked)), targets=[x.name for x in target_list]))
+        utils.log_event("info", "targets_done", statuses=statuses, linked_products=len(linked))
+    finally:
+        failed = [name for name, st in statuses.items() if st != "ok"]
+        _finish_run(t, scrapers, "ok" if not failed else "failed", targets=statuses)
+    return statuses
+
+
+def _open_journal(scrapers: List[AldiScraper], resume: bool) -> None:
+    if config.RUN_CHECKPOINTS or resume:
+        # Un seul journal: ses unités sont déjà indexées par nom d'index
+        journal = checkpoint.RunJournal(config.CHECKPOINT_DIR, resume=resume,
+                                        max_age_seconds=config.CHECKPOINT_MAX_AGE_HOURS * 3600)
+        for sc in scrapers:
+            sc.journal = journal
+
+
+def _finish_run(t: telemetry.Telemetry, scrapers: List[AldiScraper], status: str, **info: Any) -> None:
+    """
+    Save the recording, report failed or unfinished units, close the journal
+    and write the run report, even after a failure. Session, limiter and
+    journal are shared by the scrapers of a run; their units are not.
+    """
+    sc = scrapers[0]
+    # Enregistrer même un run échoué: les réponses reçues restent rejouables
+    if sc.recorder is not None:
+        sc.recorder.save(config.RECORD_CATALOG)
+    incomplete = [unit for s in scrapers for unit in s.progress.incomplete()]
+    if incomplete:
+        utils.log_event("warning", "incomplete_units", count=len(incomplete), units=incomplete)
+        if status == "ok":
+            status = "incomplete"
+    info.update(incomplete_units=incomplete)
+    if sc.journal is not None:
+        # Le journal n'est gardé que pour un run à reprendre avec --resume
+        sc.journal.close(completed=status == "ok")
+        info.update(resumed_pages=sc.journal.resumed)
+    if config.RUN_REPORT:
+        telemetry.write_report(t, config.RUN_REPORT, budget_seconds=config.GLOBAL_TIMEOUT_SECONDS, status=status,
+                               fetch_mode=config.FETCH_MODE, rate=sc.limiter.stats(), transfer=sc.transfer.stats(),
+                               **info)
+    if config.METRICS_TEXTFILE:
+        telemetry.write_prometheus(t, config.METRICS_TEXTFILE)
+    utils.flush_logs()
+
+
+def _run(sc: AldiScraper) -> None:
+    t = telemetry.get()
+    out_dir = sc.out_dir
+    if config.STREAMING_PIPELINE:
+        meta = pipeline.run_pipeline(sc, out_dir)
+        utils.log_event("info", "fetch_rate_stats", **sc.limiter.stats())
+        utils.log_event("info", "fetch_transfer_stats", **sc.transfer.stats())
+        utils.log_event("info", "scraper_done", target=sc.target.name, total=meta["total_products"])
+        return
+    with t.span("fetch"):
+        data = sc.fetch()
+    utils.log_event("info", "fetch_rate_stats", **sc.limiter.stats())
+    utils.log_event("info", "fetch_transfer_stats", **sc.transfer.stats())
+    with t.span("validate"):
+        validators.validate_product_count(len(data["assortment"]) + len(data["offers"]))
+    with t.span("merge"):
+        merged = sc.merge(data["assortment"], data["offers"])
+    with t.span("build_full"):
+        full = sc.build_full(merged)
+    with t.span("build_min"):
+        minimal = sc.build_min(merged)
+    with t.span("validate"):
+        validators.validate_min_products(minimal["products"])
+    for sink in sc.sinks:
+        for item in minimal["products"]:
+            sink.add(item, merged[item["id"]].raw)
+    os.makedirs(out_dir, exist_ok=True)
+    if config.ANALYTICS_EXPORT:
+        with t.span("analytics"), analytics.AnalyticsWriter(os.path.join(out_dir, config.ANALYTICS_DIR),
+                                                            columnar=config.ANALYTICS_COLUMNAR) as writer:
+            for item in minimal["products"]:
+                writer.add(item, merged[item["id"]])
+            writer.commit(minimal["meta"])
+    with t.span("save_json"):
+        sc.save_json(full, os.path.join(out_dir, "products.json"))
+        sc.save_json(minimal, os.path.join(out_dir, "products-min.json"))
+        if config.COMPACT_OUTPUT:
+            builder = compact.CompactMinBuilder()
+            for item in minimal["products"]:
+                builder.add(item)
+            builder.write(out_dir, minimal["meta"])
+        meta = {
+            "schema_version": full["meta"]["schema_version"],
+            "last_updated": full["meta"]["last_updated"],
+            "total_products": full["meta"]["total_products"],
+        }
+        with open(os.path.join(out_dir, "metadata.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+    utils.log_event("info", "scraper_done", target=sc.target.name, total=full["meta"]["total_products"])
 
 
 if __name__ == "__main__":
@@ -339,4 +704,4 @@ if __name__ == "__main__":
         mock = {"results": [{"hits": [{"objectID": "123", "productName": "Gouda Jeune", "price": 1.49, "image": "https://example/image.jpg", "unit": "250 g"}]}]}
         print(json.dumps(mock, ensure_ascii=False, indent=2))
     else:
-        run()
\ No newline at end of file
+        run(resume="--resume" in sys.argv)
\ No newline at end of file
@@ -0,0 +1,226 @@
+import bisect
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import extractors, utils
+
+INDEX_VERSION = 1
+HEADER_NAME = "index.json"
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Tokens of a name or promo text (plain or HTML, see extractors.html_to_text), accents folded."""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(utils.fold(extractors.html_to_text(str(text))))
+
+
+def bucket_of(token: str, width: int) -> str:
+    return token[:width]
+
+
+def encode_postings(doc_ids: Iterable[int]) -> List[int]:
+    """Sorted doc ids -> gaps (first id, then differences)."""
+    out: List[int] = []
+    prev = 0
+    for d in doc_ids:
+        out.append(d - prev)
+        prev = d
+    return out
+
+
+def decode_postings(gaps: Iterable[int]) -> List[int]:
+    out: List[int] = []
+    acc = 0
+    for g in gaps:
+        acc += g
+        out.append(acc)
+    return out
+
+
+def _write_json(path: str, doc: Dict[str, Any]) -> None:
+    data = json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return
+    except OSError:
+        pass
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+
+def _read_header(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class SearchIndexBuilder:
+    """
+    Builds a static inverted index over product names and promo texts.
+
+    Output directory layout:
+    - index.json: document ids (objectIDs, in products-min.json order),
+      facet postings per category and per promotion flag, and the list of
+      term buckets;
+    - terms-<prefix>.json: sorted terms starting with <prefix> and their
+      gap-encoded posting lists.
+
+    A client loads index.json once and then only the bucket(s) matching the
+    first characters of what the user typed.
+    """
+
+    def __init__(self, bucket_width: int = 2):
+        self.bucket_width = max(1, int(bucket_width))
+        self.ids: List[str] = []
+        self.postings: Dict[str, List[int]] = {}
+        self.facets: Dict[str, Dict[str, List[int]]] = {"category": {}, "is_promotion": {}}
+
+    def add(self, item: Dict[str, Any]) -> None:
+        doc = len(self.ids)
+        self.ids.append(str(item["id"]))
+        for token in set(tokenize(item.get("name")) + tokenize(item.get("promo_text"))):
+            self.postings.setdefault(token, []).append(doc)
+        self.facets["category"].setdefault(str(item.get("category") or "autres"), []).append(doc)
+        self.facets["is_promotion"].setdefault("true" if item.get("is_promotion") else "false", []).append(doc)
+
+    def write(self, out_dir: str, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        os.makedirs(out_dir, exist_ok=True)
+        buckets: Dict[str, List[str]] = {}
+        for term in sorted(self.postings):
+            buckets.setdefault(bucket_of(term, self.bucket_width), []).append(term)
+
+        bucket_files: Dict[str, Dict[str, Any]] = {}
+        for prefix, terms in buckets.items():
+            name = f"terms-{prefix}.json"
+            doc = {"terms": terms, "postings": [encode_postings(self.postings[t]) for t in terms]}
+            path = os.path.join(out_dir, name)
+            _write_json(path, doc)
+            bucket_files[prefix] = {"file": name, "terms": len(terms), "bytes": os.path.getsize(path)}
+
+        header = {
+            **(meta or {}),
+            "version": INDEX_VERSION,
+            "bucket_width": self.bucket_width,
+            "ids": self.ids,
+            "facets": {
+                facet: {value: encode_postings(docs) for value, docs in sorted(values.items())}
+                for facet, values in self.facets.items()
+            },
+            "buckets": bucket_files,
+        }
+        # En-tête en dernier, anciens buckets supprimés une fois qu'il ne les référence plus.
+        # Contenu identique: l'en-tête précédent (et son last_updated) est gardé.
+        header_path = os.path.join(out_dir, HEADER_NAME)
+        previous = _read_header(header_path)
+        if all(previous.get(k) == header[k] for k in ("version", "bucket_width", "ids", "facets", "buckets")):
+            header = previous
+        else:
+            _write_json(header_path, header)
+        for name in os.listdir(out_dir):
+            if name.startswith("terms-") and name.endswith(".json") and name[len("terms-"):-len(".json")] not in bucket_files:
+                os.remove(os.path.join(out_dir, name))
+        utils.log_event("info", "search_index_written", docs=len(self.ids), terms=len(self.postings), buckets=len(bucket_files))
+        return header
+
+
+class SearchIndex:
+    """
+    Reader for a directory written by SearchIndexBuilder. Term buckets are
+    loaded on first use and cached.
+
+    search() matches every query token as a prefix of an indexed term (AND
+    across tokens), optionally restricted by category / promotion, and
+    returns matching objectIDs with facet counts over the matches.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        with open(os.path.join(root, HEADER_NAME), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported search index version {header.get('version')}")
+        self.bucket_width = header["bucket_width"]
+        self.ids: List[str] = header["ids"]
+        self.buckets: Dict[str, Dict[str, Any]] = header["buckets"]
+        self._facets_raw: Dict[str, Dict[str, List[int]]] = header["facets"]
+        self._facets: Dict[Tuple[str, str], List[int]] = {}
+        self._values: Dict[str, List[str]] = {}
+        self._loaded: Dict[str, Tuple[List[str], List[List[int]]]] = {}
+
+    def _bucket(self, prefix: str) -> Tuple[List[str], List[List[int]]]:
+        if prefix not in self._loaded:
+            entry = self.buckets.get(prefix)
+            if entry is None:
+                self._loaded[prefix] = ([], [])
+            else:
+                with open(os.path.join(self.root, entry["file"]), "r", encoding="utf-8") as f:
+                    doc = json.load(f)
+                self._loaded[prefix] = (doc["terms"], doc["postings"])
+        return self._loaded[prefix]
+
+    def _facet_docs(self, facet: str, value: str) -> List[int]:
+        key = (facet, value)
+        if key not in self._facets:
+            self._facets[key] = decode_postings(self._facets_raw.get(facet, {}).get(value, []))
+        return self._facets[key]
+
+    def _doc_values(self, facet: str) -> List[str]:
+        # Valeur de facette par document, construite une fois: comptage en O(résultats)
+        if facet not in self._values:
+            values = [""] * len(self.ids)
+            for value in self._facets_raw.get(facet, {}):
+                for d in self._facet_docs(facet, value):
+                    values[d] = value
+            self._values[facet] = values
+        return self._values[facet]
+
+    def prefix_docs(self, token: str) -> set:
+        if len(token) < self.bucket_width:
+            prefixes = [p for p in self.buckets if p.startswith(token)]
+        else:
+            prefixes = [bucket_of(token, self.bucket_width)]
+        docs: set = set()
+        for prefix in prefixes:
+            terms, postings = self._bucket(prefix)
+            i = bisect.bisect_left(terms, token)
+            while i < len(terms) and terms[i].startswith(token):
+                docs.update(decode_postings(postings[i]))
+                i += 1
+        return docs
+
+    def search(self, query: str, category: Optional[str] = None, is_promotion: Optional[bool] = None,
+               limit: Optional[int] = None) -> Dict[str, Any]:
+        tokens = tokenize(query)
+        docs: Optional[set] = None
+        for token in sorted(set(tokens), key=len, reverse=True):
+            matched = self.prefix_docs(token)
+            docs = matched if docs is None else docs & matched
+            if not docs:
+                break
+        if docs is None:
+            docs = set(range(len(self.ids)))
+        if category is not None:
+            docs &= set(self._facet_docs("category", category))
+        if is_promotion is not None:
+            docs &= set(self._facet_docs("is_promotion", "true" if is_promotion else "false"))
+
+        facet_counts: Dict[str, Dict[str, int]] = {}
+        for facet in self._facets_raw:
+            values = self._doc_values(facet)
+            counts: Dict[str, int] = {}
+            for d in docs:
+                v = values[d]
+                counts[v] = counts.get(v, 0) + 1
+            facet_counts[facet] = dict(sorted(counts.items()))
+        ordered = sorted(docs)
+        if limit is not None:
+            ordered = ordered[:limit]
+        return {"total": len(docs), "ids": [self.ids[d] for d in ordered], "facets": facet_counts}
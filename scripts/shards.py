@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from . import utils
+
+MANIFEST_NAME = "manifest.json"
+# <collection>.<page>.<sha256[:12]>.json: seuls fichiers que commit() peut supprimer
+_SHARD_NAME_RE = re.compile(r"^[a-z0-9-]+\.\d+\.[0-9a-f]{12}\.json$")
+
+
+def slugify(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", utils.fold(value)).strip("-") or "none"
+
+
+class ShardWriter:
+    """
+    Writes the min catalog as small content-addressed shards plus a manifest.
+
+    Every product goes to the "all" collection, to the collection of its
+    categorize() category and, when present, to the collection of its
+    Algolia hierarchical category. Each collection is cut into pages of
+    page_size products; a page is written as
+    <collection>.<page>.<sha256[:12]>.json so it can be cached forever.
+    manifest.json lists every shard with its count, byte size and hash.
+
+    Items are spooled per collection to temporary JSON-lines files while
+    the pipeline streams, so memory stays flat.
+    """
+
+    def __init__(self, out_dir: str, page_size: int = 200, hierarchy_level: str = "lvl3"):
+        self.out_dir = out_dir
+        self.page_size = max(1, int(page_size))
+        self.hierarchy_level = hierarchy_level
+        self.total = 0
+        self._tmp = tempfile.mkdtemp(prefix="shards-")
+        self._spools: Dict[str, Any] = {}
+        self._labels: Dict[str, str] = {}
+
+    def _spool(self, collection: str, label: str, line: str) -> None:
+        f = self._spools.get(collection)
+        if f is None:
+            f = open(os.path.join(self._tmp, f"{len(self._spools)}.jsonl"), "w+", encoding="utf-8")
+            self._spools[collection] = f
+            self._labels[collection] = label
+        f.write(line)
+
+    def add(self, item: Dict[str, Any], raw: Optional[Dict[str, Any]] = None) -> None:
+        line = json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n"
+        self.total += 1
+        self._spool("all", "all", line)
+        category = item.get("category") or "autres"
+        self._spool(f"category-{slugify(category)}", category, line)
+        aldi = utils.hierarchy_category(raw or {}, self.hierarchy_level)
+        if aldi:
+            self._spool(f"aldi-{slugify(aldi)}", aldi, line)
+
+    def _write_page(self, collection: str, page: int, items: List[str]) -> Dict[str, Any]:
+        body = '{"collection":' + json.dumps(collection) + ',"page":' + str(page) + ',"products":[' + ",".join(items) + "]}"
+        data = body.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        name = f"{collection}.{page}.{digest[:12]}.json"
+        path = os.path.join(self.out_dir, name)
+        if not os.path.exists(path):
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        return {"file": name, "count": len(items), "bytes": len(data), "sha256": digest}
+
+    def _previous(self, manifest_path: str) -> Dict[str, Any]:
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def commit(self, meta: Dict[str, Any]) -> Dict[str, Any]:
+        os.makedirs(self.out_dir, exist_ok=True)
+        collections: Dict[str, Any] = {}
+        for collection in sorted(self._spools):
+            f = self._spools[collection]
+            f.seek(0)
+            pages: List[Dict[str, Any]] = []
+            items: List[str] = []
+            count = 0
+            for line in f:
+                items.append(line.rstrip("\n"))
+                count += 1
+                if len(items) == self.page_size:
+                    pages.append(self._write_page(collection, len(pages), items))
+                    items = []
+            if items:
+                pages.append(self._write_page(collection, len(pages), items))
+            collections[collection] = {"label": self._labels[collection], "count": count, "pages": pages}
+
+        manifest_path = os.path.join(self.out_dir, MANIFEST_NAME)
+        previous = self._previous(manifest_path)
+        if previous.get("page_size") == self.page_size and previous.get("collections") == collections:
+            # Mêmes shards: le manifest (et son last_updated) reste tel quel
+            utils.log_event("info", "shards_unchanged", collections=len(collections))
+            self.close()
+            return previous
+        # Garder aussi les shards du manifest précédent pour les clients qui l'ont en cache
+        keep = {p["file"] for c in previous.get("collections", {}).values() for p in c.get("pages", [])}
+        manifest = {**meta, "page_size": self.page_size, "collections": collections}
+        keep |= {p["file"] for c in collections.values() for p in c["pages"]}
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+        removed = 0
+        for name in os.listdir(self.out_dir):
+            if _SHARD_NAME_RE.match(name) and name not in keep:
+                os.remove(os.path.join(self.out_dir, name))
+                removed += 1
+        utils.log_event(
+            "info",
+            "shards_written",
+            collections=len(collections),
+            shards=sum(len(c["pages"]) for c in collections.values()),
+            removed=removed,
+        )
+        self.close()
+        return manifest
+
+    def close(self) -> None:
+        for f in self._spools.values():
+            f.close()
+        self._spools = {}
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+    def __enter__(self) -> "ShardWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
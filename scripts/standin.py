@@ -0,0 +1,349 @@
+import argparse
+import gzip
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl
+
+import requests
+
+from . import utils
+
+CATALOG_VERSION = 1
+PAGINATION_LIMIT = 1000
+
+_TOKEN_RE = re.compile(r'\s*(\(|\)|(?:[\w.]+):(?:"(?:[^"\\]|\\.)*"|\*|[^\s()]+)|\S+)')
+
+
+def _attribute(hit: Dict[str, Any], path: str) -> Any:
+    v: Any = hit
+    for part in path.split("."):
+        if not isinstance(v, dict):
+            return None
+        v = v.get(part)
+    return v
+
+
+def _atom(token: str) -> Callable[[Dict[str, Any]], bool]:
+    attr, _, value = token.partition(":")
+    if value == "*":
+        return lambda h: _attribute(h, attr) not in (None, "", [])
+    if value.startswith('"'):
+        value = re.sub(r'\\(.)', r"\1", value[1:-1])
+
+    def match(h: Dict[str, Any]) -> bool:
+        v = _attribute(h, attr)
+        if isinstance(v, list):
+            return any(str(x) == value for x in v)
+        return v is not None and str(v) == value
+    return match
+
+
+def compile_filters(expr: Optional[str]) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Predicate for the subset of the Algolia filters syntax the scraper and
+    the planner emit: attr:"value", attr:value and attr:* atoms combined
+    with NOT, AND, OR and parentheses (NOT > AND > OR).
+    """
+    if not expr or not expr.strip():
+        return lambda h: True
+    tokens = [t for t in _TOKEN_RE.findall(expr) if t]
+    pos = 0
+
+    def peek() -> Optional[str]:
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take() -> str:
+        nonlocal pos
+        if pos >= len(tokens):
+            raise ValueError(f"Unexpected end of filters: {expr!r}")
+        pos += 1
+        return tokens[pos - 1]
+
+    def parse_or() -> Callable[[Dict[str, Any]], bool]:
+        terms = [parse_and()]
+        while peek() == "OR":
+            take()
+            terms.append(parse_and())
+        return terms[0] if len(terms) == 1 else (lambda h: any(t(h) for t in terms))
+
+    def parse_and() -> Callable[[Dict[str, Any]], bool]:
+        terms = [parse_not()]
+        while peek() == "AND":
+            take()
+            terms.append(parse_not())
+        return terms[0] if len(terms) == 1 else (lambda h: all(t(h) for t in terms))
+
+    def parse_not() -> Callable[[Dict[str, Any]], bool]:
+        if peek() == "NOT":
+            take()
+            inner = parse_not()
+            return lambda h: not inner(h)
+        token = take()
+        if token == "(":
+            inner = parse_or()
+            if take() != ")":
+                raise ValueError(f"Unbalanced parentheses in filters: {expr!r}")
+            return inner
+        if ":" not in token:
+            raise ValueError(f"Unsupported filter token {token!r} in {expr!r}")
+        return _atom(token)
+
+    predicate = parse_or()
+    if pos != len(tokens):
+        raise ValueError(f"Trailing tokens in filters: {expr!r}")
+    return predicate
+
+
+def load_catalog(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    with open(path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    if doc.get("version") != CATALOG_VERSION:
+        raise ValueError(f"Unsupported catalog version {doc.get('version')}")
+    return doc["indices"]
+
+
+def save_catalog(indices: Dict[str, List[Dict[str, Any]]], path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"version": CATALOG_VERSION, "indices": indices}, f, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+class CatalogRecorder:
+    """
+    Session response hook capturing real Algolia hits into the catalog
+    format, deduplicated by objectID per index in arrival order. Facet
+    counts are not stored: the stand-in recomputes them from the hits.
+    """
+
+    def __init__(self):
+        self.indices: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, resp: requests.Response, *args: Any, **kwargs: Any) -> requests.Response:
+        if resp.status_code != 200 or resp.request is None or not resp.request.body:
+            return resp
+        try:
+            sent = json.loads(resp.request.body)["requests"]
+            results = resp.json()["results"]
+        except (ValueError, KeyError, TypeError):
+            return resp
+        with self._lock:
+            for sub, res in zip(sent, results):
+                hits = res.get("hits") if isinstance(res, dict) else None
+                if not hits:
+                    continue
+                index = self.indices.setdefault(sub.get("indexName", ""), {})
+                for h in hits:
+                    index.setdefault(str(h.get("objectID")), h)
+        return resp
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            indices = {name: list(hits.values()) for name, hits in self.indices.items()}
+        save_catalog(indices, path)
+        utils.log_event("info", "catalog_recorded", path=path, **{name: len(h) for name, h in indices.items()})
+
+
+def _project(hit: Dict[str, Any], attributes: Optional[List[str]]) -> Dict[str, Any]:
+    if attributes is None or "*" in attributes:
+        return hit
+    return {k: v for k, v in hit.items() if k == "objectID" or k in attributes}
+
+
+class StandInServer:
+    """
+    Local stand-in for POST /1/indexes/*/queries.
+
+    Each sub-query of a multi-query body is answered from the catalog:
+    filters, facets, hitsPerPage, page, attributesToRetrieve and
+    responseFields are honoured, nbHits/nbPages are computed, and hits past
+    PAGINATION_LIMIT are unreachable as on Algolia. Responses are gzipped
+    when the client accepts it.
+
+    Faults are drawn from a seeded RNG per request: latency (seconds),
+    throttle_rate (429 with Retry-After: retry_after) and error_rate (503).
+    """
+
+    def __init__(self, indices: Dict[str, List[Dict[str, Any]]], host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, throttle_rate: float = 0.0, error_rate: float = 0.0,
+                 retry_after: float = 1.0, seed: int = 0):
+        self.indices = indices
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.requests_served = 0
+        self.faults = {"429": 0, "503": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._filters: Dict[Optional[str], Callable[[Dict[str, Any]], bool]] = {}
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def answer(self, sub: Dict[str, Any]) -> Dict[str, Any]:
+        """Result object of one sub-query."""
+        hits = self.indices.get(sub.get("indexName", ""))
+        if hits is None:
+            return {"message": f"Index {sub.get('indexName')} does not exist", "status": 404}
+        params = dict(parse_qsl(sub.get("params", ""), keep_blank_values=True))
+        filters = params.get("filters") or None
+        with self._lock:
+            predicate = self._filters.get(filters)
+            if predicate is None:
+                predicate = self._filters[filters] = compile_filters(filters)
+        matched = [h for h in hits if predicate(h)]
+        hits_per_page = int(params.get("hitsPerPage", 20))
+        page = int(params.get("page", 0))
+        reachable = matched[:PAGINATION_LIMIT]
+        nb_pages = math.ceil(len(reachable) / hits_per_page) if hits_per_page else 0
+        attributes = json.loads(params["attributesToRetrieve"]) if "attributesToRetrieve" in params else None
+        page_hits = reachable[page * hits_per_page:(page + 1) * hits_per_page] if hits_per_page else []
+        res: Dict[str, Any] = {
+            "hits": [_project(h, attributes) for h in page_hits],
+            "nbHits": len(matched),
+            "page": page,
+            "nbPages": nb_pages,
+            "hitsPerPage": hits_per_page,
+            "index": sub.get("indexName"),
+            "params": sub.get("params", ""),
+            "processingTimeMS": 1,
+        }
+        if params.get("facets"):
+            limit = int(params.get("maxValuesPerFacet", 100))
+            facets: Dict[str, Dict[str, int]] = {}
+            for facet in json.loads(params["facets"]):
+                counts: Dict[str, int] = {}
+                for h in matched:
+                    v = _attribute(h, facet)
+                    for value in (v if isinstance(v, list) else [v]):
+                        if value not in (None, ""):
+                            counts[str(value)] = counts.get(str(value), 0) + 1
+                facets[facet] = dict(sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:limit])
+            res["facets"] = facets
+        if "responseFields" in params:
+            fields = json.loads(params["responseFields"])
+            if "*" not in fields:
+                res = {k: v for k, v in res.items() if k in fields}
+        return res
+
+    def _fault(self) -> Optional[int]:
+        with self._lock:
+            self.requests_served += 1
+            roll = self._rng.random()
+            if roll < self.throttle_rate:
+                self.faults["429"] += 1
+                return 429
+            if roll < self.throttle_rate + self.error_rate:
+                self.faults["503"] += 1
+                return 503
+        return None
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _send(self, status: int, doc: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+                data = json.dumps(doc, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    data = gzip.compress(data, compresslevel=5)
+                    self.send_header("Content-Encoding", "gzip")
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+                if not self.path.startswith("/1/indexes/*/queries"):
+                    self._send(404, {"message": "Not found", "status": 404})
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                fault = server._fault()
+                if fault == 429:
+                    self._send(429, {"message": "Too many requests", "status": 429}, {"Retry-After": f"{server.retry_after:g}"})
+                    return
+                if fault == 503:
+                    self._send(503, {"message": "Service unavailable", "status": 503})
+                    return
+                try:
+                    sent = json.loads(body)["requests"]
+                    results = [server.answer(sub) for sub in sent]
+                except (ValueError, KeyError, TypeError) as e:
+                    self._send(400, {"message": str(e), "status": 400})
+                    return
+                self._send(200, {"results": results})
+
+        return Handler
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        # shutdown() attend la boucle serve_forever: seulement si elle tourne
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve a recorded or synthetic catalog as a local Algolia stand-in.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--catalog", help="catalog JSON written by RECORD_CATALOG")
+    source.add_argument("--synthetic", type=int, metavar="N", help="serve a generated catalog of N assortment hits (benchmarks.generator)")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.catalog:
+        indices = load_catalog(args.catalog)
+    else:
+        from benchmarks import generator
+        indices = generator.generate_catalog(args.synthetic, seed=args.seed)
+    server = StandInServer(indices, port=args.port, latency=args.latency, throttle_rate=args.throttle_rate,
+                           error_rate=args.error_rate, retry_after=args.retry_after, seed=args.seed)
+    utils.log_event("info", "standin_listening", url=server.url, **{name: len(h) for name, h in indices.items()})
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
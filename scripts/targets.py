@@ -0,0 +1,95 @@
+import json
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+
+class Target(NamedTuple):
+    """
+    One ALDI market/locale: its pair of indices, filter plan and output
+    directory. None fields fall back to the single-target config values.
+    """
+    name: str = "default"
+    assortment_index: Optional[str] = None
+    offers_index: Optional[str] = None
+    out_dir: str = "data"
+    category_filters: Optional[Tuple[str, ...]] = None
+    auto_partition: Optional[bool] = None
+
+
+def load_targets(path: str) -> List[Target]:
+    """
+    Read a target list: [{"name", "assortment_index", "offers_index",
+    "out_dir"?, "category_filters"?, "auto_partition"?}, ...].
+    out_dir defaults to data/<name>.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"Target list {path} must be a non-empty JSON array")
+    targets: List[Target] = []
+    for i, e in enumerate(entries):
+        missing = [k for k in ("name", "assortment_index", "offers_index") if not e.get(k)]
+        if missing:
+            raise ValueError(f"Target {i} in {path} is missing {', '.join(missing)}")
+        filters = e.get("category_filters")
+        targets.append(Target(
+            name=e["name"],
+            assortment_index=e["assortment_index"],
+            offers_index=e["offers_index"],
+            out_dir=e.get("out_dir") or f"data/{e['name']}",
+            category_filters=tuple(filters) if filters is not None else None,
+            auto_partition=e.get("auto_partition"),
+        ))
+    names = [t.name for t in targets]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate target names in {path}: {names}")
+    if len({t.out_dir for t in targets}) != len(targets):
+        raise ValueError(f"Targets in {path} must write to distinct out_dir")
+    return targets
+
+
+class LocaleLinks:
+    """
+    Min fields of every product per target, keyed by objectID, filled as
+    the targets' pipelines stream their items. Products found in several
+    targets are the cross-locale links.
+    """
+
+    FIELDS = ("name", "category", "price", "is_promotion")
+
+    def __init__(self, targets: List[str]):
+        self.targets = list(targets)
+        self.items: Dict[str, Dict[str, Tuple[Any, ...]]] = {}
+        self._lock = threading.Lock()
+
+    def sink(self, target: str) -> "LinkSink":
+        return LinkSink(self, target)
+
+    def add(self, target: str, item: Dict[str, Any]) -> None:
+        fields = tuple(item.get(k) for k in self.FIELDS)
+        with self._lock:
+            self.items.setdefault(str(item["id"]), {})[target] = fields
+
+    def linked(self) -> List[Dict[str, Any]]:
+        """Products present in at least two targets, in target order per product."""
+        out = []
+        with self._lock:
+            for pid, per_target in self.items.items():
+                if len(per_target) < 2:
+                    continue
+                out.append({
+                    "id": pid,
+                    "locales": {t: dict(zip(self.FIELDS, per_target[t])) for t in self.targets if t in per_target},
+                })
+        return out
+
+
+class LinkSink:
+    """Pipeline sink (add(item, raw), like ShardWriter) feeding one target's items into LocaleLinks."""
+
+    def __init__(self, links: LocaleLinks, target: str):
+        self.links = links
+        self.target = target
+
+    def add(self, item: Dict[str, Any], raw: Optional[Dict[str, Any]] = None) -> None:
+        self.links.add(self.target, item)
@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+REPORT_VERSION = 1
+METRIC_PREFIX = "aldi_scraper"
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+BYTES_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+HITS_BUCKETS = (0, 10, 100, 250, 500, 1000, 5000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus semantics: le upper bounds, +Inf implied)."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = value if self.max is None else max(self.max, value)
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        out, total = [], 0
+        for bound, n in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += n
+            out.append(("+Inf" if bound == float("inf") else f"{bound:g}", total))
+        return out
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (max for the +Inf bucket)."""
+        if not self.count:
+            return None
+        rank, total = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            total += n
+            if total >= rank and n:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(self.cumulative()),
+        }
+
+
+class Telemetry:
+    """
+    Spans, counters and histograms of one run, safe to update from the
+    concurrent fetch workers.
+
+    Spans accumulate wall time per name (a span entered by several threads
+    at once counts each of them, so request time can exceed the run time).
+    Metrics are keyed by name and labels; histograms get their buckets on
+    first observation.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.spans: Dict[str, List[float]] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.perf_counter() - t0)
+
+    def add_span(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.spans.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def counter_total(self, name: str) -> float:
+        with self._lock:
+            return sum(v for (n, _), v in self.counters.items() if n == name)
+
+    def report(self, budget_seconds: Optional[float] = None, **info: Any) -> Dict[str, Any]:
+        """Machine-readable summary; budget splits the run deadline into network, sleeping and the rest."""
+        elapsed = self.elapsed()
+        with self._lock:
+            spans = {name: {"count": n, "seconds": round(s, 6)} for name, (n, s) in sorted(self.spans.items())}
+            counters = [{"name": n, "labels": dict(lb), "value": v} for (n, lb), v in sorted(self.counters.items())]
+            histograms = [{"name": n, "labels": dict(lb), **h.to_dict()} for (n, lb), h in sorted(self.histograms.items(), key=lambda kv: kv[0])]
+        network = spans.get("algolia_request", {}).get("seconds", 0.0)
+        sleeping = self.counter_total("sleep_seconds_total")
+        report: Dict[str, Any] = {
+            "version": REPORT_VERSION,
+            "started_at": self.started_at,
+            "elapsed_seconds": round(elapsed, 3),
+            **info,
+            "budget": {
+                "deadline_seconds": budget_seconds,
+                "used_ratio": round(elapsed / budget_seconds, 3) if budget_seconds else None,
+                "network_seconds": round(network, 3),
+                "sleep_seconds": round(sleeping, 3),
+                "other_seconds": round(max(0.0, elapsed - network - sleeping), 3),
+            },
+            "spans": spans,
+            "counters": counters,
+            "histograms": histograms,
+        }
+        return report
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format, for node_exporter's textfile collector."""
+        lines: List[str] = []
+
+        def fmt(labels: Labels, extra: Labels = ()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+        with self._lock:
+            lines.append(f"# TYPE {METRIC_PREFIX}_run_seconds gauge")
+            lines.append(f"{METRIC_PREFIX}_run_seconds {self.elapsed():.6f}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_span_seconds_total counter")
+            for name, (_, s) in sorted(self.spans.items()):
+                lines.append(f"{METRIC_PREFIX}_span_seconds_total{fmt((('span', name),))} {s:.6f}")
+            seen = set()
+            for (name, labels), v in sorted(self.counters.items()):
+                metric = f"{METRIC_PREFIX}_{name}"
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{fmt(labels)} {v:g}")
+            for (name, labels), h in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                metric = f"{METRIC_PREFIX}_{name}"
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f"# TYPE {metric} histogram")
+                for le, n in h.cumulative():
+                    lines.append(f"{metric}_bucket{fmt(labels, (('le', le),))} {n}")
+                lines.append(f"{metric}_sum{fmt(labels)} {h.sum:g}")
+                lines.append(f"{metric}_count{fmt(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+
+def write_report(t: Telemetry, path: str, budget_seconds: Optional[float] = None, **info: Any) -> Dict[str, Any]:
+    report = t.report(budget_seconds, **info)
+    _write_atomic(path, json.dumps(report, ensure_ascii=False, indent=2))
+    return report
+
+
+def write_prometheus(t: Telemetry, path: str) -> None:
+    _write_atomic(path, t.prometheus())
+
+
+_current = Telemetry()
+
+
+def get() -> Telemetry:
+    """Telemetry of the current run."""
+    return _current
+
+
+def reset() -> Telemetry:
+    """Start a new run's telemetry (called at the start of scraper.run())."""
+    global _current
+    _current = Telemetry()
+    return _current
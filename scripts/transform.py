@@ -0,0 +1,104 @@
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import categorizer, config, extractors
+from .records import ProductRecord
+
+# (pid, hit, price, is_promotion, valid_until): ce dont la projection min a besoin d'un produit
+Row = Tuple[str, Dict[str, Any], Any, bool, Any]
+
+# Réglages lus par les workers, recopiés depuis le processus parent
+WORKER_SETTINGS = ("CATEGORY_RULES_PATH", "PROMO_TEXT_FORMAT")
+
+
+def to_iso(v: Any) -> Any:
+    if v is None:
+        return None
+    try:
+        return str(v)
+    except Exception:
+        return None
+
+
+def format_promo_text(v: Any) -> Any:
+    """promo_text as configured by PROMO_TEXT_FORMAT: raw HTML (default) or plain text."""
+    return extractors.html_to_text(v) if config.PROMO_TEXT_FORMAT == "text" else v
+
+
+def min_items(rows: List[Row], extractor: extractors.ShapeExtractor,
+              categorize: Callable[[str, Optional[Dict[str, Any]]], str]) -> List[Dict[str, Any]]:
+    """products-min.json items of a chunk of rows, in row order."""
+    items = []
+    fields = extractor.extract_many(raw for _, raw, _, _, _ in rows)
+    for (pid, raw, price, is_promotion, valid_until), (name, _, image, promo_text, unit) in zip(rows, fields):
+        name = name or ""
+        items.append({
+            "id": pid,
+            "name": name,
+            "price": price,
+            "category": categorize(name, raw),
+            "image_url": image,
+            "is_promotion": is_promotion,
+            "promo_text": format_promo_text(promo_text),
+            "valid_until": to_iso(valid_until),
+            "unit": unit,
+        })
+    return items
+
+
+def project(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """The attributes of a hit the transform reads; all that crosses the process boundary."""
+    return {k: raw[k] for k in extractors.TRANSFORM_ATTRIBUTES if k in raw}
+
+
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(settings: Dict[str, Any]) -> None:
+    for k, v in settings.items():
+        setattr(config, k, v)
+    _worker["extractor"] = extractors.ShapeExtractor()
+    _worker["categorize"] = categorizer.get_engine(config.CATEGORY_RULES_PATH).categorize
+
+
+def _transform_chunk(rows: List[Row]) -> List[Dict[str, Any]]:
+    return min_items(rows, _worker["extractor"], _worker["categorize"])
+
+
+def parallel_min_items(products: Iterable[Tuple[str, ProductRecord]], workers: int, chunk_size: int = 2000,
+                       max_pending: Optional[int] = None) -> Iterator[Tuple[str, ProductRecord, Dict[str, Any]]]:
+    """
+    Process-pool counterpart of AldiScraper.iter_min_items: yields
+    (pid, product, item) in input order.
+
+    The product stream is cut into chunks; only the projected hit
+    attributes and the merged price/promotion fields of each product are
+    pickled to a worker, and items come back per chunk. At most
+    max_pending chunks (2 per worker by default) are in flight, so memory
+    stays bounded on a streamed catalog, and chunks are reassembled in
+    submission order, so the output does not depend on scheduling.
+    Workers are spawned, not forked: the scraper may run fetch threads.
+    """
+    max_pending = max_pending or 2 * workers
+    settings = {k: getattr(config, k) for k in WORKER_SETTINGS}
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(settings,))
+    pending: Deque[Tuple[List[Tuple[str, ProductRecord]], Any]] = deque()
+    it = iter(products)
+    try:
+        while True:
+            chunk = list(islice(it, chunk_size))
+            if chunk:
+                rows = [(pid, project(p.raw), p.price, p.is_promotion, p.valid_until) for pid, p in chunk]
+                pending.append((chunk, pool.submit(_transform_chunk, rows)))
+            if pending and (not chunk or len(pending) >= max_pending):
+                done, future = pending.popleft()
+                for (pid, p), item in zip(done, future.result()):
+                    yield pid, p, item
+            elif not chunk:
+                return
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
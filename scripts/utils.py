@@ -1,83 +1,251 @@
+import atexit
 import json
+import sys
+import threading
 import time
+import unicodedata
 from typing import Any, Dict, List, Optional, Tuple
 import requests
-from urllib.parse import quote_plus
+from requests.adapters import HTTPAdapter
+from urllib.parse import quote, quote_plus, urlencode
 
-from . import config
-import random
+from . import config, telemetry
+from .ratelimit import RateLimiter, parse_retry_after
 
 
-def get_session() -> requests.Session:
+class TransferStats:
+    """
+    Bytes received over a session, counted by a response hook: wire bytes
+    (compressed, as read from the socket) and decoded body bytes, tagged
+    with the fetch mode so runs in both modes can be compared.
+    """
+
+    def __init__(self, mode: str = "full"):
+        self.mode = mode
+        self.responses = 0
+        self.compressed = 0
+        self.wire_bytes = 0
+        self.body_bytes = 0
+        self._warned = False
+        self._lock = threading.Lock()
+
+    def record(self, resp: requests.Response, *args: Any, **kwargs: Any) -> requests.Response:
+        body = resp.content  # lecture complète: tell() donne alors les octets reçus
+        wire = 0
+        try:
+            wire = int(resp.raw.tell())
+        except Exception:
+            pass
+        if not wire:
+            wire = int(resp.headers.get("Content-Length") or len(body))
+        encoding = resp.headers.get("Content-Encoding", "").lower()
+        compressed = any(e in encoding for e in ("gzip", "br", "deflate"))
+        with self._lock:
+            self.responses += 1
+            self.compressed += compressed
+            self.wire_bytes += wire
+            self.body_bytes += len(body)
+            warn = not compressed and len(body) > 1024 and not self._warned
+            self._warned = self._warned or warn
+        if warn:
+            log_event("warning", "transfer_not_compressed", url=resp.url.split("?")[0], bytes=len(body))
+        return resp
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "responses": self.responses,
+                "compressed_responses": self.compressed,
+                "wire_bytes": self.wire_bytes,
+                "body_bytes": self.body_bytes,
+                "compression_ratio": round(self.body_bytes / self.wire_bytes, 2) if self.wire_bytes else None,
+            }
+
+
+def get_session(pool_size: int = 10, transfer: Optional[TransferStats] = None) -> requests.Session:
+    if not config.ALGOLIA_API_KEY and config.ALGOLIA_HOST == config.DEFAULT_ALGOLIA_HOST:
+        raise RuntimeError("Missing ALGOLIA_API_KEY environment variable.")
     s = requests.Session()
+    # Pool assez grand pour que les workers concurrents réutilisent les connexions
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
     s.headers.update({
-        "X-Algolia-API-Key": config.ALGOLIA_API_KEY,
+        "X-Algolia-API-Key": config.ALGOLIA_API_KEY or "offline",
         "X-Algolia-Application-Id": config.ALGOLIA_APP_ID,
         "Accept": "application/json",
+        "Accept-Encoding": "gzip, deflate",
         "Content-Type": "application/json",
         # Mimic navigateur pour clés restreintes par origine
         "Origin": "https://www.aldi.be",
         "Referer": "https://www.aldi.be/",
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36",
     })
+    if transfer is not None:
+        s.hooks["response"].append(transfer.record)
     return s
 
 
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+_log_buffer: List[str] = []
+_log_lock = threading.Lock()
+
+
 def log_event(level: str, message: str, **kwargs: Any) -> None:
+    """
+    Write one JSON log line, unless level is below config.LOG_LEVEL. With
+    LOG_BUFFER_LINES, lines are written in blocks; an error flushes at once.
+    """
+    if LOG_LEVELS.get(level, 20) < LOG_LEVELS[config.LOG_LEVEL]:
+        return
     data = {"level": level, "message": message, "timestamp": int(time.time())}
     if kwargs:
         data.update(kwargs)
-    print(json.dumps(data, ensure_ascii=False))
+    line = json.dumps(data, ensure_ascii=False)
+    if config.LOG_BUFFER_LINES <= 0:
+        print(line)
+        return
+    with _log_lock:
+        _log_buffer.append(line)
+        if len(_log_buffer) >= config.LOG_BUFFER_LINES or level == "error":
+            _write_log_lines()
+
+
+def _write_log_lines() -> None:
+    if _log_buffer:
+        sys.stdout.write("\n".join(_log_buffer) + "\n")
+        _log_buffer.clear()
+    sys.stdout.flush()
+
+
+def flush_logs() -> None:
+    with _log_lock:
+        _write_log_lines()
+
+
+atexit.register(flush_logs)
+
+
+def build_params(**params: Any) -> str:
+    """
+    Encode Algolia search parameters into the URL-encoded "params" string
+    of a multi-query entry. None values are skipped.
+    """
+    return urlencode({k: v for k, v in params.items() if v is not None}, quote_via=quote)
 
 
 RETRY_STATUS = {429} | set(range(500, 600))
 
 
-def post_algolia_queries(session: requests.Session, body: Dict[str, Any], timeout: int = 15, max_retries: int = 4, backoff: float = 0.8) -> Dict[str, Any]:
+def post_algolia_queries(session: requests.Session, body: Dict[str, Any], timeout: int = 15, max_retries: int = 4, backoff: float = 0.8, limiter: Optional[RateLimiter] = None) -> Dict[str, Any]:
+    """
+    POST a multi-query body to Algolia.
+
+    Only 429/5xx and network errors are retried. Other 4xx responses and
+    unparseable bodies fail immediately. A Retry-After header is honoured;
+    with a limiter, throttling also lowers the shared request rate.
+    """
+    t = telemetry.get()
     agent = quote_plus("Algolia for JavaScript (4.14.2); Browser; JS Helper (3.11.1); react (18.2.0); react-instantsearch (6.33.0)")
     url = f"{config.ALGOLIA_HOST}/1/indexes/*/queries?x-algolia-agent={agent}"
     last_err: Optional[Exception] = None
     for attempt in range(max_retries):
         try:
-            resp = session.post(url, json=body, timeout=timeout)
-            # Retry on 429/5xx
-            if resp.status_code in RETRY_STATUS:
-                raise requests.HTTPError(f"status={resp.status_code}")
-            # Fail fast on non-2xx
-            if not resp.ok:
-                try:
-                    err_body = resp.json()
-                except Exception:
-                    err_body = resp.text
-                log_event("error", "algolia_http_error", status=resp.status_code, body=str(err_body))
-                resp.raise_for_status()
-            data = resp.json()
-            # Basic schema validation: ensure 'results' present
-            if "results" not in data:
-                log_event("error", "algolia_unexpected_response", keys=list(data.keys()))
-                raise RuntimeError("Unexpected Algolia response: missing 'results'")
-            return data
-        except Exception as e:
+            if limiter is not None:
+                with limiter.slot():
+                    resp = _timed_post(t, session, url, body, timeout)
+            else:
+                resp = _timed_post(t, session, url, body, timeout)
+        except requests.RequestException as e:
+            # Erreur réseau: on réessaie avec backoff
             last_err = e
             sleep = backoff * (2 ** attempt)
-            log_event("warning", "algolia_request_retry", attempt=attempt + 1, sleep_seconds=sleep)
+            log_event("warning", "algolia_request_retry", attempt=attempt + 1, sleep_seconds=sleep, error=str(e))
+            t.inc("retries_total", reason="network")
+            t.inc("sleep_seconds_total", sleep, reason="backoff")
             time.sleep(sleep)
+            continue
+
+        if resp.status_code in RETRY_STATUS:
+            t.inc("retries_total", reason=str(resp.status_code))
+            last_err = requests.HTTPError(f"status={resp.status_code}")
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            if limiter is not None:
+                # Sans Retry-After, la baisse du débit partagé sert de backoff
+                if retry_after is None and limiter.rate <= 0:
+                    retry_after = backoff * (2 ** attempt)
+                limiter.on_throttle(retry_after)
+                log_event("warning", "algolia_request_throttled", attempt=attempt + 1, status=resp.status_code,
+                          retry_after=retry_after, rate=round(limiter.rate, 3))
+            else:
+                sleep = retry_after if retry_after is not None else backoff * (2 ** attempt)
+                log_event("warning", "algolia_request_retry", attempt=attempt + 1, status=resp.status_code, sleep_seconds=sleep)
+                t.inc("sleep_seconds_total", sleep, reason="backoff")
+                time.sleep(sleep)
+            continue
+
+        # Fail fast on non-2xx
+        if not resp.ok:
+            try:
+                err_body = resp.json()
+            except Exception:
+                err_body = resp.text
+            log_event("error", "algolia_http_error", status=resp.status_code, body=str(err_body))
+            resp.raise_for_status()
+        try:
+            data = resp.json()
+        except ValueError as e:
+            log_event("error", "algolia_invalid_json", status=resp.status_code, error=str(e))
+            raise RuntimeError(f"Unexpected Algolia response: invalid JSON ({e})")
+        # Basic schema validation: ensure 'results' present
+        if "results" not in data:
+            log_event("error", "algolia_unexpected_response", keys=list(data.keys()))
+            raise RuntimeError("Unexpected Algolia response: missing 'results'")
+        if limiter is not None:
+            limiter.on_success()
+        return data
     raise RuntimeError(f"Algolia request failed after retries: {last_err}")
 
 
-def sleep_with_jitter() -> None:
-    """
-    Sleep for a random duration between PAGE_DELAY_MIN_MS and PAGE_DELAY_MAX_MS.
-    Simulates human-like behavior and helps avoid rate-limiting.
-    """
-    delay_ms = random.randint(config.PAGE_DELAY_MIN_MS, config.PAGE_DELAY_MAX_MS)
-    delay_seconds = delay_ms / 1000.0
-    log_event("debug", "sleep_delay", delay_ms=delay_ms)
-    time.sleep(delay_seconds)
+def _timed_post(t: telemetry.Telemetry, session: requests.Session, url: str, body: Dict[str, Any], timeout: int) -> requests.Response:
+    """One POST, recorded as an algolia_request span with its latency, status and size."""
+    t0 = time.perf_counter()
+    status = "error"
+    try:
+        resp = session.post(url, json=body, timeout=timeout)
+        status = str(resp.status_code)
+    finally:
+        elapsed = time.perf_counter() - t0
+        t.add_span("algolia_request", elapsed)
+        t.inc("requests_total", status=status)
+    t.observe("request_seconds", elapsed, telemetry.LATENCY_BUCKETS)
+    t.observe("response_bytes", len(resp.content), telemetry.BYTES_BUCKETS)
+    return resp
 
 
 def get_first(d: Dict[str, Any], keys: Tuple[str, ...], default: Any = None) -> Any:
     for k in keys:
         if k in d and d[k] not in (None, ""):
             return d[k]
-    return default
\ No newline at end of file
+    return default
+
+
+def fold(text: str) -> str:
+    """Lowercase, accent-folded text (é -> e, œ -> oe)."""
+    text = text.replace("œ", "oe").replace("Œ", "oe").replace("æ", "ae").replace("Æ", "ae")
+    folded = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return folded.lower()
+
+
+def hierarchy_category(d: Dict[str, Any], level: str) -> Optional[str]:
+    """
+    Deepest label of hierarchicalCategories.<level>, e.g.
+    "Assortiment > Viande" -> "Viande". Lists use their first entry.
+    """
+    value = (d.get("hierarchicalCategories") or {}).get(level)
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return value.split(">")[-1].strip()
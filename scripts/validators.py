@@ -3,12 +3,16 @@ from typing import List, Dict, Any
 from . import config, utils
 
 
+def ensure_hit_has_required_keys(i: int, h: Dict[str, Any], required: List[str]) -> None:
+    for key in required:
+        if key not in h:
+            utils.log_event("error", "missing_required_key", index=i, key=key)
+            raise KeyError(f"Missing key {key} in hit {i}")
+
+
 def ensure_hits_have_required_keys(hits: List[Dict[str, Any]], required: List[str]) -> None:
     for i, h in enumerate(hits):
-        for key in required:
-            if key not in h:
-                utils.log_event("error", "missing_required_key", index=i, key=key)
-                raise KeyError(f"Missing key {key} in hit {i}")
+        ensure_hit_has_required_keys(i, h, required)
 
 
 def validate_product_count(total: int) -> None:
@@ -17,10 +21,16 @@ def validate_product_count(total: int) -> None:
         raise ValueError(f"Product count {total} out of expected range")
 
 
+MIN_REQUIRED_KEYS = ("id", "name", "category", "is_promotion")
+
+
+def validate_min_product(i: int, p: Dict[str, Any]) -> None:
+    for key in MIN_REQUIRED_KEYS:
+        if key not in p:
+            utils.log_event("error", "min_product_missing_key", index=i, key=key)
+            raise KeyError(f"Missing minimal key {key} in product {i}")
+
+
 def validate_min_products(products: List[Dict[str, Any]]) -> None:
-    required_top = ["id", "name", "category", "is_promotion"]
     for i, p in enumerate(products):
-        for key in required_top:
-            if key not in p:
-                utils.log_event("error", "min_product_missing_key", index=i, key=key)
-                raise KeyError(f"Missing minimal key {key} in product {i}")
\ No newline at end of file
+        validate_min_product(i, p)
\ No newline at end of file
@@ -0,0 +1,63 @@
+import datetime
+import os
+import sqlite3
+
+import pytest
+
+os.environ.setdefault("ALGOLIA_API_KEY", "test")
+
+from scripts import analytics, config, pipeline
+from scripts.scraper import AldiScraper
+
+
+def _run(tmp_path, monkeypatch, columnar):
+    monkeypatch.setattr(config, "MIN_PRODUCTS", 1)
+    monkeypatch.setattr(config, "ANALYTICS_EXPORT", True)
+    monkeypatch.setattr(config, "ANALYTICS_COLUMNAR", columnar)
+    sc = AldiScraper()
+    assortment = [
+        {"objectID": "A1", "productName": "Pain gris", "salesPrice": 2.0, "salesUnitFormatted": "800 g"},
+        {"objectID": "A2", "productName": "Lait demi-écrémé", "salesPrice": 1.1},
+        {"objectID": "A3", "productName": "Couette", "priceFormatted": "sur demande"},
+    ]
+    offers = [
+        {"objectID": "A1", "promoText": "Promo", "salesPrice": 1.5, "validUntil": "2025-03-02T23:59:00Z"},
+        {"objectID": "O1", "productName": "Thon", "salesPrice": 3.0, "validUntil": 1740873600000},
+    ]
+    monkeypatch.setattr(pipeline, "fetch_sources", lambda _: (iter(assortment), {h["objectID"]: h for h in offers}))
+    pipeline.run_pipeline(sc, str(tmp_path), last_updated="2025-03-01T00:00:00+00:00")
+    return tmp_path / config.ANALYTICS_DIR
+
+
+def test_sqlite_export_is_indexed_and_typed(tmp_path, monkeypatch):
+    out = _run(tmp_path, monkeypatch, "none")
+    assert sorted(os.listdir(out)) == [analytics.SQLITE_FILE]
+    db = sqlite3.connect(str(out / analytics.SQLITE_FILE))
+    rows = db.execute("SELECT id, category, price, base_price, is_promotion, in_assortment, offer_price, valid_until "
+                      "FROM catalog ORDER BY id").fetchall()
+    assert rows == [
+        ("A1", "boulangerie", 1.5, 2.0, 1, 1, 1.5, "2025-03-02"),
+        ("A2", "produits laitiers", 1.1, 1.1, 0, 1, None, None),
+        ("A3", "autres", None, None, 0, 1, None, None),
+        ("O1", "poisson", 3.0, None, 1, 0, 3.0, "2025-03-02"),
+    ]
+    indexes = {r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"products_category", "products_price", "products_is_promotion"} <= indexes
+    plan = " ".join(r[-1] for r in db.execute("EXPLAIN QUERY PLAN SELECT id FROM products WHERE price < 2"))
+    assert "products_price" in plan
+    assert dict(db.execute("SELECT key, value FROM meta"))["total_products"] == "4"
+
+
+def test_columnar_export_has_typed_columns(tmp_path, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    pa = pytest.importorskip("pyarrow")
+    out = _run(tmp_path, monkeypatch, "parquet")
+    table = pq.read_table(str(out / analytics.COLUMNAR_FILES["parquet"]))
+    assert table.schema.field("price").type == pa.float64()
+    assert table.schema.field("valid_until").type == pa.date32()
+    assert table.column("valid_until").to_pylist() == [datetime.date(2025, 3, 2), None, None, datetime.date(2025, 3, 2)]
+    assert table.column("category").to_pylist()[0] == "boulangerie"
+
+    out = _run(tmp_path, monkeypatch, "arrow")
+    with pa.OSFile(str(out / analytics.COLUMNAR_FILES["arrow"]), "rb") as f:
+        assert pa.ipc.open_stream(f).read_all().column("id").to_pylist() == ["A1", "A2", "A3", "O1"]
@@ -0,0 +1,39 @@
+import os
+
+os.environ.setdefault("ALGOLIA_API_KEY", "test")
+
+from benchmarks import compare, generator, run
+from scripts import config
+
+
+def test_generator_is_seeded_with_overlapping_offers():
+    catalog = generator.generate_catalog(500, seed=3)
+    assert catalog == generator.generate_catalog(500, seed=3)
+    assortment, offers = catalog[config.ASSORTMENT_INDEX], catalog[config.OFFERS_INDEX]
+    ids = {h["objectID"] for h in assortment}
+    assert len(ids) == 500 and len(offers) == 50 + 10
+    assert sum(h["objectID"] in ids for h in offers) == 50
+    assert generator.parse_size("10k") == 10_000 and generator.parse_size("1234") == 1234
+
+
+def test_stages_and_fetch_produce_rows(tmp_path):
+    rows = run.bench_stages(200, repeat=1, stages=["merge", "build_min", "pipeline"])
+    assert [r["stage"] for r in rows] == ["merge", "build_min", "pipeline"]
+    assert all(r["products"] == 204 and r["seconds"] >= 0 and "peak_bytes" in r for r in rows)
+    rows += run.bench_fetch(200, latency=0, modes=["batched"])
+    assert rows[-1]["hits"] == 200 + 24 and rows[-1]["requests"] >= 1
+    run.save_results(rows, str(tmp_path / "results.json"))
+    assert len(compare.load_results(str(tmp_path / "results.json"))) == 4
+
+
+def test_compare_flags_only_significant_regressions():
+    base = {("merge", 1000): {"seconds": 0.5, "peak_bytes": 10_000_000}, ("validate", 1000): {"seconds": 0.001}}
+    cur = {("merge", 1000): {"seconds": 0.8, "peak_bytes": 11_000_000}, ("validate", 1000): {"seconds": 0.003}}
+    flagged = {(r["stage"], r["metric"]) for r in compare.compare(base, cur, threshold=0.25) if r["regression"]}
+    assert flagged == {("merge", "seconds")}
+
+
+def test_module_benchmarks_check_against_the_former_implementations():
+    rows = run.bench_modules(["extractors", "records"], "", size=300)
+    assert [r["bench"] for r in rows] == ["extractors", "records"]
+    assert rows[1]["products"] == 300 + 30
@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+os.environ.setdefault("ALGOLIA_API_KEY", "test")
+
+from benchmarks import generator
+from scripts import checkpoint, config, standin
+from scripts.ratelimit import DeadlineExceeded
+from scripts.scraper import run
+
+
+def _products(tmp_path):
+    return json.loads((tmp_path / "data" / "products.json").read_text(encoding="utf-8"))["products"]
+
+
+def test_incomplete_run_is_reported_and_resumed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "MIN_PRODUCTS", 1)
+    monkeypatch.setattr(config, "MAX_REQUESTS_PER_SECOND", 0)
+    monkeypatch.setattr(config, "HITS_PER_PAGE", 5)
+    monkeypatch.setattr(config, "RUN_CHECKPOINTS", True)
+    monkeypatch.setattr(config, "RUN_REPORT", "report.json")
+    catalog = generator.generate_catalog(200)
+    journal = tmp_path / config.CHECKPOINT_DIR / checkpoint.JOURNAL_FILE
+
+    # Trop de 429 pour les 4 tentatives: certaines pages échouent
+    with standin.StandInServer(catalog, throttle_rate=0.6, retry_after=0, seed=3) as server:
+        monkeypatch.setattr(config, "ALGOLIA_HOST", server.url)
+        run()
+        flaky_requests = server.requests_served
+    report = json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))
+    assert report["status"] == "incomplete" and report["incomplete_units"]
+    assert all(u["error"] for u in report["incomplete_units"])
+    assert journal.exists()
+    partial = len(_products(tmp_path))
+
+    with standin.StandInServer(catalog) as server:
+        monkeypatch.setattr(config, "ALGOLIA_HOST", server.url)
+        run(resume=True)
+        resumed_requests = server.requests_served
+    report = json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))
+    assert report["status"] == "ok" and report["incomplete_units"] == [] and report["resumed_pages"] > 0
+    assert not journal.exists()
+    resumed = _products(tmp_path)
+    assert partial < len(resumed) == 200 + 200 // 50
+    assert resumed_requests < flaky_requests / 4
+
+    with standin.StandInServer(catalog) as server:
+        monkeypatch.setattr(config, "ALGOLIA_HOST", server.url)
+        run()
+    assert _products(tmp_path) == resumed
+
+
+def test_units_stopped_by_the_deadline_are_reported_without_a_journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "MAX_REQUESTS_PER_SECOND", 0)
+    monkeypatch.setattr(config, "HITS_PER_PAGE", 5)
+    monkeypatch.setattr(config, "GLOBAL_TIMEOUT_SECONDS", 1)
+    monkeypatch.setattr(config, "RUN_REPORT", "report.json")
+    with standin.StandInServer(generator.generate_catalog(200), latency=0.2) as server:
+        monkeypatch.setattr(config, "ALGOLIA_HOST", server.url)
+        with pytest.raises(DeadlineExceeded):
+            run()
+    report = json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))
+    assert report["status"] == "failed" and not (tmp_path / config.CHECKPOINT_DIR).exists()
+    units = report["incomplete_units"]
+    # Offres interrompues, assortiment jamais commencé: toutes ces unités sont signalées
+    per_index = {i: sum(u["index"] == i for u in units) for i in (config.ASSORTMENT_INDEX, config.OFFERS_INDEX)}
+    assert per_index[config.ASSORTMENT_INDEX] == len(config.CATEGORY_FILTERS) + 1
+    assert 0 < per_index[config.OFFERS_INDEX] < len(config.CATEGORY_FILTERS) + 1
+    assert all(u["page"] is None and u["error"] == "not completed" for u in units)
+
+
+def test_journal_from_other_settings_is_not_resumed(tmp_path, monkeypatch):
+    j = checkpoint.RunJournal(str(tmp_path))
+    j.record("idx", None, 0, {"hits": [{"objectID": "1"}], "nbPages": 1})
+    j.close(completed=False)
+    assert checkpoint.RunJournal(str(tmp_path), resume=True).get("idx", None, 0) == {"hits": [{"objectID": "1"}], "nbPages": 1}
+    j = checkpoint.RunJournal(str(tmp_path))
+    j.record("idx", None, 0, {"hits": [], "nbPages": 1})
+    j.close(completed=False)
+    monkeypatch.setattr(config, "HITS_PER_PAGE", 7)
+    assert checkpoint.RunJournal(str(tmp_path), resume=True).get("idx", None, 0) is None
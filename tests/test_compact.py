@@ -0,0 +1,97 @@
+import gzip
+import json
+import os
+
+os.environ.setdefault("ALGOLIA_API_KEY", "test")
+
+from scripts import compact, config, pipeline
+from scripts.scraper import AldiScraper
+
+AEM = "https://www.aldi.be/content/aldi/belgium/promotions/source-localenhancement/2019/2019-01/2019-01-02/vast_assortiment"
+RENDITION = "/_jcr_content/renditions/opt.592w.png.res/0/opt.592w.png"
+ITEMS = [
+    {"id": "996-1-0", "name": "Boulettes", "price": 3.49, "category": "autres",
+     "image_url": AEM + "/996/1/0/_jcr_content/assets/imported-images/BILD_INTERNET12/0996_a.png" + RENDITION,
+     "is_promotion": False, "promo_text": "<p>l&eacute;g&egrave;rement piquantes</p>", "valid_until": None, "unit": "6 x 120 g"},
+    {"id": "9899-1-0", "name": "Américain", "price": 5.99, "category": "autres",
+     "image_url": AEM + "/9899/1/0/_jcr_content/assets/imported-images/BILD_INTERNET18/9899_b.png" + RENDITION,
+     "is_promotion": True, "promo_text": None, "valid_until": "2025-03-02", "unit": "400 g"},
+    {"id": "X1", "name": "Sans image", "price": None, "category": "maison", "image_url": None,
+     "is_promotion": False, "promo_text": "", "valid_until": 1740873600000, "unit": None},
+    {"id": "X2", "name": "Autre CDN", "price": 1.0, "category": "maison", "image_url": "https://cdn.example/img/x2.jpg",
+     "is_promotion": True, "promo_text": "Promo", "valid_until": "2025-03-02", "unit": "400 g"},
+]
+META = {"schema_version": "1.0.0", "last_updated": "2025-03-01T00:00:00+00:00", "total_products": len(ITEMS)}
+
+
+def test_round_trip_and_dictionaries():
+    builder = compact.CompactMinBuilder()
+    for item in ITEMS:
+        builder.add(item)
+    doc = json.loads(json.dumps(builder.document(META)))
+    assert compact.decode(doc) == {"meta": META, "products": ITEMS}
+    assert doc["dicts"]["image_url.prefix"] == [AEM + "/", "https://cdn.example/img/"]
+    assert doc["dicts"]["image_url.suffix"] == [RENDITION, ""]
+    assert doc["columns"]["image_url"]["stem"][0].startswith("996/1/0/_jcr_content/assets/")
+    assert doc["dicts"]["unit"] == ["6 x 120 g", "400 g"]
+    assert doc["columns"]["unit"] == [0, 1, None, 1]
+    assert doc["columns"]["is_promotion"] == [0, 1, 0, 1]
+
+
+def test_dictionary_keeps_values_of_different_types_apart():
+    mixed = [
+        {"id": "M1", "category": "1", "unit": "1", "valid_until": "true"},
+        {"id": "M2", "category": 1, "unit": 1, "valid_until": True},
+        {"id": "M3", "category": 1.0, "unit": "1", "valid_until": 1},
+        {"id": "M4", "category": "1", "unit": True, "valid_until": "1"},
+    ]
+    builder = compact.CompactMinBuilder()
+    for item in mixed:
+        builder.add(item)
+    products = compact.decode(json.loads(json.dumps(builder.document())))["products"]
+    for got, item in zip(products, mixed):
+        for field in compact.DICT_FIELDS:
+            assert type(got[field]) is type(item[field]) and got[field] == item[field]
+    assert builder.document()["dicts"]["category"] == ["1", 1, 1.0]
+
+
+def test_artifacts_are_reproducible(tmp_path):
+    paths = {}
+    for run in ("a", "b"):
+        builder = compact.CompactMinBuilder()
+        for item in ITEMS:
+            builder.add(item)
+        sizes = builder.write(str(tmp_path / run), META)
+        paths[run] = tmp_path / run / compact.COMPACT_FILE
+        assert sizes["gz"] == os.path.getsize(str(paths[run]) + ".gz")
+    for ext in ("", ".gz") + ((".br",) if "br" in sizes else ()):
+        a = open(str(paths["a"]) + ext, "rb").read()
+        assert a == open(str(paths["b"]) + ext, "rb").read()
+        assert compact.load(str(paths["a"]) + ext)["products"] == ITEMS
+    assert gzip.decompress(open(str(paths["a"]) + ".gz", "rb").read()) == paths["a"].read_bytes()
+
+
+def test_pipeline_writes_compact_min(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MIN_PRODUCTS", 1)
+    monkeypatch.setattr(config, "COMPACT_OUTPUT", True)
+    assortment = [
+        {"objectID": "A1", "productName": "Pain gris", "salesPrice": 2.0, "salesUnitFormatted": "800 g"},
+        {"objectID": "A2", "productName": "Lait", "salesPrice": 1.1, "salesUnitFormatted": "1 l"},
+    ]
+    offers = [{"objectID": "A1", "promoText": "<p>Promo</p>", "salesPrice": 1.5}]
+    monkeypatch.setattr(pipeline, "fetch_sources", lambda _: (iter(assortment), {h["objectID"]: h for h in offers}))
+    pipeline.run_pipeline(AldiScraper(), str(tmp_path), last_updated="2025-03-01T00:00:00+00:00")
+    v1 = json.loads((tmp_path / "products-min.json").read_text(encoding="utf-8"))
+    assert compact.load(str(tmp_path / (compact.COMPACT_FILE + ".gz"))) == v1
+
+
+def test_same_products_keep_published_files(tmp_path):
+    for stamp in ("2025-01-01", "2025-01-08"):
+        builder = compact.CompactMinBuilder()
+        for item in ITEMS:
+            builder.add(item)
+        builder.write(str(tmp_path), {"last_updated": stamp})
+        if stamp == "2025-01-01":
+            first = {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path)}
+    assert {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path)} == first
+    assert compact.load(str(tmp_path / compact.COMPACT_FILE))["meta"] == {"last_updated": "2025-01-01"}
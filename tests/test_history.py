@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+os.environ.setdefault("ALGOLIA_API_KEY", "test")
+
+from scripts import history
+from scripts.history import PriceHistory
+
+
+def test_series_changes_and_compaction(tmp_path):
+    h = PriceHistory(str(tmp_path))
+    h.append_run("t1", [("A", 1.0, False, None), ("B", 2.0, False, None)])
+    h.append_run("t2", [("A", 1.0, False, None), ("B", 1.5, True, "2025-01-10")])
+    h.append_run("t3", [("A", 0.9, False, None), ("B", 1.5, True, "2025-01-10"), ("C", None, False, None)])
+
+    assert h.series("B") == [("t1", 2.0, False, None), ("t2", 1.5, True, "2025-01-10"), ("t3", 1.5, True, "2025-01-10")]
+    assert h.series("missing") == []
+    assert h.changed_in_last_runs(1) == ["A"]
+    assert h.changed_in_last_runs(2) == ["A", "B"]
+
+    assert h.compact() == (7, 5)
+    reopened = PriceHistory(str(tmp_path))
+    assert reopened.series("A") == [("t1", 1.0, False, None), ("t3", 0.9, False, None)]
+    assert reopened.series("C") == [("t3", None, False, None)]
+    assert reopened.changed_in_last_runs(2) == ["A", "B"]
+
+
+def test_aborted_run_is_discarded(tmp_path):
+    h = PriceHistory(str(tmp_path))
+    h.append_run("t1", [("A", 1.0, False, None)])
+    with h.start_run("t2") as w:
+        w.add("A", 5.0, False, None)
+    reopened = PriceHistory(str(tmp_path))
+    assert reopened.series("A") == [("t1", 1.0, False, None)]
+    assert len(reopened.runs) == 1
+
+
+@pytest.mark.parametrize("fail_on", ["samples.bin", "runs.json"])
+def test_interrupted_compaction_is_recovered(tmp_path, monkeypatch, fail_on):
+    h = PriceHistory(str(tmp_path))
+    h.append_run("t1", [("A", 1.0, False, None), ("B", 2.0, False, None)])
+    h.append_run("t2", [("A", 1.0, False, None), ("B", 1.5, False, None)])
+    replace = os.replace
+
+    def crash(src, dst):
+        if os.path.basename(dst) == fail_on:
+            raise OSError("simulated crash")
+        replace(src, dst)
+
+    monkeypatch.setattr(history.os, "replace", crash)
+    with pytest.raises(OSError):
+        h.compact()
+    monkeypatch.setattr(history.os, "replace", replace)
+
+    # Arrêt avant l'échange: historique d'origine; après: compaction terminée
+    reopened = PriceHistory(str(tmp_path))
+    compacted = fail_on == "runs.json"
+    assert reopened.series("A") == [("t1", 1.0, False, None)] + ([] if compacted else [("t2", 1.0, False, None)])
+    assert reopened.series("B") == [("t1", 2.0, False, None), ("t2", 1.5, False, None)]
+    assert sum(r["count"] for r in reopened.runs) == (3 if compacted else 4)
+    assert sorted(os.listdir(tmp_path)) == ["products.txt", "runs.json", "samples.bin"]
+
+
+def test_unchanged_incremental_run_adds_no_history(tmp_path, monkeypatch):
+    from scripts import config, pipeline
+    from scripts.scraper import AldiScraper
+    monkeypatch.setattr(config, "MIN_PRODUCTS", 1)
+    monkeypatch.setattr(config, "INCREMENTAL_RUNS", True)
+    monkeypatch.setattr(config, "PRICE_HISTORY", True)
+    catalog = [{"objectID": "A1", "productName": "Pain", "price": 2.0}]
+    monkeypatch.setattr(pipeline, "fetch_sources", lambda _: (iter(catalog), {}))
+    for day in ("01", "08"):
+        pipeline.run_pipeline(AldiScraper(), str(tmp_path), last_updated=f"2025-01-{day}T00:00:00+00:00")
+    catalog[0] = {"objectID": "A1", "productName": "Pain", "price": 1.8}
+    pipeline.run_pipeline(AldiScraper(), str(tmp_path), last_updated="2025-01-15T00:00:00+00:00")
+    h = PriceHistory(str(tmp_path / config.HISTORY_DIR))
+    assert [r["timestamp"] for r in h.runs] == ["2025-01-01T00:00:00+00:00", "2025-01-15T00:00:00+00:00"]
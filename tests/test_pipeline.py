@@ -0,0 +1,148 @@
+import json
+import os
+
+os.environ.setdefault("ALGOLIA_API_KEY", "test")
+
+from scripts import config, pipeline
+from scripts.scraper import AldiScraper
+
+
+def test_json_document_writer_matches_json_dump(tmp_path):
+    items = [{"id": "1", "name": "Pâtes", "tags": ["a", {"b": None}]}, {"id": "2", "name": "Riz", "nested": {}}]
+    meta = {"schema_version": "1.0.0", "total_products": 2, "indices": ["x", "y"]}
+    path = tmp_path / "out.json"
+    with pipeline.JsonDocumentWriter(str(path)) as w:
+        for item in items:
+            w.write(item)
+        w.commit(meta)
+    expected = json.dumps({"meta": meta, "products": items}, ensure_ascii=False, indent=2)
+    assert path.read_text(encoding="utf-8") == expected
+    assert sorted(os.listdir(tmp_path)) == ["out.json"]
+
+
+def test_json_document_writer_empty_and_abort(tmp_path):
+    path = tmp_path / "out.json"
+    with pipeline.JsonDocumentWriter(str(path)) as w:
+        w.commit({"total_products": 0})
+    assert path.read_text(encoding="utf-8") == json.dumps({"meta": {"total_products": 0}, "products": []}, indent=2)
+    with pipeline.JsonDocumentWriter(str(tmp_path / "other.json")) as w:
+        w.write({"id": "1"})
+    assert sorted(os.listdir(tmp_path)) == ["out.json"]
+
+
+def test_streaming_pipeline_matches_in_memory_build(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MIN_PRODUCTS", 1)
+    sc = AldiScraper()
+    assortment = [
+        {"objectID": "A1", "productName": "Pain gris", "price": 2.0},
+        {"objectID": "A2", "productName": "Lait", "salesPrice": 1.1},
+        {"objectID": "A1", "productName": "Pain gris", "price": 2.0},
+    ]
+    offers = [{"objectID": "A1", "promoText": "Promo", "price": 1.5}, {"objectID": "O1", "productName": "Thon", "price": 3.0}]
+    monkeypatch.setattr(pipeline, "fetch_sources", lambda _: (iter(assortment), {h["objectID"]: h for h in offers}))
+    ts = "2025-01-01T00:00:00+00:00"
+    pipeline.run_pipeline(sc, str(tmp_path), last_updated=ts)
+
+    merged = sc.merge(assortment[:2], offers)
+    full = {"meta": sc.full_meta(len(merged), ts), "products": list(merged.values())}
+    minimal = sc.build_min(merged)
+    minimal["meta"] = sc.min_meta(len(merged), ts)
+    assert json.loads((tmp_path / "products.json").read_text(encoding="utf-8")) == full
+    assert json.loads((tmp_path / "products-min.json").read_text(encoding="utf-8")) == minimal
+
+
+def test_incremental_run_writes_delta_and_skips_unchanged(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MIN_PRODUCTS", 1)
+    monkeypatch.setattr(config, "INCREMENTAL_RUNS", True)
+    sc = AldiScraper()
+    catalog = [{"objectID": "A1", "productName": "Pain", "price": 2.0}, {"objectID": "A2", "productName": "Lait", "price": 1.0}]
+    monkeypatch.setattr(pipeline, "fetch_sources", lambda _: (iter(catalog), {}))
+    pipeline.run_pipeline(sc, str(tmp_path), last_updated="2025-01-01T00:00:00+00:00")
+    assert not (tmp_path / "changes").exists()
+    first = (tmp_path / "products-min.json").read_text(encoding="utf-8")
+
+    # Même contenu: aucun fichier réécrit, mais les autres sorties sont produites
+    monkeypatch.setattr(config, "SHARDED_OUTPUT", True)
+    pipeline.run_pipeline(sc, str(tmp_path), last_updated="2025-01-08T00:00:00+00:00")
+    assert (tmp_path / "products-min.json").read_text(encoding="utf-8") == first
+    assert not (tmp_path / "changes").exists()
+    assert (tmp_path / config.SHARDS_DIR / "manifest.json").exists()
+    monkeypatch.setattr(config, "SHARDED_OUTPUT", False)
+
+    catalog[1] = {"objectID": "A2", "productName": "Lait", "price": 0.9}
+    catalog.pop(0)
+    catalog.append({"objectID": "A3", "productName": "Riz", "price": 1.2})
+    pipeline.run_pipeline(sc, str(tmp_path), last_updated="2025-01-15T00:00:00+00:00")
+    change = json.loads((tmp_path / "changes" / "20250115T000000Z.json").read_text(encoding="utf-8"))
+    assert [p["id"] for p in change["added"]] == ["A3"]
+    assert [p["id"] for p in change["changed"]] == ["A2"]
+    assert change["removed"] == ["A1"]
+    assert change["meta"]["from"] == "2025-01-01T00:00:00+00:00"
+    index = json.loads((tmp_path / "changes" / "index.json").read_text(encoding="utf-8"))
+    assert [d["file"] for d in index["deltas"]] == ["20250115T000000Z.json"]
+
+
+def test_shard_writer_pages_and_manifest(tmp_path):
+    from scripts.shards import ShardWriter
+    out = tmp_path / "shards"
+    items = [{"id": str(i), "name": f"P{i}", "category": "fruits" if i % 2 else "épicerie"} for i in range(5)]
+    with ShardWriter(str(out), page_size=2) as w:
+        for item in items:
+            w.add(item, {"hierarchicalCategories": {"lvl3": "Assortiment > Fruits frais"}})
+        manifest = w.commit({"total_products": 5})
+    cols = manifest["collections"]
+    assert sorted(cols) == ["aldi-fruits-frais", "all", "category-epicerie", "category-fruits"]
+    assert [p["count"] for p in cols["all"]["pages"]] == [2, 2, 1]
+    assert cols["category-epicerie"]["label"] == "épicerie"
+    page = cols["all"]["pages"][2]
+    data = (out / page["file"]).read_bytes()
+    assert len(data) == page["bytes"]
+    assert json.loads(data)["products"] == [items[4]]
+    assert page["file"].startswith("all.2.") and page["sha256"][:12] in page["file"]
+
+
+def test_shard_writer_only_prunes_its_own_shards(tmp_path):
+    from scripts.shards import ShardWriter
+    (tmp_path / "products.json").write_text("{}", encoding="utf-8")
+    files = []
+    for run in range(3):
+        with ShardWriter(str(tmp_path)) as w:
+            w.add({"id": str(run), "name": f"P{run}", "category": "fruits"})
+            files.append(w.commit({})["collections"]["all"]["pages"][0]["file"])
+    # Les shards du manifest précédent restent, les plus anciens partent
+    assert not (tmp_path / files[0]).exists()
+    assert (tmp_path / files[1]).exists() and (tmp_path / files[2]).exists()
+    assert (tmp_path / "products.json").exists()
+
+
+def test_shard_writer_keeps_manifest_when_shards_unchanged(tmp_path):
+    from scripts.shards import ShardWriter
+    for run, stamp in enumerate(("2025-01-01", "2025-01-08")):
+        with ShardWriter(str(tmp_path)) as w:
+            w.add({"id": "1", "name": "Pain", "category": "épicerie"})
+            manifest = w.commit({"last_updated": stamp})
+        if run == 0:
+            first = (tmp_path / "manifest.json").read_bytes()
+    assert (tmp_path / "manifest.json").read_bytes() == first
+    assert manifest["last_updated"] == "2025-01-01"
+
+
+def test_unchanged_run_leaves_data_byte_identical(tmp_path, monkeypatch):
+    # Mêmes options que .github/workflows/scrape-aldi.yml
+    monkeypatch.setattr(config, "MIN_PRODUCTS", 1)
+    for flag in ("INCREMENTAL_RUNS", "PRICE_HISTORY", "SHARDED_OUTPUT", "SEARCH_INDEX", "COMPACT_OUTPUT"):
+        monkeypatch.setattr(config, flag, True)
+    catalog = [
+        {"objectID": "A1", "productName": "Pain gris", "price": 2.0,
+         "hierarchicalCategories": {"lvl3": "Assortiment > Pain"}},
+        {"objectID": "A2", "productName": "Lait entier", "price": 1.0},
+    ]
+    monkeypatch.setattr(pipeline, "fetch_sources", lambda _: (iter(catalog), {}))
+
+    def snapshot():
+        return {str(p.relative_to(tmp_path)): p.read_bytes() for p in sorted(tmp_path.rglob("*")) if p.is_file()}
+
+    pipeline.run_pipeline(AldiScraper(), str(tmp_path), last_updated="2025-01-01T00:00:00+00:00")
+    first = snapshot()
+    pipeline.run_pipeline(AldiScraper(), str(tmp_path), last_updated="2025-01-08T00:00:00+00:00")
+    assert snapshot() == first
@@ -0,0 +1,65 @@
+import json
+import os
+from urllib.parse import parse_qs
+
+os.environ.setdefault("ALGOLIA_API_KEY", "test")
+
+from scripts.planner import FacetPlanner
+
+LVL3 = "hierarchicalCategories.lvl3"
+LVL4 = "hierarchicalCategories.lvl4"
+
+
+def _fake_post(body):
+    params = {k: v[0] for k, v in parse_qs(body["requests"][0]["params"]).items()}
+    filters = params.get("filters", "")
+    facets = params.get("facets", "")
+    if not filters:
+        res = {"nbHits": 2500, "facets": {LVL3: {"A": 900, "B": 80, "C": 1200, "D": 20}}}
+    elif filters == f"NOT {LVL3}:*":
+        res = {"nbHits": 300}
+    elif filters.startswith(f'{LVL3}:"C"') and f"NOT {LVL4}:*" in filters:
+        res = {"nbHits": 0}
+    elif filters.startswith(f'{LVL3}:"C"'):
+        res = {"nbHits": 1200, "facets": {LVL4: {"C1": 700, "C2": 500}}}
+    else:
+        raise AssertionError(filters)
+    if LVL3 not in facets and LVL4 not in facets:
+        res.pop("facets", None)
+    return {"results": [res]}
+
+
+def test_plan_packs_small_buckets_and_splits_oversized_ones():
+    plan = FacetPlanner(_fake_post, facets=[LVL3, LVL4], cap=1000).plan("idx")
+    filters = [f for _, f in plan]
+    # A + B + D tiennent sous 1000, C est découpé par lvl4, puis les non catégorisés
+    assert filters == [
+        f'({LVL3}:"A" OR {LVL3}:"B" OR {LVL3}:"D")',
+        f'{LVL3}:"C" AND {LVL4}:"C1"',
+        f'{LVL3}:"C" AND {LVL4}:"C2"',
+        f"NOT {LVL3}:*",
+    ]
+
+
+def _overlapping_post(body):
+    params = {k: v[0] for k, v in parse_qs(body["requests"][0]["params"]).items()}
+    filters = params.get("filters", "")
+    # 200 produits sont à la fois dans A et B
+    hits = {
+        "": 1000,
+        f'{LVL3}:"A"': 600,
+        f'{LVL3}:"B" AND NOT {LVL3}:"A"': 300,
+        f"NOT {LVL3}:*": 100,
+    }
+    res = {"nbHits": hits[filters]}
+    if LVL3 in params.get("facets", ""):
+        res["facets"] = {LVL3: {"A": 600, "B": 500}}
+    return {"results": [res]}
+
+
+def test_overlapping_values_are_counted_once(capsys):
+    plan = FacetPlanner(_overlapping_post, facets=[LVL3], cap=700).plan("idx")
+    assert [f for _, f in plan] == [f'{LVL3}:"A"', f'{LVL3}:"B" AND NOT {LVL3}:"A"', f"NOT {LVL3}:*"]
+    coverage = [json.loads(line) for line in capsys.readouterr().out.splitlines()][-1]
+    assert coverage["message"] == "plan_coverage"
+    assert coverage["planned_total"] == coverage["index_total"] == 1000
@@ -0,0 +1,99 @@
+import asyncio
+import gzip
+import json
+import os
+
+import pytest
+
+from benchmarks import loadtest
+from scripts.query_server import CatalogIndex, QueryServer
+
+PRODUCTS = [
+    {"id": "A1", "name": "Pain gris", "category": "Boulangerie", "price": 2.0, "is_promotion": False},
+    {"id": "A2", "name": "Croissant", "category": "Boulangerie", "price": 0.5, "is_promotion": True},
+    {"id": "A3", "name": "Lait", "category": "Produits laitiers", "price": 1.1, "is_promotion": False},
+    {"id": "A4", "name": "Couette", "category": "Maison", "price": None, "is_promotion": False},
+    {"id": "A5", "name": "Éclair", "category": "Boulangerie", "price": 1.1, "is_promotion": True},
+]
+
+
+def _write(data_dir, products, last_updated):
+    meta = {"last_updated": last_updated, "total_products": len(products)}
+    with open(os.path.join(data_dir, "products-min.json"), "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "products": products}, f)
+    with open(os.path.join(data_dir, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def _ids(result):
+    return [p["id"] for p in result["products"]]
+
+
+def test_index_filters_sorts_and_paginates():
+    index = CatalogIndex(PRODUCTS, {})
+    assert _ids(index.query()) == ["A1", "A2", "A3", "A4", "A5"]
+    assert _ids(index.query(category="boulangerie")) == ["A1", "A2", "A5"]
+    assert _ids(index.query(promo=True, sort="price")) == ["A2", "A5"]
+    assert _ids(index.query(promo=False)) == ["A1", "A3", "A4"]
+    # Plage de prix: catalogue d'origine sauf tri explicite, bornes incluses
+    assert _ids(index.query(min_price=1.1, max_price=2)) == ["A1", "A3", "A5"]
+    assert _ids(index.query(max_price=1.1, sort="-price", category="Boulangerie")) == ["A5", "A2"]
+    assert _ids(index.query(sort="-price")) == ["A1", "A5", "A3", "A2", "A4"]
+    assert _ids(index.query(sort="name")) == ["A4", "A2", "A5", "A3", "A1"]
+    page = index.query(sort="price", page=1, per_page=2)
+    assert (page["total"], _ids(page)) == (5, ["A5", "A1"])
+    with pytest.raises(ValueError):
+        index.query(sort="random")
+
+
+def test_server_etag_gzip_and_hot_reload(tmp_path):
+    _write(str(tmp_path), PRODUCTS * 10, "2025-03-01T00:00:00+00:00")
+
+    async def scenario():
+        server = await QueryServer(str(tmp_path), port=0, reload_interval=0, gzip_min_bytes=256).start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+
+        async def get(path, **headers):
+            lines = [f"GET {path} HTTP/1.1", "Host: test"] + [f"{k.replace('_', '-')}: {v}" for k, v in headers.items()]
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+            got = dict(line.lower().split(": ", 1) for line in head[1:] if line)
+            body = await reader.readexactly(int(got["content-length"]))
+            return int(head[0].split()[1]), got, body
+
+        try:
+            status, headers, body = await get("/products?category=boulangerie&per_page=100", Accept_Encoding="gzip")
+            assert status == 200 and headers["content-encoding"] == "gzip"
+            assert json.loads(gzip.decompress(body))["total"] == 30
+            etag = headers["etag"]
+
+            # Même requête, paramètres dans un autre ordre: même ETag
+            status, _, body = await get("/products?per_page=100&category=boulangerie", If_None_Match=etag)
+            assert (status, body) == (304, b"")
+            status, _, body = await get("/products?per_page=1")
+            assert status == 200 and json.loads(body)["total"] == 50
+            assert (await get("/products?sort=random"))[0] == 400
+            assert (await get("/nope"))[0] == 404
+
+            assert not await server.check_reload()
+            _write(str(tmp_path), PRODUCTS[:2], "2025-03-02T00:00:00+00:00")
+            assert await server.check_reload()
+            status, _, body = await get("/products?per_page=100&category=boulangerie", If_None_Match=etag)
+            assert status == 200 and json.loads(body)["total"] == 2
+
+            result = await loadtest.run_load(server.url, loadtest.query_mix(["Boulangerie"], n=20), requests=50,
+                                             concurrency=4, conditional=0.5)
+            assert result["requests"] == 50 and result["requests_per_second"] > 0
+            assert set(result["statuses"]) <= {"200", "304"}
+
+            for length in ("abc", "-1"):
+                bad_reader, bad_writer = await asyncio.open_connection("127.0.0.1", server.port)
+                bad_writer.write(f"GET /products HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode("latin-1"))
+                response = await bad_reader.read()
+                bad_writer.close()
+                assert response.startswith(b"HTTP/1.1 400 ") and b"Connection: close" in response
+        finally:
+            writer.close()
+            await server.stop()
+
+    asyncio.run(scenario())
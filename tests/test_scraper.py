@@ -16,7 +16,8 @@ def set_env():
 
 
 @responses.activate
-def test_get_all_products_from_index():
+def test_get_all_products_from_index(monkeypatch):
+    monkeypatch.setattr(config, "MAX_REQUESTS_PER_SECOND", 0)
     url = f"https://{config.ALGOLIA_APP_ID}-dsn.algolia.net/1/indexes/*/queries"
     responses.add(
         responses.POST,
@@ -36,4 +37,153 @@ def test_merge_promotions_override_price():
     offers = [{"objectID": "A1", "promoText": "Promo", "price": 1.5}]
     merged = sc.merge(assortment, offers)
     assert merged["A1"]["is_promotion"] is True
-    assert merged["A1"]["price"] == 1.5
\ No newline at end of file
+    assert merged["A1"]["price"] == 1.5
+
+def _paged_callback(request):
+    import json
+    body = json.loads(request.body)
+    results = []
+    for sub in body["requests"]:
+        index = sub["indexName"]
+        page = int(sub["params"].split("page=")[1].split("&")[0])
+        # Trois pages par filtre, objectIDs partagés entre filtres pour tester la déduplication
+        hits = [{"objectID": f"{index}-{page}-{i}", "productName": "X"} for i in range(2)]
+        results.append({"hits": hits, "nbPages": 3})
+    return (200, {}, json.dumps({"results": results}))
+
+
+@responses.activate
+def test_concurrent_fetch_matches_serial(monkeypatch):
+    url = f"https://{config.ALGOLIA_APP_ID}-dsn.algolia.net/1/indexes/*/queries"
+    responses.add_callback(responses.POST, url, callback=_paged_callback)
+    monkeypatch.setattr(config, "MAX_REQUESTS_PER_SECOND", 0)
+    sc = AldiScraper()
+    serial = sc.fetch()
+    monkeypatch.setattr(config, "CONCURRENT_FETCH", True)
+    concurrent = sc.fetch()
+    assert concurrent == serial
+    assert len(serial["assortment"]) == 6
+
+
+@responses.activate
+def test_batched_fetch_matches_serial_and_retries_failed_subqueries(monkeypatch):
+    import json
+    url = f"https://{config.ALGOLIA_APP_ID}-dsn.algolia.net/1/indexes/*/queries"
+    failed_once = set()
+
+    def flaky(request):
+        status, headers, body = _paged_callback(request)
+        data = json.loads(body)
+        sent = json.loads(request.body)["requests"]
+        for i, sub in enumerate(sent):
+            key = (sub["indexName"], sub["params"])
+            if "page=1" in sub["params"] and key not in failed_once:
+                failed_once.add(key)
+                data["results"][i] = {"message": "boom", "status": 500}
+        return (status, headers, json.dumps(data))
+
+    responses.add_callback(responses.POST, url, callback=flaky)
+    monkeypatch.setattr(config, "MAX_REQUESTS_PER_SECOND", 0)
+    sc = AldiScraper()
+    monkeypatch.setattr(config, "BATCH_QUERIES", True)
+    batched = sc.fetch()
+    batch_calls = len(responses.calls)
+    monkeypatch.setattr(config, "BATCH_QUERIES", False)
+    serial = sc.fetch()
+    assert batched == serial
+    # 46 unités x 3 pages: 1 POST (pages 0) + 2 (pages 1-2) + 1 (pages 1 en échec) au lieu de 138
+    assert batch_calls == 4
+
+
+@responses.activate
+def test_post_honours_retry_after_and_lowers_rate():
+    from scripts import utils
+    from scripts.ratelimit import RateLimiter
+    url = f"https://{config.ALGOLIA_APP_ID}-dsn.algolia.net/1/indexes/*/queries"
+    responses.add(responses.POST, url, status=429, headers={"Retry-After": "0"})
+    responses.add(responses.POST, url, json={"results": [{"hits": []}]}, status=200)
+    limiter = RateLimiter(initial_rate=8, min_rate=1, max_rate=10)
+    data = utils.post_algolia_queries(utils.get_session(), {"requests": []}, limiter=limiter)
+    assert data == {"results": [{"hits": []}]}
+    assert limiter.throttles == 1
+    assert limiter.stats()["rate"] == 4.25
+
+
+@responses.activate
+def test_post_fails_fast_on_client_error():
+    from scripts import utils
+    url = f"https://{config.ALGOLIA_APP_ID}-dsn.algolia.net/1/indexes/*/queries"
+    responses.add(responses.POST, url, json={"message": "Invalid API key"}, status=403)
+    with pytest.raises(Exception):
+        utils.post_algolia_queries(utils.get_session(), {"requests": []})
+    assert len(responses.calls) == 1
+
+
+def test_categorize_uses_word_boundaries_and_hierarchy():
+    sc = AldiScraper()
+    assert sc.categorize("Épinards hachés surgelés") == "légumes"
+    assert sc.categorize("Pains au chocolat") == "boulangerie"
+    assert sc.categorize("Gouda jeune au lait cru") == "produits laitiers"
+    assert sc.categorize("Boulettes de friture") == "autres"
+    raw = {"hierarchicalCategories": {"lvl3": "Assortiment > Produits frais > Viande"}}
+    assert sc.categorize("Boulettes de friture", raw) == "viandes"
+
+
+def test_shape_compiled_min_items_match_single_item_extraction():
+    from benchmarks import generator
+    sc = AldiScraper()
+    catalog = generator.generate_catalog(200)
+    hits = catalog[config.ASSORTMENT_INDEX] + [
+        {"objectID": "x1", "name": "", "title": "Titre", "images": ["a.png", "b.png"], "price": None, "priceFormatted": "2,49"},
+        {"objectID": "x2", "productName": "Riz", "image": "https://x/y.png 288w", "size": "", "quantity": "1 kg", "priceFormatted": "n/a"},
+        {"objectID": "x3", "label": "Sans champs", "images": [], "is_promotion": True, "valid_until": "2025-01-01"},
+    ]
+    products = sc.merge(hits, catalog[config.OFFERS_INDEX] + hits[-3:])
+    batched = [item for _, _, item in sc.iter_min_items(products.items(), chunk_size=64)]
+    assert batched == [sc.build_min_item(pid, p) for pid, p in products.items()]
+
+
+def test_product_records_expand_to_former_merged_dicts():
+    sc = AldiScraper()
+    assortment = [{"objectID": "A1", "productName": "Pain", "salesPrice": 2.0}, {"objectID": "A2", "productName": "Lait", "price": ""}]
+    offers = [{"objectID": "A1", "promoText": "Promo", "price": 1.5, "validUntil": "2025-01-31"}, {"objectID": "O1", "productName": "Thon"}]
+    merged = sc.merge(assortment, offers)
+    assert assortment[0] is merged["A1"].raw  # pas de copie du hit
+    assert list(merged["A1"].to_dict().items()) == [
+        ("objectID", "A1"), ("productName", "Pain"), ("salesPrice", 2.0), ("is_promotion", True),
+        ("promo_text", "Promo"), ("valid_until", "2025-01-31"), ("price", 1.5), ("source_offer", True),
+    ]
+    assert merged["A2"].to_dict() == {"objectID": "A2", "productName": "Lait", "price": "", "is_promotion": False, "promo_text": None, "valid_until": None}
+    assert merged["A2"].price is None and merged["A2"]["price"] == ""
+    assert list(merged["O1"].to_dict()) == ["objectID", "productName", "is_promotion", "promo_text", "valid_until", "source_offer"]
+
+
+@responses.activate
+def test_lean_fetch_projects_fields_and_counts_compressed_bytes(monkeypatch):
+    import gzip
+    import json
+    from urllib.parse import parse_qs
+    from scripts import extractors
+    url = f"https://{config.ALGOLIA_APP_ID}-dsn.algolia.net/1/indexes/*/queries"
+    seen = []
+
+    def callback(request):
+        seen.append(request)
+        hits = [{"objectID": str(i), "productName": "Gouda jeune " * 20} for i in range(50)]
+        body = gzip.compress(json.dumps({"results": [{"hits": hits, "nbPages": 1}]}).encode())
+        return (200, {"Content-Encoding": "gzip"}, body)
+
+    responses.add_callback(responses.POST, url, callback=callback)
+    monkeypatch.setattr(config, "MAX_REQUESTS_PER_SECOND", 0)
+    monkeypatch.setattr(config, "FETCH_MODE", "lean")
+    sc = AldiScraper()
+    assert len(sc._query_single_filter("idx")) == 50
+
+    assert "gzip" in seen[0].headers["Accept-Encoding"]
+    params = parse_qs(json.loads(seen[0].body)["requests"][0]["params"])
+    assert json.loads(params["attributesToRetrieve"][0]) == list(extractors.LEAN_ATTRIBUTES)
+    assert params["attributesToHighlight"] == ["[]"] and params["analytics"] == ["false"]
+    assert "nbPages" in json.loads(params["responseFields"][0])
+    stats = sc.transfer.stats()
+    assert stats["responses"] == stats["compressed_responses"] == 1
+    assert 0 < stats["wire_bytes"] < stats["body_bytes"]
@@ -0,0 +1,48 @@
+import os
+
+os.environ.setdefault("ALGOLIA_API_KEY", "test")
+
+from scripts.search_index import SearchIndex, SearchIndexBuilder, tokenize
+
+
+def test_tokenize_folds_accents_and_strips_html():
+    assert tokenize("<p>l&eacute;g&egrave;rement piquantes, b&oelig;uf</p>") == ["legerement", "piquantes", "boeuf"]
+    assert tokenize("<ul><li>ananas/orange</li><li>m&ucirc;re</li></ul>") == ["ananas", "orange", "mure"]
+
+
+def test_prefix_search_with_facets(tmp_path):
+    b = SearchIndexBuilder()
+    b.add({"id": "1", "name": "Fromage râpé", "category": "fromages", "is_promotion": True})
+    b.add({"id": "2", "name": "Fromage blanc", "category": "produits laitiers", "is_promotion": False})
+    b.add({"id": "3", "name": "Pain gris", "promo_text": "<p>au fromage</p>", "category": "boulangerie", "is_promotion": False})
+    b.write(str(tmp_path))
+    idx = SearchIndex(str(tmp_path))
+
+    res = idx.search("FROM")
+    assert res["ids"] == ["1", "2", "3"]
+    assert res["facets"]["is_promotion"] == {"false": 2, "true": 1}
+    assert idx.search("fromage rape")["ids"] == ["1"]
+    assert idx.search("fromage", is_promotion=False, category="boulangerie")["ids"] == ["3"]
+    assert idx.search("f")["total"] == 3
+    assert idx.search("zzz")["ids"] == []
+
+
+def test_rewrite_replaces_files_and_drops_stale_buckets(tmp_path):
+    for names in (["Fromage", "Pain", "Lait"], ["Fromage"]):
+        b = SearchIndexBuilder()
+        for i, name in enumerate(names):
+            b.add({"id": str(i), "name": name})
+        b.write(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["index.json", "terms-fr.json"]
+    assert SearchIndex(str(tmp_path)).search("pain")["ids"] == []
+
+
+def test_unchanged_index_is_not_rewritten(tmp_path):
+    for stamp in ("2025-01-01", "2025-01-08"):
+        b = SearchIndexBuilder()
+        b.add({"id": "1", "name": "Pain complet"})
+        header = b.write(str(tmp_path), {"last_updated": stamp})
+        if stamp == "2025-01-01":
+            first = {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path)}
+    assert {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path)} == first
+    assert header["last_updated"] == "2025-01-01"
@@ -0,0 +1,79 @@
+import json
+import os
+
+os.environ.setdefault("ALGOLIA_API_KEY", "test")
+
+from benchmarks import generator
+from scripts import config, standin
+from scripts.scraper import AldiScraper, run
+
+
+def _hit(pid, lvl3=None, **extra):
+    h = {"objectID": pid, "productName": f"P{pid}", "price": 1.0, **extra}
+    if lvl3 is not None:
+        h["hierarchicalCategories"] = {"lvl3": lvl3}
+    return h
+
+
+def test_filters_follow_algolia_syntax():
+    hits = [_hit("1", "Viande"), _hit("2", 'Pain "bio"'), _hit("3"), _hit("4", "Fruits frais", tags=["a", "b"])]
+    def ids(expr):
+        pred = standin.compile_filters(expr)
+        return [h["objectID"] for h in hits if pred(h)]
+    assert ids(None) == ["1", "2", "3", "4"]
+    assert ids('hierarchicalCategories.lvl3:"Viande"') == ["1"]
+    assert ids('hierarchicalCategories.lvl3:"Pain \\"bio\\""') == ["2"]
+    assert ids("NOT hierarchicalCategories.lvl3:*") == ["3"]
+    assert ids('(hierarchicalCategories.lvl3:"Viande" OR hierarchicalCategories.lvl3:"Fruits frais") AND NOT tags:b') == ["1"]
+    assert ids("tags:a") == ["4"]
+
+
+def test_standin_answers_pages_facets_and_projection():
+    hits = [_hit(str(i), "A" if i % 3 else "B") for i in range(25)]
+    server = standin.StandInServer({"idx": hits})
+    res = server.answer({"indexName": "idx", "params": 'hitsPerPage=10&page=2&filters=hierarchicalCategories.lvl3%3A%22A%22'
+                                                        '&attributesToRetrieve=%5B%22price%22%5D'})
+    assert res["nbHits"] == 16 and res["nbPages"] == 2 and res["hits"] == []
+    res = server.answer({"indexName": "idx", "params": 'hitsPerPage=0&facets=%5B%22hierarchicalCategories.lvl3%22%5D'
+                                                        '&responseFields=%5B%22nbHits%22%2C%22facets%22%5D'})
+    assert res == {"nbHits": 25, "facets": {"hierarchicalCategories.lvl3": {"A": 16, "B": 9}}}
+    res = server.answer({"indexName": "idx", "params": "hitsPerPage=4&attributesToRetrieve=%5B%22price%22%5D"})
+    assert res["hits"][0] == {"objectID": "0", "price": 1.0}
+    server.stop()
+
+
+def test_offline_run_through_faults_and_recording_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "MIN_PRODUCTS", 1)
+    monkeypatch.setattr(config, "MAX_REQUESTS_PER_SECOND", 0)
+    monkeypatch.setattr(config, "HITS_PER_PAGE", 5)
+    monkeypatch.setattr(config, "BATCH_QUERIES", True)
+    monkeypatch.setattr(config, "BATCH_SIZE", 8)
+    monkeypatch.setattr(config, "RECORD_CATALOG", str(tmp_path / "recorded.json"))
+    catalog = generator.generate_catalog(300)
+    with standin.StandInServer(catalog, throttle_rate=0.3, error_rate=0.05, retry_after=0) as server:
+        monkeypatch.setattr(config, "ALGOLIA_HOST", server.url)
+        run()
+    assert server.faults["429"] and server.faults["503"], server.faults
+    first = json.loads((tmp_path / "data" / "products.json").read_text(encoding="utf-8"))["products"]
+    assert len(first) == 300 + 300 // 50
+
+    # Le catalogue enregistré rejoue le même run, sans erreurs injectées
+    recorded = standin.load_catalog(str(tmp_path / "recorded.json"))
+    assert {k: len(v) for k, v in recorded.items()} == {k: len(v) for k, v in catalog.items()}
+    monkeypatch.setattr(config, "RECORD_CATALOG", None)
+    with standin.StandInServer(recorded) as server:
+        monkeypatch.setattr(config, "ALGOLIA_HOST", server.url)
+        run()
+    replayed = json.loads((tmp_path / "data" / "products.json").read_text(encoding="utf-8"))["products"]
+    assert replayed == first
+    assert AldiScraper().transfer.mode == config.FETCH_MODE
+
+
+def test_api_key_only_required_for_the_live_service(monkeypatch):
+    import pytest
+    monkeypatch.setattr(config, "ALGOLIA_API_KEY", None)
+    with pytest.raises(RuntimeError):
+        AldiScraper()
+    monkeypatch.setattr(config, "ALGOLIA_HOST", "http://127.0.0.1:8089")
+    assert AldiScraper().session.headers["X-Algolia-API-Key"] == "offline"
@@ -0,0 +1,50 @@
+import json
+import os
+
+import pytest
+
+os.environ.setdefault("ALGOLIA_API_KEY", "test")
+
+from benchmarks import generator
+from scripts import config, standin, targets
+from scripts.scraper import AldiScraper, run_targets
+
+
+def test_load_targets_validates_entries(tmp_path):
+    path = tmp_path / "targets.json"
+    path.write_text(json.dumps([{"name": "be_nl", "assortment_index": "a", "offers_index": "o", "category_filters": ["Vlees"]}]))
+    (t,) = targets.load_targets(str(path))
+    assert t.out_dir == "data/be_nl" and t.category_filters == ("Vlees",) and t.auto_partition is None
+    path.write_text(json.dumps([{"name": "x", "assortment_index": "a"}]))
+    with pytest.raises(ValueError):
+        targets.load_targets(str(path))
+    assert [t.name for t in targets.load_targets(os.path.join("scripts", "targets.json"))] == ["be_fr", "be_nl"]
+
+
+def test_targets_share_one_session_and_link_products(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "MIN_PRODUCTS", 1)
+    monkeypatch.setattr(config, "MAX_REQUESTS_PER_SECOND", 0)
+    monkeypatch.setattr(config, "HITS_PER_PAGE", 50)
+    fr = generator.generate_catalog(120)
+    nl_assortment = [dict(h, productName=f"NL {h['productName']}") for h in fr[config.ASSORTMENT_INDEX][:80]]
+    catalog = dict(fr, nl_assortment=nl_assortment, nl_offers=[])
+    target_list = [
+        targets.Target("be_fr", config.ASSORTMENT_INDEX, config.OFFERS_INDEX, "out/fr"),
+        targets.Target("be_nl", "nl_assortment", "nl_offers", "out/nl", auto_partition=True),
+    ]
+    with standin.StandInServer(catalog) as server:
+        monkeypatch.setattr(config, "ALGOLIA_HOST", server.url)
+        assert run_targets(target_list) == {"be_fr": "ok", "be_nl": "ok"}
+
+    fr_min = json.loads((tmp_path / "out" / "fr" / "products-min.json").read_text(encoding="utf-8"))
+    nl_min = json.loads((tmp_path / "out" / "nl" / "products-min.json").read_text(encoding="utf-8"))
+    assert fr_min["meta"]["total_products"] == 120 + 120 // 50 and nl_min["meta"]["total_products"] == 80
+    links = json.loads((tmp_path / config.LOCALE_LINKS_FILE).read_text(encoding="utf-8"))
+    assert links["meta"]["targets"] == ["be_fr", "be_nl"] and links["meta"]["total_products"] == 80
+    first = links["products"][0]
+    assert first["locales"]["be_nl"]["name"] == "NL " + first["locales"]["be_fr"]["name"]
+
+    a = AldiScraper(target_list[0])
+    b = AldiScraper(target_list[1], share_with=a)
+    assert b.session is a.session and b.limiter is a.limiter and b.offers_index == "nl_offers"
@@ -0,0 +1,62 @@
+import json
+import os
+
+os.environ.setdefault("ALGOLIA_API_KEY", "test")
+
+from benchmarks import generator
+from scripts import config, standin, telemetry, utils
+from scripts.scraper import run
+
+
+def test_histograms_counters_and_prometheus_text():
+    t = telemetry.Telemetry()
+    for v in (0.01, 0.2, 0.3, 20):
+        t.observe("request_seconds", v)
+    t.inc("retries_total", reason="429")
+    t.inc("retries_total", reason="429")
+    with t.span("merge"):
+        pass
+    hist = t.report()["histograms"][0]
+    assert hist["count"] == 4 and hist["max"] == 20 and hist["p50"] == 0.25 and hist["p95"] == 20
+    assert hist["buckets"]["0.05"] == 1 and hist["buckets"]["+Inf"] == 4
+    text = t.prometheus()
+    assert 'aldi_scraper_retries_total{reason="429"} 2' in text
+    assert 'aldi_scraper_request_seconds_bucket{le="0.25"} 2' in text
+    assert 'aldi_scraper_span_seconds_total{span="merge"}' in text
+    assert text.count("# TYPE aldi_scraper_retries_total counter") == 1
+
+
+def test_log_level_filter_and_buffering(monkeypatch, capsys):
+    monkeypatch.setattr(config, "LOG_LEVEL", "warning")
+    monkeypatch.setattr(config, "LOG_BUFFER_LINES", 3)
+    utils.log_event("info", "dropped")
+    utils.log_event("warning", "w1")
+    utils.log_event("warning", "w2")
+    assert capsys.readouterr().out == ""
+    utils.log_event("error", "e1")
+    assert [json.loads(line)["message"] for line in capsys.readouterr().out.splitlines()] == ["w1", "w2", "e1"]
+    utils.log_event("warning", "w3")
+    utils.flush_logs()
+    assert json.loads(capsys.readouterr().out)["message"] == "w3"
+
+
+def test_run_writes_report_and_textfile(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "MIN_PRODUCTS", 1)
+    monkeypatch.setattr(config, "MAX_REQUESTS_PER_SECOND", 0)
+    monkeypatch.setattr(config, "HITS_PER_PAGE", 20)
+    monkeypatch.setattr(config, "RUN_REPORT", "logs/run-report.json")
+    monkeypatch.setattr(config, "METRICS_TEXTFILE", "logs/aldi_scraper.prom")
+    with standin.StandInServer(generator.generate_catalog(200), throttle_rate=0.2, retry_after=0, seed=1) as server:
+        monkeypatch.setattr(config, "ALGOLIA_HOST", server.url)
+        run()
+    report = json.loads((tmp_path / "logs" / "run-report.json").read_text(encoding="utf-8"))
+    assert report["status"] == "ok" and report["budget"]["deadline_seconds"] == config.GLOBAL_TIMEOUT_SECONDS
+    assert {"fetch_sources", "stream", "commit", "algolia_request"} <= set(report["spans"])
+    counters = {(c["name"], tuple(c["labels"].items())): c["value"] for c in report["counters"]}
+    assert counters[("requests_total", (("status", "429"),))] == server.faults["429"]
+    assert counters[("retries_total", (("reason", "429"),))] == server.faults["429"]
+    assert counters[("requests_total", (("status", "200"),))] == server.requests_served - server.faults["429"]
+    filter_hits = [h for h in report["histograms"] if h["name"] == "filter_hits"]
+    assert sum(h["sum"] for h in filter_hits) == 200 + 200 // 10 + 200 // 50
+    assert "aldi_scraper_request_seconds_count" in (tmp_path / "logs" / "aldi_scraper.prom").read_text(encoding="utf-8")
@@ -0,0 +1,48 @@
+import os
+
+os.environ.setdefault("ALGOLIA_API_KEY", "test")
+
+from benchmarks import generator
+from scripts import config, transform
+from scripts.extractors import html_to_text
+from scripts.scraper import AldiScraper
+
+
+def test_html_to_text():
+    assert html_to_text("<p>l&eacute;g&egrave;rement&nbsp;piquantes, b&oelig;uf</p>") == "légèrement piquantes, bœuf"
+    assert html_to_text(
+        "<p>100 % de jus, choix entre:</p><br /><ul><br /><li>ananas/orange</li><br /><li>m&ucirc;re</li><br /></ul>"
+    ) == "100 % de jus, choix entre:\n- ananas/orange\n- mûre"
+    assert html_to_text("Gouda <strong>jeune</strong>") == "Gouda jeune"
+    assert html_to_text("Ben & Jerry's") == "Ben & Jerry's"
+    assert html_to_text("<p></p>") == ""
+    assert html_to_text(None) is None
+
+
+def test_parallel_transform_matches_serial_in_order(monkeypatch):
+    catalog = generator.generate_catalog(600, seed=7)
+    sc = AldiScraper()
+    merged = sc.merge(catalog[config.ASSORTMENT_INDEX], catalog[config.OFFERS_INDEX])
+    monkeypatch.setattr(config, "PROMO_TEXT_FORMAT", "text")
+    serial = [item for _, _, item in sc.iter_min_items(merged.items())]
+    assert serial[0]["promo_text"] == serial[0]["name"] + " de qualité.\n- Origine : UE"
+
+    # Réglages du parent recopiés dans les workers
+    monkeypatch.setattr(config, "PROMO_TEXT_FORMAT", "html")
+    monkeypatch.setattr(config, "TRANSFORM_WORKERS", 2)
+    monkeypatch.setattr(config, "TRANSFORM_CHUNK_SIZE", 37)
+    out = list(sc.iter_min_items(merged.items()))
+    assert [pid for pid, _, _ in out] == list(merged)
+    assert all(p is merged[pid] for pid, p, _ in out)
+    parallel = [item for _, _, item in out]
+    assert parallel[0]["promo_text"].startswith("<p>")
+    assert [dict(i, promo_text=None) for i in parallel] == [dict(i, promo_text=None) for i in serial]
+    assert [html_to_text(i["promo_text"]) for i in parallel] == [i["promo_text"] for i in serial]
+
+
+def test_worker_rows_carry_only_transform_attributes():
+    hit = generator.generate_catalog(1)[config.ASSORTMENT_INDEX][0]
+    projected = transform.project(hit)
+    assert "productUrl" not in projected and "_highlightResult" not in projected
+    assert projected["hierarchicalCategories"] is hit["hierarchicalCategories"]
+    assert set(projected) <= set(hit)